@@ -1,6 +1,12 @@
 from fastapi import APIRouter
 
 from app.api.router import router as auth_router
+from app.api.health_router import router as health_router
+from app.api.introspection_router import router as introspection_router
+from app.api.forward_auth_router import router as forward_auth_router
 
 main_router = APIRouter()
 main_router.include_router(auth_router)
+main_router.include_router(health_router)
+main_router.include_router(introspection_router)
+main_router.include_router(forward_auth_router)
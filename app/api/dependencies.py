@@ -1,77 +1,222 @@
-from datetime import datetime, timezone
+import hmac
 
 from fastapi import Request, HTTPException
-from sqlalchemy import select
 
+from app.config import get_introspection_settings
 from app.database import SessionDep
-from app.core.security import verify_token
-from app.models.database import UserModel
-from app.schemas.user_schemas import RoleEnum
+from app.core.bitsets import RoleSet
+from app.core.cache import user_state_cache
+from app.core.security import verify_access_token
+from app.core.trace import current_trace, trace_step
+from app.schemas.user_schemas import RoleEnum, DEFAULT_TENANT
+from app.schemas.permission_schemas import ScopeEnum
+from app.services.authorization_service import AuthorizationService, UserState
 from app.services.permission_service import PermissionService
+from app.services.audit_service import audit_log, ACCESS_EVENT
+from app.services.activity_service import activity_tracker
+from app.services.api_key_service import ApiKeyService
+
+API_KEY_HEADER = "x-api-key"
 
 async def get_current_user(request: Request, session: SessionDep) -> int:
+    user_id, _ = await get_current_user_with_role(request, session)
+    return user_id
+
+
+async def get_current_user_with_role(request: Request, session: SessionDep) -> tuple[int, RoleSet]:
+    user_id, roles, _ = await get_current_identity(request, session)
+    return user_id, roles
+
+
+async def get_current_identity(request: Request, session: SessionDep) -> tuple[int, RoleSet, str]:
+    api_key = request.headers.get(API_KEY_HEADER)
+    if api_key:
+        return await authenticate_api_key(api_key, request, session)
+
     token = request.cookies.get("user_access_token")
     if not token:
         raise HTTPException(status_code=401, detail="Токен не найден")
 
-    payload = verify_token(token)
+    return await authenticate_token(token, session)
+
+
+def get_request_token(request: Request) -> str | None:
+    authorization = request.headers.get("authorization")
+    if authorization:
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() == "bearer" and token:
+            return token.strip()
+    return request.cookies.get("user_access_token")
+
+
+async def authenticate_token(token: str, session: SessionDep) -> tuple[int, RoleSet, str]:
+    with trace_step("token") as record:
+        payload = verify_access_token(token)
+        if record is not None:
+            record["valid"] = payload is not None
+    if payload is None:
+        raise HTTPException(status_code=401, detail="Токен недействителен или истек")
+
     user_id = payload.get("sub")
-    if not user_id:
+    if not user_id or not str(user_id).isdigit():
         raise HTTPException(status_code=401, detail="Пользователь не найден")
-    
-    expire = payload.get("exp")
-    expire_time = datetime.fromtimestamp(int(expire), tz=timezone.utc)
-    if (not expire) or (expire_time < datetime.now(timezone.utc)):
-        raise HTTPException(status_code=401, detail="Токен истек")
-    
+
     user_id_int = int(user_id)
-    
-    user_query = select(UserModel).where(UserModel.id == user_id_int)
-    user_result = await session.execute(user_query)
-    user = user_result.scalar_one_or_none()
-    
-    if not user or not user.is_active:
+
+    state = await get_claims_user_state(user_id_int, payload, session)
+    if state is None:
+        state = await get_traced_user_state(user_id_int, session)
+
+    if not state or not state[1]:
         raise HTTPException(status_code=401, detail="Пользователь неактивен")
-    
-    return user_id_int
-
-
-async def get_current_user_with_role(request: Request, session: SessionDep) -> tuple[int, RoleEnum]:
-    user_id = await get_current_user(request, session)
-    
-    user_query = select(UserModel).where(UserModel.id == user_id)
-    user_result = await session.execute(user_query)
-    user = user_result.scalar_one_or_none()
-    
-    if not user:
-        raise HTTPException(status_code=401, detail="Пользователь не найден")
-    
-    return user_id, user.role
+
+    activity_tracker.touch_seen(user_id_int)
+    # Токены без арендатора выпущены до его появления и относятся к арендатору по умолчанию
+    return user_id_int, state[2], payload.get("tenant", DEFAULT_TENANT)
+
+
+async def get_claims_user_state(user_id: int, payload: dict, session: SessionDep) -> UserState | None:
+    if "uv" not in payload:
+        return None
+
+    with trace_step("claims") as record:
+        state = await AuthorizationService(session).get_claims_state(user_id, payload)
+        if record is not None:
+            record["user_id"] = user_id
+            record["current"] = state is not None
+    if state is None:
+        return None
+
+    trace = current_trace.get()
+    if trace is not None:
+        trace.roles = {role.name for role in state[2]}
+    return state
+
+
+async def authenticate_api_key(api_key: str, request: Request, session: SessionDep) -> tuple[int, RoleSet, str]:
+    with trace_step("api_key") as record:
+        key = await ApiKeyService(session).authenticate(api_key)
+        if record is not None:
+            record["valid"] = key is not None
+    if key is None:
+        raise HTTPException(status_code=401, detail="API-ключ недействителен или истек")
+
+    state = await get_traced_user_state(key.user_id, session)
+    if not state or not state[1]:
+        raise HTTPException(status_code=401, detail="Пользователь неактивен")
+
+    # Ключ ограничивает права сервисного аккаунта перечисленными парами ресурс-действие
+    request.state.api_key_scopes = key.scopes
+    activity_tracker.touch_seen(key.user_id)
+    return key.user_id, state[2], key.tenant
+
+
+async def get_traced_user_state(user_id: int, session: SessionDep) -> UserState | None:
+    with trace_step("user_state") as record:
+        cached = user_state_cache.is_fresh(user_id) if record is not None else None
+        state = await AuthorizationService(session).get_user_state(user_id)
+        if record is not None:
+            record["cached"] = cached
+            record["user_id"] = user_id
+            record["active"] = bool(state and state[1])
+            if state is not None:
+                record["roles"] = sorted(role.name for role in state[2])
+
+    trace = current_trace.get()
+    if trace is not None and state is not None:
+        trace.roles = {role.name for role in state[2]}
+    return state
+
+
+async def get_traced_rule(
+    roles: RoleSet, resource: str, action: str, tenant: str, session: SessionDep
+) -> tuple[bool, ScopeEnum] | None:
+    with trace_step("rule") as record:
+        rule = await AuthorizationService(session).get_rule(roles, resource, action, tenant)
+        if record is not None:
+            record["tenant"] = tenant
+            record["resource"] = resource
+            record["action"] = action
+            record["allowed"] = rule[0] if rule is not None else None
+
+    # Снимок политики не хранит id правил, поэтому правило ищется в базе только для трассы, которую увидит администратор
+    trace = current_trace.get()
+    if trace is not None and trace.for_admin and rule is not None:
+        with trace_step("rule_id") as record:
+            permissions = await PermissionService(session).find_rules(roles, resource, action, tenant)
+            record["rule_ids"] = [permission.id for permission in permissions]
+    return rule
 
 
 async def require_admin(request: Request, session: SessionDep) -> int:
-    user_id, role = await get_current_user_with_role(request, session)
-    
-    if role != RoleEnum.ADMIN:
+    user_id, _ = await require_admin_identity(request, session)
+    return user_id
+
+
+async def require_admin_identity(request: Request, session: SessionDep) -> tuple[int, str]:
+    user_id, roles, tenant = await get_current_identity(request, session)
+
+    if getattr(request.state, "api_key_scopes", None) is not None:
+        raise HTTPException(status_code=403, detail="API-ключи не дают доступа к администрированию")
+
+    if RoleEnum.ADMIN not in roles:
         raise HTTPException(
             status_code=403,
             detail="Доступ запрещен. Требуется роль администратора"
         )
-    
+
+    return user_id, tenant
+
+
+async def require_instance_admin_identity(request: Request, session: SessionDep) -> int:
+    # Данные уровня экземпляра (например, профили запросов) общие для всех арендаторов
+    user_id, tenant = await require_admin_identity(request, session)
+    if tenant != DEFAULT_TENANT:
+        raise HTTPException(status_code=403, detail="Доступно только администратору основного арендатора")
     return user_id
 
 
 async def check_permission(resource: str, action: str, request: Request, session: SessionDep) -> int:
-    user_id = await get_current_user(request, session)
-    permission_service = PermissionService(session)
-    has_permission = await permission_service.check_permission(
-        user_id, resource, action
-    )
-    
-    if not has_permission:
+    user_id, _ = await check_access_scope(resource, action, request, session)
+    return user_id
+
+
+async def check_access_scope(resource: str, action: str, request: Request, session: SessionDep) -> tuple[int, ScopeEnum]:
+    user_id, roles, tenant = await get_current_identity(request, session)
+
+    api_key_scopes = getattr(request.state, "api_key_scopes", None)
+    if api_key_scopes is not None and (resource, action) not in api_key_scopes:
+        audit_log.record(
+            ACCESS_EVENT, False, user_id=user_id, resource=resource, action=action, detail="api_key_scope", tenant=tenant
+        )
+        raise HTTPException(
+            status_code=403,
+            detail=f"API-ключ не разрешает действие: {action}, источник: {resource}"
+        )
+
+    rule = await get_traced_rule(roles, resource, action, tenant, session)
+
+    if rule is None:
+        audit_log.record(
+            ACCESS_EVENT, False, user_id=user_id, resource=resource, action=action, detail="not_found", tenant=tenant
+        )
+        raise HTTPException(status_code=404, detail="Разрешение не найдено")
+
+    allowed, scope = rule
+    audit_log.record(ACCESS_EVENT, allowed, user_id=user_id, resource=resource, action=action, tenant=tenant)
+    if not allowed:
         raise HTTPException(
             status_code=403,
             detail=f"Доступ запрещен. Недостаточно прав для выполнения действия: {action}, источник: {resource}"
         )
-    
-    return user_id
+
+    return user_id, scope
+
+async def require_introspection_client(request: Request) -> None:
+    secret = get_introspection_settings()["secret"]
+    if not secret:
+        raise HTTPException(status_code=403, detail="Интроспекция отключена")
+
+    provided = request.headers.get("x-introspection-secret", "")
+    if not hmac.compare_digest(provided.encode(), secret.encode()):
+        raise HTTPException(status_code=401, detail="Неверный секрет интроспекции")
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from app.api.dependencies import get_request_token, authenticate_token
+from app.core.bitsets import role_set_key
+from app.database import SessionDep
+from app.services.audit_service import audit_log, ACCESS_EVENT
+from app.services.authorization_service import AuthorizationService
+
+router = APIRouter()
+
+
+@router.get("/auth/verify")
+async def verify(request: Request, session: SessionDep, resource: str | None = None, action: str | None = None):
+    token = get_request_token(request)
+    if not token:
+        raise HTTPException(status_code=401, detail="Токен не найден")
+
+    user_id, roles, tenant = await authenticate_token(token, session)
+    # Значения ролей на кириллице, а заголовки передаются в latin-1, поэтому отдаем имена ролей через запятую
+    headers = {"X-User-Id": str(user_id), "X-User-Role": role_set_key(roles), "X-User-Tenant": tenant, "Cache-Control": "no-store"}
+
+    if resource is None and action is None:
+        return Response(status_code=200, headers=headers)
+    if resource is None or action is None:
+        raise HTTPException(status_code=400, detail="Необходимо указать resource и action")
+
+    rule = await AuthorizationService(session).get_rule(roles, resource, action, tenant)
+    if rule is None:
+        audit_log.record(
+            ACCESS_EVENT, False, user_id=user_id, resource=resource, action=action, detail="not_found", tenant=tenant
+        )
+        raise HTTPException(status_code=403, detail="Доступ запрещен")
+
+    audit_log.record(ACCESS_EVENT, rule[0], user_id=user_id, resource=resource, action=action, tenant=tenant)
+    if not rule[0]:
+        raise HTTPException(status_code=403, detail="Доступ запрещен")
+
+    headers["X-User-Scope"] = rule[1].value
+    return Response(status_code=200, headers=headers)
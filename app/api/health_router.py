@@ -0,0 +1,34 @@
+from fastapi import APIRouter
+
+from app.core.cache import single_flight
+from app.core.profiler import request_profiler
+from app.core.responses import FastJSONResponse
+from app.services.startup_service import readiness, get_pool_stats
+from app.services.audit_service import audit_log
+from app.services.snapshot_service import grant_scheduler
+from app.services.change_service import change_feed
+
+router = APIRouter()
+
+
+@router.get("/healthz")
+async def healthz():
+    return {
+        "status": "ok",
+        "ready": readiness.ready,
+        "pool": get_pool_stats(),
+        "audit": audit_log.get_stats(),
+        "grants": grant_scheduler.get_stats(),
+        "single_flight": single_flight.get_stats(),
+        "changes": change_feed.get_stats(),
+        "profiler": request_profiler.get_stats()
+    }
+
+
+@router.get("/readyz")
+async def readyz():
+    if not readiness.ready:
+        return FastJSONResponse(
+            {"status": "starting", "checks": readiness.checks, "error": readiness.error}, status_code=503
+        )
+    return {"status": "ready", "checks": readiness.checks}
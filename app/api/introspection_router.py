@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
+
+from app.api.dependencies import require_introspection_client
+from app.config import get_auth_data
+from app.core.responses import make_etag, conditional_json_response
+from app.database import SessionDep
+from app.schemas.introspection_schemas import IntrospectionRequestSchema
+from app.services.introspection_service import IntrospectionService
+from app.services.snapshot_service import policy_snapshot
+from app.schemas.user_schemas import DEFAULT_TENANT, TENANT_PATTERN
+from app.services.version_service import version_watcher, PERMISSIONS_VERSION, USERS_VERSION
+
+router = APIRouter()
+
+
+@router.post("/introspect", dependencies=[Depends(require_introspection_client)])
+async def introspect(data: IntrospectionRequestSchema, session: SessionDep):
+    service = IntrospectionService(session)
+    if data.token is not None:
+        return await service.introspect(data.token)
+    if not data.tokens:
+        raise HTTPException(status_code=400, detail="Не передан токен")
+    return {"results": await service.introspect_many(data.tokens)}
+
+
+@router.get("/auth/policy", dependencies=[Depends(require_introspection_client)])
+async def get_policy(request: Request, session: SessionDep, tenant: str = Query(DEFAULT_TENANT, pattern=TENANT_PATTERN)):
+    # Правила берутся из снимка, поэтому в них уже учтены действующие сейчас гранты
+    snapshot = await policy_snapshot.get(session, tenant)
+    versions = await version_watcher.refresh(session)
+    users_version = versions.get(USERS_VERSION, 0)
+
+    async def load() -> dict:
+        return {
+            "tenant": tenant,
+            "versions": {PERMISSIONS_VERSION: snapshot.version, USERS_VERSION: users_version},
+            "expires_at": snapshot.expires_at or None,
+            "algorithm": get_auth_data()["algorithm"],
+            "permissions": [
+                {"role": role, "resource": resource, "action": action, "allowed": allowed, "scope": scope.value}
+                for role, resource, action, allowed, scope in snapshot.rules()
+            ]
+        }
+
+    etag = make_etag("policy", tenant, snapshot.version, snapshot.expires_at, users_version)
+    return await conditional_json_response(request, etag, load)
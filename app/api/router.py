@@ -1,20 +1,74 @@
-from fastapi import APIRouter, Depends, HTTPException, Response, Request
+from fastapi import APIRouter, Depends, HTTPException, Response, Request, Query, Header
+from fastapi.responses import StreamingResponse, FileResponse
 
+from app.config import get_token_settings, get_change_feed_settings
 from app.database import DatabaseService
 from app.schemas.user_schemas import UserSchema, LoginSchema, UpdateSchema
-from app.schemas.permission_schemas import PermissionCreateSchema, PermissionUpdateSchema, PermissionResponseSchema, UserPermissionSchema
+from app.schemas.permission_schemas import (
+    PermissionCreateSchema, PermissionUpdateSchema, PermissionResponseSchema, UserPermissionSchema,
+    GrantCreateSchema, GrantResponseSchema
+)
 from app.services.users_service import UserService
-from app.services.permission_service import PermissionService
-from app.api.dependencies import get_current_user, require_admin, check_permission
+from app.schemas.api_key_schemas import ApiKeyCreateSchema, ApiKeyResponseSchema, ApiKeyCreatedSchema
+from app.schemas.group_schemas import GroupCreateSchema, GroupUpdateSchema, GroupResponseSchema, UserRolesSchema
+from app.services.permission_service import PermissionService, filter_ids_by_scope
+from app.services.authorization_service import AuthorizationService
+from app.services.group_service import GroupService
+from app.services.grant_service import GrantService
+from app.services.api_key_service import ApiKeyService
+from app.api.dependencies import (
+    get_current_user, get_current_identity, require_admin, require_admin_identity, require_instance_admin_identity,
+    check_permission, check_access_scope, get_traced_user_state, get_traced_rule
+)
 from app.database import SessionDep
-from app.services.dependencies import get_user_service, get_permission_service, get_db_service
+from app.services.dependencies import (
+    get_user_service, get_permission_service, get_group_service, get_grant_service, get_api_key_service,
+    get_db_service
+)
+from app.core.bitsets import role_set_key
 from app.core.security import create_access_token
+from app.core.trace import DecisionTrace, current_trace
+from app.core.profiler import request_profiler
+from app.core.responses import make_etag, conditional_json_response, dumps, FastJSONResponse, EncodedJSONResponse
+from app.services.snapshot_service import policy_snapshot
+from app.services.version_service import version_watcher, permissions_version
+from app.services.audit_service import AuditService, audit_log, LOGIN_EVENT
+from app.services.activity_service import activity_tracker
+from app.services.change_service import stream_changes
+
+
+MOCK_PRODUCTS = [
+    {"id": 1, "name": "Ноутбук", "price": 50000, "category": "Электроника"},
+    {"id": 2, "name": "Смартфон", "price": 25000, "category": "Электроника"},
+    {"id": 3, "name": "Наушники", "price": 5000, "category": "Аксессуары"},
+    {"id": 4, "name": "Клавиатура", "price": 3000, "category": "Периферия"},
+    {"id": 5, "name": "Мышь", "price": 1500, "category": "Периферия"},
+]
+MOCK_PRODUCTS_BODY = dumps({"products": MOCK_PRODUCTS, "total": len(MOCK_PRODUCTS)})
+
+# Заказы принадлежат разным пользователям: при scope = own каждый видит только свои
+MOCK_ORDERS = [
+    {"id": 1, "user_id": 1, "total": 75000, "status": "completed"},
+    {"id": 2, "user_id": 2, "total": 30000, "status": "pending"},
+    {"id": 3, "user_id": 3, "total": 15000, "status": "processing"},
+    {"id": 4, "user_id": 2, "total": 5000, "status": "completed"},
+]
+MOCK_ORDER_OWNERS = {order["id"]: order["user_id"] for order in MOCK_ORDERS}
+
+MOCK_REPORTS = [
+    {"id": 1, "name": "Отчет по продажам", "period": "2024-01"},
+    {"id": 2, "name": "Отчет по клиентам", "period": "2024-01"},
+]
+MOCK_REPORTS_BODY = dumps({"reports": MOCK_REPORTS, "total": len(MOCK_REPORTS)})
 
 
 router = APIRouter()
 @router.post("/db")
 async def setup_db(db_service: DatabaseService = Depends(get_db_service)):
-    return await db_service.setup_database()
+    result = await db_service.setup_database()
+    policy_snapshot.reset()
+    version_watcher.reset()
+    return result
 
 
 @router.post("/register")
@@ -25,10 +79,17 @@ async def registre_user(data: UserSchema, user_service: UserService = Depends(ge
 
 @router.post("/login")
 async def login_user(data: LoginSchema, response: Response, user_service: UserService = Depends(get_user_service)):
-    result = await user_service.login_user(data)
-    if result is None:
-        raise HTTPException(status_code=401, detail="Неверный логин или пароль")
-    access_token = create_access_token({"sub": str(result.id)})
+    try:
+        result = await user_service.login_user(data)
+    except HTTPException as error:
+        audit_log.record(LOGIN_EVENT, False, email=data.email, detail=error.detail, tenant=data.tenant)
+        raise
+    audit_log.record(LOGIN_EVENT, True, user_id=result.id, email=data.email, tenant=data.tenant)
+    activity_tracker.touch_login(result.id)
+    claims = {"sub": str(result.id), "tenant": result.tenant}
+    if get_token_settings()["embed_claims"]:
+        claims.update(await user_service.get_token_claims(result))
+    access_token = create_access_token(claims)
     response.set_cookie(key="user_access_token", value=access_token, httponly=True)
     return {"access_token": access_token}
 
@@ -73,15 +134,92 @@ async def delete_user(
     return result
 
 
+@router.get("/admin/audit")
+async def get_audit_events(
+    request: Request,
+    session: SessionDep,
+    event: str | None = None,
+    user_id: int | None = None,
+    allowed: bool | None = None,
+    before_id: int | None = None,
+    limit: int = Query(100, ge=1, le=1000)
+):
+    _, tenant = await require_admin_identity(request, session)
+    return await AuditService(session).get_events(
+        tenant, event=event, user_id=user_id, allowed=allowed, before_id=before_id, limit=limit
+    )
+
+@router.get("/admin/changes/stream")
+async def stream_change_events(
+    request: Request,
+    session: SessionDep,
+    last_event_id: str | None = Header(None),
+    after: int | None = Query(None, ge=0)
+):
+    _, tenant = await require_admin_identity(request, session)
+    # EventSource сам присылает Last-Event-ID при переподключении, параметр after - для клиентов без заголовков
+    if last_event_id is not None:
+        if not last_event_id.isdigit():
+            raise HTTPException(status_code=400, detail="Некорректный Last-Event-ID")
+        after = int(last_event_id)
+    return StreamingResponse(
+        stream_changes(tenant, after, get_change_feed_settings()["keepalive_ms"]),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/admin/profiles")
+async def get_profiles(request: Request, session: SessionDep):
+    await require_instance_admin_identity(request, session)
+    return request_profiler.list_profiles()
+
+@router.get("/admin/profiles/{name}")
+async def download_profile(name: str, request: Request, session: SessionDep):
+    await require_instance_admin_identity(request, session)
+    path = request_profiler.get_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Профиль не найден")
+    return FileResponse(path, media_type="application/octet-stream", filename=name)
+
+@router.get("/admin/explain")
+async def explain_access(
+    request: Request,
+    session: SessionDep,
+    user_id: int,
+    resource: str,
+    action: str,
+    user_service: UserService = Depends(get_user_service)
+):
+    _, tenant = await require_admin_identity(request, session)
+    if await user_service.get_user_tenant(user_id) != tenant:
+        raise HTTPException(status_code=404, detail="Пользователь не найден")
+
+    trace = DecisionTrace(admin=True)
+    token = current_trace.set(trace)
+    try:
+        state = await get_traced_user_state(user_id, session)
+        if not state or not state[1]:
+            decision = "inactive"
+        else:
+            rule = await get_traced_rule(state[2], resource, action, tenant, session)
+            if rule is None:
+                decision = "not_found"
+            else:
+                decision = "allow" if rule[0] else "deny"
+    finally:
+        current_trace.reset(token)
+    return {"decision": decision, **trace.to_dict()}
+
 @router.get("/admin/permissions", response_model=list[PermissionResponseSchema])
 async def get_all_permissions(
     request: Request,
     session: SessionDep,
     permission_service: PermissionService = Depends(get_permission_service)
 ):
-    await require_admin(request, session)
-    permissions = await permission_service.get_all_permissions()
-    return permissions
+    _, tenant = await require_admin_identity(request, session)
+    versions = await version_watcher.refresh(session)
+    etag = make_etag("admin-permissions", tenant, versions.get(permissions_version(tenant), 0))
+    return await conditional_json_response(request, etag, lambda: permission_service.get_all_permissions(tenant))
 
 
 @router.post("/admin/permissions", response_model=PermissionResponseSchema)
@@ -91,14 +229,16 @@ async def create_permission(
     session: SessionDep,
     permission_service: PermissionService = Depends(get_permission_service)
 ):
-    await require_admin(request, session)
+    _, tenant = await require_admin_identity(request, session)
     permission = await permission_service.create_permission(
         role=data.role,
         resource=data.resource,
         action=data.action,
-        allowed=data.allowed
+        allowed=data.allowed,
+        scope=data.scope,
+        tenant=tenant
     )
-    return permission
+    return FastJSONResponse(permission)
 
 
 @router.patch("/admin/permissions/{permission_id}", response_model=PermissionResponseSchema)
@@ -109,12 +249,14 @@ async def update_permission(
     session: SessionDep,
     permission_service: PermissionService = Depends(get_permission_service)
 ):
-    await require_admin(request, session)
+    _, tenant = await require_admin_identity(request, session)
     permission = await permission_service.update_permission(
         permission_id=permission_id,
-        allowed=data.allowed
+        allowed=data.allowed,
+        scope=data.scope,
+        tenant=tenant
     )
-    return permission
+    return FastJSONResponse(permission)
 
 
 @router.delete("/admin/permissions/{permission_id}")
@@ -124,20 +266,180 @@ async def delete_permission(
     session: SessionDep,
     permission_service: PermissionService = Depends(get_permission_service)
 ):
-    await require_admin(request, session)
-    result = await permission_service.delete_permission(permission_id)
+    _, tenant = await require_admin_identity(request, session)
+    result = await permission_service.delete_permission(permission_id, tenant)
     return result
 
 
-@router.get("/me/permissions", response_model=list[UserPermissionSchema])
-async def get_my_permissions(
+@router.get("/admin/grants", response_model=list[GrantResponseSchema])
+async def get_grants(
     request: Request,
     session: SessionDep,
-    permission_service: PermissionService = Depends(get_permission_service)
+    include_expired: bool = False,
+    grant_service: GrantService = Depends(get_grant_service)
 ):
-    user_id = await get_current_user(request, session)
-    permissions = await permission_service.get_user_permissions(user_id)
-    return permissions
+    _, tenant = await require_admin_identity(request, session)
+    return await grant_service.get_grants(tenant, include_expired)
+
+
+@router.post("/admin/grants", response_model=GrantResponseSchema)
+async def create_grant(
+    data: GrantCreateSchema,
+    request: Request,
+    session: SessionDep,
+    grant_service: GrantService = Depends(get_grant_service)
+):
+    user_id, tenant = await require_admin_identity(request, session)
+    return await grant_service.create_grant(
+        role=data.role,
+        resource=data.resource,
+        action=data.action,
+        valid_until=data.valid_until,
+        valid_from=data.valid_from,
+        scope=data.scope,
+        tenant=tenant,
+        created_by=user_id
+    )
+
+
+@router.delete("/admin/grants/{grant_id}")
+async def delete_grant(
+    grant_id: int,
+    request: Request,
+    session: SessionDep,
+    grant_service: GrantService = Depends(get_grant_service)
+):
+    _, tenant = await require_admin_identity(request, session)
+    return await grant_service.delete_grant(grant_id, tenant)
+
+
+@router.get("/admin/api-keys", response_model=list[ApiKeyResponseSchema])
+async def get_api_keys(
+    request: Request,
+    session: SessionDep,
+    api_key_service: ApiKeyService = Depends(get_api_key_service)
+):
+    _, tenant = await require_admin_identity(request, session)
+    return await api_key_service.get_api_keys(tenant)
+
+
+@router.post("/admin/api-keys", response_model=ApiKeyCreatedSchema)
+async def create_api_key(
+    data: ApiKeyCreateSchema,
+    request: Request,
+    session: SessionDep,
+    api_key_service: ApiKeyService = Depends(get_api_key_service)
+):
+    _, tenant = await require_admin_identity(request, session)
+    return await api_key_service.create_api_key(
+        user_id=data.user_id,
+        name=data.name,
+        scopes=[(scope.resource, scope.action) for scope in data.scopes],
+        expires_at=data.expires_at,
+        tenant=tenant
+    )
+
+
+@router.delete("/admin/api-keys/{key_id}")
+async def revoke_api_key(
+    key_id: int,
+    request: Request,
+    session: SessionDep,
+    api_key_service: ApiKeyService = Depends(get_api_key_service)
+):
+    _, tenant = await require_admin_identity(request, session)
+    return await api_key_service.revoke_api_key(key_id, tenant)
+
+
+@router.get("/admin/groups", response_model=list[GroupResponseSchema])
+async def get_groups(
+    request: Request,
+    session: SessionDep,
+    group_service: GroupService = Depends(get_group_service)
+):
+    _, tenant = await require_admin_identity(request, session)
+    return await group_service.get_groups(tenant)
+
+
+@router.post("/admin/groups", response_model=GroupResponseSchema)
+async def create_group(
+    data: GroupCreateSchema,
+    request: Request,
+    session: SessionDep,
+    group_service: GroupService = Depends(get_group_service)
+):
+    _, tenant = await require_admin_identity(request, session)
+    return await group_service.create_group(data.name, data.roles, tenant)
+
+
+@router.patch("/admin/groups/{group_id}", response_model=GroupResponseSchema)
+async def update_group(
+    group_id: int,
+    data: GroupUpdateSchema,
+    request: Request,
+    session: SessionDep,
+    group_service: GroupService = Depends(get_group_service)
+):
+    _, tenant = await require_admin_identity(request, session)
+    return await group_service.update_group_roles(group_id, data.roles, tenant)
+
+
+@router.delete("/admin/groups/{group_id}")
+async def delete_group(
+    group_id: int,
+    request: Request,
+    session: SessionDep,
+    group_service: GroupService = Depends(get_group_service)
+):
+    _, tenant = await require_admin_identity(request, session)
+    return await group_service.delete_group(group_id, tenant)
+
+
+@router.put("/admin/groups/{group_id}/members/{user_id}")
+async def add_group_member(
+    group_id: int,
+    user_id: int,
+    request: Request,
+    session: SessionDep,
+    group_service: GroupService = Depends(get_group_service)
+):
+    _, tenant = await require_admin_identity(request, session)
+    return await group_service.add_member(group_id, user_id, tenant)
+
+
+@router.delete("/admin/groups/{group_id}/members/{user_id}")
+async def remove_group_member(
+    group_id: int,
+    user_id: int,
+    request: Request,
+    session: SessionDep,
+    group_service: GroupService = Depends(get_group_service)
+):
+    _, tenant = await require_admin_identity(request, session)
+    return await group_service.remove_member(group_id, user_id, tenant)
+
+
+@router.put("/admin/users/{user_id}/roles")
+async def set_user_roles(
+    user_id: int,
+    data: UserRolesSchema,
+    request: Request,
+    session: SessionDep,
+    group_service: GroupService = Depends(get_group_service)
+):
+    _, tenant = await require_admin_identity(request, session)
+    return await group_service.set_user_roles(user_id, data.roles, tenant)
+
+
+@router.get("/me/permissions", response_model=list[UserPermissionSchema])
+async def get_my_permissions(request: Request, session: SessionDep):
+    user_id, roles, tenant = await get_current_identity(request, session)
+    # Время окончания снимка отличает наборы грантов, действовавшие при одной версии политики
+    snapshot = await policy_snapshot.get(session, tenant)
+    etag = make_etag("user-permissions", tenant, snapshot.version, snapshot.expires_at, role_set_key(roles))
+    return await conditional_json_response(
+        request, etag, lambda: AuthorizationService(session).get_user_permissions(user_id, tenant)
+    )
 
 # Mock-View для бизнес-объектов
 
@@ -148,15 +450,7 @@ async def get_products(
 ):
     user_id = await check_permission("products", "read", request, session)
     
-    mock_products = [
-        {"id": 1, "name": "Ноутбук", "price": 50000, "category": "Электроника"},
-        {"id": 2, "name": "Смартфон", "price": 25000, "category": "Электроника"},
-        {"id": 3, "name": "Наушники", "price": 5000, "category": "Аксессуары"},
-        {"id": 4, "name": "Клавиатура", "price": 3000, "category": "Периферия"},
-        {"id": 5, "name": "Мышь", "price": 1500, "category": "Периферия"},
-    ]
-    
-    return {"products": mock_products, "total": len(mock_products)}
+    return EncodedJSONResponse(MOCK_PRODUCTS_BODY)
 
 
 @router.get("/products/{product_id}")
@@ -228,13 +522,10 @@ async def get_orders(
     request: Request,
     session: SessionDep
 ):
-    user_id = await check_permission("orders", "read", request, session)
+    user_id, scope = await check_access_scope("orders", "read", request, session)
     
-    mock_orders = [
-        {"id": 1, "user_id": user_id, "total": 75000, "status": "completed"},
-        {"id": 2, "user_id": user_id, "total": 30000, "status": "pending"},
-        {"id": 3, "user_id": user_id, "total": 15000, "status": "processing"},
-    ]
+    visible_ids = set(filter_ids_by_scope(scope, user_id, MOCK_ORDER_OWNERS))
+    mock_orders = [order for order in MOCK_ORDERS if order["id"] in visible_ids]
     
     return {"orders": mock_orders, "total": len(mock_orders)}
 
@@ -246,9 +537,4 @@ async def get_reports(
 ):
     user_id = await check_permission("reports", "read", request, session)
     
-    mock_reports = [
-        {"id": 1, "name": "Отчет по продажам", "period": "2024-01"},
-        {"id": 2, "name": "Отчет по клиентам", "period": "2024-01"},
-    ]
-    
-    return {"reports": mock_reports, "total": len(mock_reports)}
+    return EncodedJSONResponse(MOCK_REPORTS_BODY)
@@ -10,3 +10,113 @@ def get_auth_data() -> Dict[str, Any]:
     if not secret_key:
         raise ValueError("Не установлен секретны ключ")
     return {"secret_key": secret_key, "algorithm": os.getenv("ALGORITHM")}
+
+def get_token_settings() -> Dict[str, Any]:
+    return {
+        "embed_claims": os.getenv("TOKEN_CLAIMS_ENABLED", "true").lower() == "true",
+    }
+
+def get_cache_settings() -> Dict[str, Any]:
+    return {
+        "version_check_interval_ms": int(os.getenv("VERSION_CHECK_INTERVAL_MS", "500")),
+        "max_entries": int(os.getenv("CACHE_MAX_ENTRIES", "10000")),
+        "policy_snapshot_path": os.getenv("POLICY_SNAPSHOT_PATH"),
+        "max_stale_ms": int(os.getenv("CACHE_MAX_STALE_MS", "10000")),
+        "api_key_negative_entries": int(os.getenv("API_KEY_NEGATIVE_CACHE_ENTRIES", "1000")),
+    }
+
+def get_database_settings() -> Dict[str, Any]:
+    return {
+        "statement_timeout_ms": int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "2000")),
+        "breaker_failure_threshold": int(os.getenv("DB_BREAKER_FAILURES", "5")),
+        "breaker_reset_ms": int(os.getenv("DB_BREAKER_RESET_MS", "5000")),
+    }
+
+def get_introspection_settings() -> Dict[str, Any]:
+    return {
+        "secret": os.getenv("INTROSPECTION_SECRET"),
+        "max_batch": int(os.getenv("INTROSPECTION_MAX_BATCH", "100")),
+    }
+
+def get_api_key_settings() -> Dict[str, Any]:
+    # Отдельный ключ позволяет сменить SECRET_KEY, не перевыпуская API-ключи
+    return {
+        "secret": os.getenv("API_KEY_SECRET") or get_auth_data()["secret_key"],
+        "max_scopes": int(os.getenv("API_KEY_MAX_SCOPES", "100")),
+    }
+
+def get_authz_socket_settings() -> Dict[str, Any]:
+    return {
+        "path": os.getenv("AUTHZ_SOCKET_PATH"),
+        "max_batch": int(os.getenv("AUTHZ_SOCKET_MAX_BATCH", "256")),
+    }
+
+def get_audit_settings() -> Dict[str, Any]:
+    return {
+        "enabled": os.getenv("AUDIT_ENABLED", "true").lower() == "true",
+        "queue_size": int(os.getenv("AUDIT_QUEUE_SIZE", "10000")),
+        "batch_size": int(os.getenv("AUDIT_BATCH_SIZE", "500")),
+        "flush_interval_ms": int(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "1000")),
+    }
+
+def get_change_feed_settings() -> Dict[str, Any]:
+    return {
+        "poll_interval_ms": int(os.getenv("CHANGE_FEED_POLL_MS", "500")),
+        "keepalive_ms": int(os.getenv("CHANGE_FEED_KEEPALIVE_MS", "15000")),
+        "queue_size": int(os.getenv("CHANGE_FEED_QUEUE_SIZE", "1000")),
+        "batch_size": int(os.getenv("CHANGE_FEED_BATCH_SIZE", "500")),
+        "retention": int(os.getenv("CHANGE_FEED_RETENTION", "100000")),
+    }
+
+def get_profiler_settings() -> Dict[str, Any]:
+    sample_rate = float(os.getenv("PROFILER_SAMPLE_RATE", "0"))
+    if not 0 <= sample_rate <= 1:
+        raise ValueError("PROFILER_SAMPLE_RATE должен быть от 0 до 1")
+    return {
+        "enabled": os.getenv("PROFILER_ENABLED", "false").lower() == "true",
+        "sample_rate": sample_rate,
+        "paths": [path.strip() for path in os.getenv("PROFILER_PATHS", "").split(",") if path.strip()],
+        "token": os.getenv("PROFILER_TOKEN"),
+        "directory": os.getenv("PROFILER_DIR", "profiles"),
+        "max_files": int(os.getenv("PROFILER_MAX_FILES", "50")),
+    }
+
+def get_activity_settings() -> Dict[str, Any]:
+    return {
+        "flush_interval_ms": int(os.getenv("ACTIVITY_FLUSH_INTERVAL_MS", "30000")),
+        "batch_size": int(os.getenv("ACTIVITY_BATCH_SIZE", "500")),
+    }
+
+def get_archive_settings() -> Dict[str, Any]:
+    email_policy = os.getenv("ARCHIVE_EMAIL_POLICY", "hash")
+    if email_policy not in ("hash", "keep"):
+        raise ValueError("ARCHIVE_EMAIL_POLICY должен быть hash или keep")
+    return {
+        "after_days": int(os.getenv("ARCHIVE_AFTER_DAYS", "30")),
+        "batch_size": int(os.getenv("ARCHIVE_BATCH_SIZE", "200")),
+        "pause_ms": int(os.getenv("ARCHIVE_PAUSE_MS", "100")),
+        "email_policy": email_policy,
+    }
+
+def get_grant_settings() -> Dict[str, Any]:
+    return {
+        "retention_days": int(os.getenv("GRANT_RETENTION_DAYS", "30")),
+        "retry_ms": int(os.getenv("GRANT_RETRY_MS", "1000")),
+    }
+
+def validate_config() -> None:
+    auth_data = get_auth_data()
+    if not auth_data["algorithm"]:
+        raise ValueError("Не установлен алгоритм подписи токенов")
+    get_token_settings()
+    get_cache_settings()
+    get_database_settings()
+    get_introspection_settings()
+    get_api_key_settings()
+    get_authz_socket_settings()
+    get_audit_settings()
+    get_change_feed_settings()
+    get_profiler_settings()
+    get_activity_settings()
+    get_archive_settings()
+    get_grant_settings()
@@ -0,0 +1,32 @@
+import hashlib
+import hmac
+import secrets
+
+from app.config import get_api_key_settings
+
+API_KEY_MARKER = "ak"
+PREFIX_BYTES = 6
+SECRET_BYTES = 32
+
+
+def generate_api_key() -> tuple[str, str]:
+    prefix = secrets.token_hex(PREFIX_BYTES)
+    return prefix, f"{API_KEY_MARKER}_{prefix}_{secrets.token_urlsafe(SECRET_BYTES)}"
+
+
+def parse_api_key_prefix(api_key: str) -> str | None:
+    marker, _, rest = api_key.partition("_")
+    prefix, _, secret = rest.partition("_")
+    if marker != API_KEY_MARKER or len(prefix) != PREFIX_BYTES * 2 or not secret:
+        return None
+    return prefix
+
+
+def hash_api_key(api_key: str) -> str:
+    # У ключа 256 бит случайности, поэтому медленный bcrypt не нужен: достаточно HMAC с серверным секретом
+    secret = get_api_key_settings()["secret"].encode()
+    return hmac.new(secret, api_key.encode(), hashlib.sha256).hexdigest()
+
+
+def verify_api_key(api_key: str, key_hash: str) -> bool:
+    return hmac.compare_digest(hash_api_key(api_key), key_hash)
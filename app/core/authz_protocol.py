@@ -0,0 +1,153 @@
+import asyncio
+import enum
+import struct
+from typing import Iterable
+
+from app.schemas.permission_schemas import ScopeEnum
+
+# Кадр: длина тела, затем тело. Запрос: id, количество проверок и проверки (токен, ресурс, действие).
+# Ответ: id, количество результатов и по одному результату на проверку в том же порядке.
+FRAME_LENGTH = struct.Struct("<I")
+FRAME_HEADER = struct.Struct("<IH")
+TOKEN_LENGTH = struct.Struct("<H")
+NAME_LENGTH = struct.Struct("<B")
+RESULT = struct.Struct("<BBI")
+MAX_FRAME_SIZE = 1 << 20
+
+SCOPES = list(ScopeEnum)
+
+
+class DecisionStatus(enum.IntEnum):
+    ALLOW = 0
+    DENY = 1
+    UNAUTHENTICATED = 2
+    NOT_FOUND = 3
+    UNAVAILABLE = 4
+    BAD_REQUEST = 5
+    ERROR = 6
+
+
+class ProtocolError(Exception):
+    def __init__(self, message: str, request_id: int | None = None, count: int = 0):
+        super().__init__(message)
+        # Если заголовок кадра прочитан, сервер отвечает на этот id, и ожидающий клиент не зависает
+        self.request_id = request_id
+        self.count = count
+
+
+def encode_request(request_id: int, checks: Iterable[tuple[str, str, str]]) -> bytes:
+    body = bytearray()
+    count = 0
+    for token, resource, action in checks:
+        token_bytes, resource_bytes, action_bytes = token.encode(), resource.encode(), action.encode()
+        body += TOKEN_LENGTH.pack(len(token_bytes)) + token_bytes
+        body += NAME_LENGTH.pack(len(resource_bytes)) + resource_bytes
+        body += NAME_LENGTH.pack(len(action_bytes)) + action_bytes
+        count += 1
+    body = FRAME_HEADER.pack(request_id, count) + body
+    return FRAME_LENGTH.pack(len(body)) + body
+
+
+def decode_request(body: bytes) -> tuple[int, list[tuple[str, str, str]]]:
+    try:
+        request_id, count = FRAME_HEADER.unpack_from(body, 0)
+    except struct.error as error:
+        raise ProtocolError("Некорректный кадр запроса") from error
+    try:
+        offset = FRAME_HEADER.size
+        checks = []
+        for _ in range(count):
+            length = TOKEN_LENGTH.unpack_from(body, offset)[0]
+            offset += TOKEN_LENGTH.size
+            token = body[offset:offset + length].decode()
+            offset += length
+            names = []
+            for _ in range(2):
+                length = NAME_LENGTH.unpack_from(body, offset)[0]
+                offset += NAME_LENGTH.size
+                names.append(body[offset:offset + length].decode())
+                offset += length
+            checks.append((token, names[0], names[1]))
+    except (struct.error, UnicodeDecodeError) as error:
+        raise ProtocolError("Некорректный кадр запроса", request_id, count) from error
+    if offset != len(body):
+        raise ProtocolError("Некорректный кадр запроса", request_id, count)
+    return request_id, checks
+
+
+def encode_response(request_id: int, results: list[tuple[DecisionStatus, ScopeEnum | None, int]]) -> bytes:
+    body = bytearray(FRAME_HEADER.pack(request_id, len(results)))
+    for status, scope, user_id in results:
+        body += RESULT.pack(status, SCOPES.index(scope) if scope is not None else 0xFF, user_id)
+    return FRAME_LENGTH.pack(len(body)) + bytes(body)
+
+
+def decode_response(body: bytes) -> tuple[int, list[tuple[DecisionStatus, ScopeEnum | None, int]]]:
+    request_id, count = FRAME_HEADER.unpack_from(body, 0)
+    results = []
+    for index in range(count):
+        status, scope, user_id = RESULT.unpack_from(body, FRAME_HEADER.size + index * RESULT.size)
+        results.append((DecisionStatus(status), SCOPES[scope] if scope < len(SCOPES) else None, user_id))
+    return request_id, results
+
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes | None:
+    try:
+        length = FRAME_LENGTH.unpack(await reader.readexactly(FRAME_LENGTH.size))[0]
+    except asyncio.IncompleteReadError:
+        return None
+    if length > MAX_FRAME_SIZE:
+        raise ProtocolError("Слишком большой кадр")
+    return await reader.readexactly(length)
+
+
+class AuthzSocketClient:
+    def __init__(self, path: str):
+        self.path = path
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+        self.pending: dict[int, asyncio.Future] = {}
+        self.next_id = 0
+        self.read_task: asyncio.Task | None = None
+
+    async def connect(self) -> None:
+        self.reader, self.writer = await asyncio.open_unix_connection(self.path)
+        self.read_task = asyncio.create_task(self.read_responses())
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            await self.writer.wait_closed()
+        if self.read_task is not None:
+            await self.read_task
+
+    async def check(self, token: str, resource: str, action: str) -> tuple[DecisionStatus, ScopeEnum | None, int]:
+        results = await self.check_many([(token, resource, action)])
+        return results[0]
+
+    async def check_many(self, checks: list[tuple[str, str, str]]) -> list[tuple[DecisionStatus, ScopeEnum | None, int]]:
+        self.next_id = (self.next_id + 1) & 0xFFFFFFFF
+        request_id = self.next_id
+        # Кадр кодируется до регистрации ожидания: слишком длинное имя не оставит висящий запрос
+        frame = encode_request(request_id, checks)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        # Запросы не ждут друг друга: ответы сопоставляются по id
+        self.writer.write(frame)
+        await self.writer.drain()
+        return await future
+
+    async def read_responses(self) -> None:
+        error: Exception = ConnectionError("Соединение закрыто")
+        try:
+            while (body := await read_frame(self.reader)) is not None:
+                request_id, results = decode_response(body)
+                future = self.pending.pop(request_id, None)
+                if future is not None and not future.done():
+                    future.set_result(results)
+        except (ConnectionError, ProtocolError) as exc:
+            error = exc
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self.pending.clear()
@@ -0,0 +1,89 @@
+from typing import Iterable
+
+from app.schemas.permission_schemas import ScopeEnum
+from app.schemas.user_schemas import RoleEnum
+
+RoleSet = frozenset[RoleEnum]
+
+role_sets: dict[RoleSet, RoleSet] = {}
+
+
+def intern_role_set(roles: Iterable[RoleEnum]) -> RoleSet:
+    # Пользователи с одинаковыми ролями делят один объект набора в кеше состояний
+    role_set = frozenset(roles)
+    return role_sets.setdefault(role_set, role_set)
+
+
+def role_set_key(roles: RoleSet) -> str:
+    return ",".join(sorted(role.name for role in roles))
+
+
+class EffectivePolicy:
+    def __init__(self, keys: list[tuple[str, str]], index: dict[tuple[str, str], int], defined: int, allowed: int, unrestricted: int):
+        self.keys = keys
+        self.index = index
+        self.defined = defined
+        self.allowed = allowed
+        self.unrestricted = unrestricted
+
+    def lookup(self, resource: str, action: str) -> tuple[bool, ScopeEnum] | None:
+        bit = self.index.get((resource, action))
+        if bit is None or not self.defined >> bit & 1:
+            return None
+        if not self.allowed >> bit & 1:
+            return False, ScopeEnum.ALL
+        return True, ScopeEnum.ALL if self.unrestricted >> bit & 1 else ScopeEnum.OWN
+
+    def permissions(self) -> list[dict]:
+        permissions = []
+        allowed = self.allowed
+        while allowed:
+            lowest = allowed & -allowed
+            bit = lowest.bit_length() - 1
+            resource, action = self.keys[bit]
+            permissions.append({
+                "resource": resource,
+                "action": action,
+                "allowed": True,
+                "scope": (ScopeEnum.ALL if self.unrestricted & lowest else ScopeEnum.OWN).value
+            })
+            allowed ^= lowest
+        return permissions
+
+
+class PolicyBitsets:
+    def __init__(self, rules: Iterable[tuple[str, str, str, bool, ScopeEnum]]):
+        self.keys: list[tuple[str, str]] = []
+        self.index: dict[tuple[str, str], int] = {}
+        # Для каждой роли три маски по парам (ресурс, действие): есть правило, разрешено, разрешено без ограничения "own"
+        self.roles: dict[RoleEnum, list[int]] = {}
+        self.effective: dict[RoleSet, EffectivePolicy] = {}
+
+        for role, resource, action, allowed, scope in rules:
+            bit = self.index.get((resource, action))
+            if bit is None:
+                bit = len(self.keys)
+                self.index[(resource, action)] = bit
+                self.keys.append((resource, action))
+            masks = self.roles.setdefault(RoleEnum(role), [0, 0, 0])
+            masks[0] |= 1 << bit
+            if allowed:
+                masks[1] |= 1 << bit
+                if scope == ScopeEnum.ALL:
+                    masks[2] |= 1 << bit
+
+    def for_roles(self, roles: RoleSet) -> EffectivePolicy:
+        policy = self.effective.get(roles)
+        if policy is None:
+            # Разрешение любой из ролей побеждает запрет остальных, а "all" шире "own"
+            defined = allowed = unrestricted = 0
+            for role in roles:
+                masks = self.roles.get(role)
+                if masks is not None:
+                    defined |= masks[0]
+                    allowed |= masks[1]
+                    unrestricted |= masks[2]
+            # Различных наборов ролей не больше 2^len(RoleEnum), поэтому кеш не ограничиваем
+            policy = EffectivePolicy(self.keys, self.index, defined, allowed, unrestricted)
+            self.effective[roles] = policy
+        return policy
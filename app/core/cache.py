@@ -0,0 +1,86 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Hashable
+
+from app.config import get_cache_settings, get_database_settings
+
+MISSING = object()
+
+
+class LocalCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.data: dict[Hashable, Any] = {}
+        self.stale_since: dict[Hashable, float] = {}
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        return self.data.get(key, default)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if key not in self.data and len(self.data) >= self.max_entries:
+            self.pop(next(iter(self.data)))
+        self.data[key] = value
+        self.stale_since.pop(key, None)
+
+    def pop(self, key: Hashable) -> None:
+        self.data.pop(key, None)
+        self.stale_since.pop(key, None)
+
+    def clear(self) -> None:
+        self.data.clear()
+        self.stale_since.clear()
+
+    def mark_stale(self, key: Hashable) -> None:
+        if key in self.data:
+            self.stale_since.setdefault(key, time.monotonic())
+
+    def mark_all_stale(self) -> None:
+        for key in self.data:
+            self.mark_stale(key)
+
+    def is_fresh(self, key: Hashable) -> bool:
+        return key in self.data and key not in self.stale_since
+
+    def stale_for(self, key: Hashable) -> float:
+        if key not in self.stale_since:
+            return 0.0
+        return time.monotonic() - self.stale_since[key]
+
+
+class SingleFlight:
+    def __init__(self, timeout_ms: int):
+        self.timeout = timeout_ms / 1000
+        self.tasks: dict[Hashable, asyncio.Task] = {}
+        self.flights = 0
+        self.joined = 0
+
+    def start(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self.tasks.get(key)
+        if task is not None:
+            self.joined += 1
+            return task
+
+        # Загрузка не должна зависеть от сессии запроса: она переживает отмену любого из ожидающих
+        task = asyncio.create_task(load())
+        self.tasks[key] = task
+        self.flights += 1
+        task.add_done_callback(lambda done: self.finish(key, done))
+        return task
+
+    async def run(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        # Ошибка загрузки достается всем ожидающим, а отмена или таймаут одного из них не прерывает общую загрузку
+        task = self.start(key, load)
+        return await asyncio.wait_for(asyncio.shield(task), self.timeout)
+
+    def finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self.tasks.get(key) is task:
+            del self.tasks[key]
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> dict:
+        return {"in_flight": len(self.tasks), "flights": self.flights, "joined": self.joined}
+
+
+user_state_cache = LocalCache(get_cache_settings()["max_entries"])
+single_flight = SingleFlight(get_database_settings()["statement_timeout_ms"])
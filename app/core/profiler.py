@@ -0,0 +1,155 @@
+import asyncio
+import cProfile
+import hmac
+import logging
+import os
+import pstats
+import random
+import re
+import time
+from pathlib import Path
+
+from app.config import get_profiler_settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_REQUEST_HEADER = b"x-profile"
+PROFILE_SUFFIX = ".prof"
+PROFILE_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]+\.prof$")
+EVENT_STREAM = b"text/event-stream"
+
+
+def make_profile_name(method: str, path: str, duration_ms: float) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+    return f"{time.time_ns() // 1_000_000}-{method.lower()}-{slug[:60]}-{round(duration_ms)}ms{PROFILE_SUFFIX}"
+
+
+class RequestProfiler:
+    def __init__(self, directory: str, sample_rate: float, paths: list[str], token: str | None, max_files: int):
+        self.directory = Path(directory)
+        self.sample_rate = sample_rate
+        self.paths = tuple(paths)
+        self.token = token.encode() if token else None
+        self.max_files = max_files
+        self.active = False
+        self.sampled = 0
+        self.skipped = 0
+        self.written = 0
+        self.failed = 0
+
+    def should_profile(self, scope) -> bool:
+        if self.paths and scope["path"].startswith(self.paths):
+            return True
+        if self.token is not None:
+            for name, value in scope["headers"]:
+                if name == PROFILE_REQUEST_HEADER:
+                    return hmac.compare_digest(value, self.token)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def acquire(self) -> bool:
+        # cProfile снимает весь поток: параллельный профиль смешал бы запросы, поэтому профилируется один за раз
+        if self.active:
+            self.skipped += 1
+            return False
+        self.active = True
+        self.sampled += 1
+        return True
+
+    def release(self) -> None:
+        self.active = False
+
+    def dump(self, profile: cProfile.Profile, name: str) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        pstats.Stats(profile).dump_stats(self.directory / name)
+        self.written += 1
+        self.rotate()
+
+    def rotate(self) -> None:
+        profiles = self.list_profiles()
+        for stale in profiles[self.max_files:]:
+            try:
+                (self.directory / stale["name"]).unlink()
+            except FileNotFoundError:
+                pass
+
+    def list_profiles(self) -> list[dict]:
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if PROFILE_NAME_PATTERN.match(entry.name)]
+        except FileNotFoundError:
+            return []
+        profiles = []
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            profiles.append({"name": entry.name, "size": stat.st_size, "created_at": stat.st_mtime})
+        # Имена начинаются с метки времени в миллисекундах, новые идут первыми
+        profiles.sort(key=lambda profile: (profile["created_at"], profile["name"]), reverse=True)
+        return profiles
+
+    def get_path(self, name: str) -> Path | None:
+        if not PROFILE_NAME_PATTERN.match(name):
+            return None
+        path = self.directory / name
+        return path if path.is_file() else None
+
+    def get_stats(self) -> dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "active": self.active,
+            "sampled": self.sampled,
+            "skipped": self.skipped,
+            "written": self.written,
+            "failed": self.failed
+        }
+
+
+class ProfilerMiddleware:
+    def __init__(self, app, profiler: RequestProfiler | None = None):
+        self.app = app
+        self.profiler = profiler or request_profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.should_profile(scope) or not self.profiler.acquire():
+            await self.app(scope, receive, send)
+            return
+
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        stopped = False
+
+        def stop() -> None:
+            nonlocal stopped
+            if not stopped:
+                profile.disable()
+                stopped = True
+
+        async def send_with_profile(message):
+            # Поток событий не заканчивается, профиль снимается только до начала ответа
+            if message["type"] == "http.response.start":
+                if any(name == b"content-type" and value.startswith(EVENT_STREAM) for name, value in message.get("headers", [])):
+                    stop()
+            await send(message)
+
+        profile.enable()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            stop()
+            self.profiler.release()
+            name = make_profile_name(scope["method"], scope["path"], (time.perf_counter() - started) * 1000)
+            try:
+                await asyncio.to_thread(self.profiler.dump, profile, name)
+            except OSError as error:
+                self.profiler.failed += 1
+                logger.warning("Не удалось сохранить профиль %s: %s", name, error)
+
+
+request_profiler = RequestProfiler(
+    get_profiler_settings()["directory"],
+    get_profiler_settings()["sample_rate"],
+    get_profiler_settings()["paths"],
+    get_profiler_settings()["token"],
+    get_profiler_settings()["max_files"]
+)
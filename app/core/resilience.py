@@ -0,0 +1,48 @@
+import time
+
+from fastapi import Request
+from sqlalchemy.exc import OperationalError
+
+from app.config import get_database_settings
+from app.core.responses import FastJSONResponse
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+DATABASE_ERRORS = (OperationalError, TimeoutError, CircuitOpenError)
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_ms: int):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_ms / 1000
+        self.failures = 0
+        self.opened_at: float | None = None
+
+    def is_open(self) -> bool:
+        return self.opened_at is not None and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def before_call(self) -> None:
+        if self.is_open():
+            raise CircuitOpenError("База данных недоступна")
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+async def database_unavailable_handler(request: Request, exc: Exception) -> FastJSONResponse:
+    return FastJSONResponse({"detail": "База данных недоступна"}, status_code=503)
+
+
+db_breaker = CircuitBreaker(
+    get_database_settings()["breaker_failure_threshold"],
+    get_database_settings()["breaker_reset_ms"]
+)
@@ -0,0 +1,59 @@
+import hashlib
+import json
+from typing import Any, Awaitable, Callable
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+from app.config import get_cache_settings
+from app.core.cache import MISSING, LocalCache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+body_cache = LocalCache(get_cache_settings()["max_entries"])
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class EncodedJSONResponse(Response):
+    media_type = "application/json"
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.sha256(":".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+async def conditional_json_response(request: Request, etag: str, load: Callable[[], Awaitable[Any]]) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    body = body_cache.get(etag)
+    if body is MISSING:
+        body = dumps(await load())
+        body_cache.set(etag, body)
+
+    return EncodedJSONResponse(content=body, headers=headers)
@@ -1,13 +1,17 @@
+import hashlib
 from typing import Dict, Any
 
 from jose import jwt, JWTError
 from datetime import datetime, timedelta, timezone
 from passlib.context import CryptContext
 
-from app.config import get_auth_data
+from app.config import get_auth_data, get_cache_settings
+from app.core.cache import MISSING, LocalCache
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+token_cache = LocalCache(get_cache_settings()["max_entries"])
+
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
@@ -41,3 +45,21 @@ def verify_token(token: str) -> Dict[str, Any]:
         return payload
     except:
         raise JWTError("Invalid token")
+
+def verify_access_token(token: str) -> Dict[str, Any] | None:
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is MISSING:
+        try:
+            payload = verify_token(token)
+        except JWTError:
+            # Ошибки не кешируются: поток мусорных токенов не должен вытеснять действующие
+            return None
+        token_cache.set(key, payload)
+
+    expire = payload.get("exp")
+    if not expire or int(expire) <= datetime.now(timezone.utc).timestamp():
+        token_cache.pop(key)
+        return None
+
+    return payload
@@ -0,0 +1,133 @@
+import fcntl
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from typing import Iterator
+
+from app.core.bitsets import PolicyBitsets, EffectivePolicy, RoleSet
+from app.schemas.permission_schemas import ScopeEnum
+
+# Формат снимка: заголовок, таблица смещений, отсортированные по ключу записи
+MAGIC = b"APS1"
+LAYOUT_VERSION = 2
+# Магия, версия формата, резерв, версия политики, момент ближайшего начала или окончания гранта (0 - нет), число записей
+HEADER = struct.Struct("<4sHHQdI")
+OFFSET = struct.Struct("<I")
+KEY_LENGTH = struct.Struct("<H")
+RULE = struct.Struct("<BB")
+KEY_SEPARATOR = b"\x1f"
+
+SCOPES = list(ScopeEnum)
+
+
+def encode_key(role: str, resource: str, action: str) -> bytes:
+    return KEY_SEPARATOR.join((role.encode(), resource.encode(), action.encode()))
+
+
+def build_snapshot(version: int, permissions: list[dict], expires_at: float = 0.0) -> bytes:
+    records = sorted(
+        (encode_key(perm["role"], perm["resource"], perm["action"]), perm["allowed"], perm["scope"])
+        for perm in permissions
+    )
+    offsets = bytearray()
+    body = bytearray()
+    base = HEADER.size + OFFSET.size * len(records)
+    for key, allowed, scope in records:
+        offsets += OFFSET.pack(base + len(body))
+        body += KEY_LENGTH.pack(len(key)) + key + RULE.pack(allowed, SCOPES.index(ScopeEnum(scope)))
+
+    header = HEADER.pack(MAGIC, LAYOUT_VERSION, 0, version, expires_at, len(records))
+    return bytes(header + offsets + body)
+
+
+class PolicySnapshot:
+    def __init__(self, buffer: mmap.mmap | bytes):
+        if len(buffer) < HEADER.size:
+            raise ValueError("Неизвестный формат снимка политики")
+        magic, layout, _, version, expires_at, count = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or layout != LAYOUT_VERSION:
+            raise ValueError("Неизвестный формат снимка политики")
+        self.buffer = buffer
+        self.version = version
+        self.expires_at = expires_at
+        self.count = count
+        self.bitsets: PolicyBitsets | None = None
+
+    def lookup(self, role: str, resource: str, action: str) -> tuple[bool, ScopeEnum] | None:
+        key = encode_key(role, resource, action)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            offset = OFFSET.unpack_from(self.buffer, HEADER.size + middle * OFFSET.size)[0]
+            length = KEY_LENGTH.unpack_from(self.buffer, offset)[0]
+            start = offset + KEY_LENGTH.size
+            candidate = self.buffer[start:start + length]
+            if candidate < key:
+                low = middle + 1
+            elif candidate > key:
+                high = middle
+            else:
+                allowed, scope = RULE.unpack_from(self.buffer, start + length)
+                return bool(allowed), SCOPES[scope]
+        return None
+
+    def is_expired(self, now: float) -> bool:
+        return bool(self.expires_at) and now >= self.expires_at
+
+    def for_roles(self, roles: RoleSet) -> EffectivePolicy:
+        # Маски собираются при первом обращении и живут, пока снимок актуален
+        if self.bitsets is None:
+            self.bitsets = PolicyBitsets(self.rules())
+        return self.bitsets.for_roles(roles)
+
+    def rules(self) -> Iterator[tuple[str, str, str, bool, ScopeEnum]]:
+        for index in range(self.count):
+            offset = OFFSET.unpack_from(self.buffer, HEADER.size + index * OFFSET.size)[0]
+            length = KEY_LENGTH.unpack_from(self.buffer, offset)[0]
+            start = offset + KEY_LENGTH.size
+            role, resource, action = bytes(self.buffer[start:start + length]).decode().split(KEY_SEPARATOR.decode())
+            allowed, scope = RULE.unpack_from(self.buffer, start + length)
+            yield role, resource, action, bool(allowed), SCOPES[scope]
+
+
+class SnapshotFile:
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> PolicySnapshot | None:
+        try:
+            with open(self.path, "rb") as file:
+                buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return None
+        try:
+            return PolicySnapshot(buffer)
+        except (ValueError, struct.error):
+            buffer.close()
+            return None
+
+    def publish(self, data: bytes) -> None:
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, self.path)
+
+    def discard(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def try_lock(self) -> Iterator[bool]:
+        with open(f"{self.path}.lock", "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
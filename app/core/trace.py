@@ -0,0 +1,71 @@
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+TRACE_REQUEST_HEADER = b"x-debug-trace"
+TRACE_RESPONSE_HEADER = b"x-auth-trace"
+
+# Когда трассировка выключена, шаг отдает None: вызывающий код не собирает данные для записи и ничего не измеряется
+DISABLED_STEP = nullcontext(None)
+
+
+class DecisionTrace:
+    def __init__(self, admin: bool = False):
+        self.started = time.perf_counter()
+        self.steps: list[dict[str, Any]] = []
+        self.roles: set[str] = set()
+        self.admin = admin
+
+    @property
+    def for_admin(self) -> bool:
+        # Трассу видят только администраторы: она раскрывает правила и состояние кешей
+        return self.admin or "ADMIN" in self.roles
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[dict[str, Any]]:
+        record: dict[str, Any] = {"step": name}
+        self.steps.append(record)
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"steps": self.steps, "total_ms": round((time.perf_counter() - self.started) * 1000, 3)}
+
+
+current_trace: ContextVar[DecisionTrace | None] = ContextVar("current_trace", default=None)
+
+
+def trace_step(name: str):
+    trace = current_trace.get()
+    if trace is None:
+        return DISABLED_STEP
+    return trace.step(name)
+
+
+class TraceMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not any(name == TRACE_REQUEST_HEADER for name, _ in scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+
+        trace = DecisionTrace()
+        token = current_trace.set(trace)
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start" and trace.for_admin:
+                body = json.dumps(trace.to_dict(), separators=(",", ":")).encode()
+                message["headers"] = [*message.get("headers", []), (TRACE_RESPONSE_HEADER, body)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace)
+        finally:
+            current_trace.reset(token)
@@ -1,10 +1,34 @@
 from typing import AsyncGenerator, Annotated
 
 from fastapi import Depends
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
-engine = create_async_engine("sqlite+aiosqlite:///auth.db")
+from app.config import get_database_settings
+from app.core.resilience import db_breaker
+
+engine = create_async_engine(
+    "sqlite+aiosqlite:///auth.db",
+    connect_args={"timeout": get_database_settings()["statement_timeout_ms"] / 1000}
+)
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def check_breaker(conn, cursor, statement, parameters, context, executemany):
+    db_breaker.before_call()
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def record_success(conn, cursor, statement, parameters, context, executemany):
+    db_breaker.record_success()
+
+
+@event.listens_for(engine.sync_engine, "handle_error")
+def record_failure(context):
+    if isinstance(context.sqlalchemy_exception, OperationalError):
+        db_breaker.record_failure()
 
 new_session = async_sessionmaker(engine, expire_on_commit=False)
 
@@ -23,3 +47,8 @@ class DatabaseService:
             await conn.run_sync(Base.metadata.drop_all)
             await conn.run_sync(Base.metadata.create_all)
         return True
+
+    async def create_database(self):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        return True
@@ -1,11 +1,12 @@
 from datetime import datetime, timezone
 import enum
 
-from sqlalchemy import Integer, String, Boolean, Enum, UniqueConstraint, ForeignKey
+from sqlalchemy import Integer, String, Boolean, Enum, UniqueConstraint, ForeignKey, Index, JSON
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base
-from app.schemas.user_schemas import RoleEnum
+from app.schemas.user_schemas import RoleEnum, DEFAULT_TENANT
+from app.schemas.permission_schemas import ScopeEnum
 
 
 def get_utc_now():
@@ -17,21 +18,155 @@ class UserModel(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(100))
     surname: Mapped[str] = mapped_column(String(100))
-    email: Mapped[str] = mapped_column(String(255), unique=True, index=True)
+    tenant: Mapped[str] = mapped_column(String(50), default=DEFAULT_TENANT)
+    email: Mapped[str] = mapped_column(String(255), index=True)
     hashed_password: Mapped[str] = mapped_column(String(255))
     role: Mapped[RoleEnum] = mapped_column(Enum(RoleEnum), default=RoleEnum.USER)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    state_version: Mapped[int] = mapped_column(Integer, default=0, index=True)
     created_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc))
     updated_at: Mapped[datetime] = mapped_column(default=lambda: datetime.now(timezone.utc), onupdate= lambda: datetime.now(timezone.utc))    
+    last_login_at: Mapped[datetime | None] = mapped_column(nullable=True)
+    last_seen_at: Mapped[datetime | None] = mapped_column(nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("tenant", "email", name="uq_tenant_email"),
+        Index("ix_users_tenant_active", "tenant", "is_active"),
+        # id после архивации не выдается повторно: иначе новый пользователь унаследовал бы кеши, аудит и журнал изменений
+        {"sqlite_autoincrement": True},
+    )
+
+
+class UserRoleModel(Base):
+    __tablename__ = "user_roles"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    role: Mapped[RoleEnum] = mapped_column(Enum(RoleEnum), primary_key=True)
+
+
+class GroupModel(Base):
+    __tablename__ = "groups"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    tenant: Mapped[str] = mapped_column(String(50), default=DEFAULT_TENANT)
+    name: Mapped[str] = mapped_column(String(100))
+
+    __table_args__ = (UniqueConstraint("tenant", "name", name="uq_tenant_group_name"),)
+
+
+class GroupRoleModel(Base):
+    __tablename__ = "group_roles"
+
+    group_id: Mapped[int] = mapped_column(ForeignKey("groups.id", ondelete="CASCADE"), primary_key=True)
+    role: Mapped[RoleEnum] = mapped_column(Enum(RoleEnum), primary_key=True)
+
+
+class GroupMemberModel(Base):
+    __tablename__ = "group_members"
+
+    group_id: Mapped[int] = mapped_column(ForeignKey("groups.id", ondelete="CASCADE"), primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+
+class ArchivedUserModel(Base):
+    __tablename__ = "users_archive"
+
+    # Собственный ключ: в базах, созданных до AUTOINCREMENT у users, id пользователя мог повторяться
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, index=True)
+    tenant: Mapped[str] = mapped_column(String(50), default=DEFAULT_TENANT)
+    name: Mapped[str] = mapped_column(String(100))
+    surname: Mapped[str] = mapped_column(String(100))
+    email: Mapped[str] = mapped_column(String(255), index=True)
+    role: Mapped[RoleEnum] = mapped_column(Enum(RoleEnum))
+    created_at: Mapped[datetime] = mapped_column()
+    deleted_at: Mapped[datetime] = mapped_column()
+    last_login_at: Mapped[datetime | None] = mapped_column(nullable=True)
+    archived_at: Mapped[datetime] = mapped_column(default=get_utc_now)
 
 
 class Permissions(Base):
     __tablename__ = "permissions"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    tenant: Mapped[str] = mapped_column(String(50), default=DEFAULT_TENANT)
     role: Mapped[RoleEnum] = mapped_column(Enum(RoleEnum))
     resource: Mapped[str] = mapped_column(String(50))
     action: Mapped[str] = mapped_column(String(20))
     allowed: Mapped[bool] = mapped_column(Boolean, default=True)
+    scope: Mapped[ScopeEnum] = mapped_column(Enum(ScopeEnum), default=ScopeEnum.ALL)
+
+    __table_args__ = (UniqueConstraint("tenant", "role", "resource", "action", name="uq_tenant_role_resource_action"),)
+
+
+class PermissionGrant(Base):
+    __tablename__ = "permission_grants"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    tenant: Mapped[str] = mapped_column(String(50), default=DEFAULT_TENANT)
+    role: Mapped[RoleEnum] = mapped_column(Enum(RoleEnum))
+    resource: Mapped[str] = mapped_column(String(50))
+    action: Mapped[str] = mapped_column(String(20))
+    scope: Mapped[ScopeEnum] = mapped_column(Enum(ScopeEnum), default=ScopeEnum.ALL)
+    valid_from: Mapped[datetime] = mapped_column(default=get_utc_now)
+    valid_until: Mapped[datetime] = mapped_column()
+    created_by: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_grants_tenant_valid_from", "tenant", "valid_from"),
+        Index("ix_grants_tenant_valid_until", "tenant", "valid_until"),
+    )
+
+
+class ApiKeyModel(Base):
+    __tablename__ = "api_keys"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    tenant: Mapped[str] = mapped_column(String(50), default=DEFAULT_TENANT)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    name: Mapped[str] = mapped_column(String(100))
+    prefix: Mapped[str] = mapped_column(String(16), unique=True)
+    key_hash: Mapped[str] = mapped_column(String(64))
+    scopes: Mapped[list] = mapped_column(JSON, default=list)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    created_at: Mapped[datetime] = mapped_column(default=get_utc_now)
+    expires_at: Mapped[datetime | None] = mapped_column(nullable=True)
+
+
+class PolicyVersion(Base):
+    __tablename__ = "policy_versions"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class ChangeEvent(Base):
+    __tablename__ = "change_log"
+
+    # AUTOINCREMENT не дает SQLite повторно выдать номер после очистки журнала: id служит номером события
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(default=get_utc_now)
+    tenant: Mapped[str] = mapped_column(String(50), default=DEFAULT_TENANT)
+    kind: Mapped[str] = mapped_column(String(20))
+    event: Mapped[str] = mapped_column(String(20))
+    data: Mapped[dict] = mapped_column(JSON, default=dict)
+
+    __table_args__ = (
+        Index("ix_change_log_tenant_id", "tenant", "id"),
+        {"sqlite_autoincrement": True},
+    )
+
+
+class AuditEvent(Base):
+    __tablename__ = "audit_log"
 
-    __table_args__ = (UniqueConstraint("role", "resource", "action", name="uq_role_resource_action"),)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(default=get_utc_now, index=True)
+    tenant: Mapped[str] = mapped_column(String(50), default=DEFAULT_TENANT)
+    event: Mapped[str] = mapped_column(String(20), index=True)
+    user_id: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
+    email: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    resource: Mapped[str | None] = mapped_column(String(50), nullable=True)
+    action: Mapped[str | None] = mapped_column(String(20), nullable=True)
+    allowed: Mapped[bool] = mapped_column(Boolean)
+    detail: Mapped[str | None] = mapped_column(String(255), nullable=True)
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class ApiKeyScopeSchema(BaseModel):
+    resource: str
+    action: str
+
+
+class ApiKeyCreateSchema(BaseModel):
+    user_id: int
+    name: str = Field(min_length=1, max_length=100)
+    scopes: list[ApiKeyScopeSchema]
+    expires_at: datetime | None = None
+
+
+class ApiKeyResponseSchema(BaseModel):
+    id: int
+    user_id: int
+    name: str
+    prefix: str
+    scopes: list[ApiKeyScopeSchema]
+    is_active: bool
+    created_at: datetime
+    expires_at: datetime | None = None
+
+
+class ApiKeyCreatedSchema(ApiKeyResponseSchema):
+    key: str
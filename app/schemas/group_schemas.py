@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+
+from app.schemas.user_schemas import RoleEnum
+
+
+class GroupCreateSchema(BaseModel):
+    name: str = Field(min_length=1, max_length=100)
+    roles: list[RoleEnum] = []
+
+
+class GroupUpdateSchema(BaseModel):
+    roles: list[RoleEnum]
+
+
+class GroupResponseSchema(BaseModel):
+    id: int
+    name: str
+    roles: list[RoleEnum]
+    members: int = 0
+
+
+class UserRolesSchema(BaseModel):
+    roles: list[RoleEnum]
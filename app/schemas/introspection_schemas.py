@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+
+from app.config import get_introspection_settings
+
+
+class IntrospectionRequestSchema(BaseModel):
+    token: str | None = None
+    tokens: list[str] = Field(default_factory=list, max_length=get_introspection_settings()["max_batch"])
+
+
+class IntrospectionResponseSchema(BaseModel):
+    active: bool
+    sub: str | None = None
+    role: str | None = None
+    roles: list[str] | None = None
+    tenant: str | None = None
+    token_type: str | None = None
+    exp: int | None = None
+    iat: int | None = None
+
+
+class IntrospectionBatchResponseSchema(BaseModel):
+    results: list[IntrospectionResponseSchema]
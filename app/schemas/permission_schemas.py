@@ -1,16 +1,26 @@
+import enum
+from datetime import datetime
+
 from pydantic import BaseModel
 from app.schemas.user_schemas import RoleEnum
 
 
+class ScopeEnum(str, enum.Enum):
+    ALL = "all"
+    OWN = "own"
+
+
 class PermissionCreateSchema(BaseModel):
     role: RoleEnum
     resource: str
     action: str
     allowed: bool = True
+    scope: ScopeEnum = ScopeEnum.ALL
 
 
 class PermissionUpdateSchema(BaseModel):
     allowed: bool
+    scope: ScopeEnum | None = None
 
 
 class PermissionResponseSchema(BaseModel):
@@ -19,6 +29,7 @@ class PermissionResponseSchema(BaseModel):
     resource: str
     action: str
     allowed: bool
+    scope: ScopeEnum = ScopeEnum.ALL
 
     class Config:
         from_attributes = True
@@ -28,4 +39,25 @@ class UserPermissionSchema(BaseModel):
     resource: str
     action: str
     allowed: bool
+    scope: ScopeEnum = ScopeEnum.ALL
+
+
+
+class GrantCreateSchema(BaseModel):
+    role: RoleEnum
+    resource: str
+    action: str
+    scope: ScopeEnum = ScopeEnum.ALL
+    valid_from: datetime | None = None
+    valid_until: datetime
 
+
+class GrantResponseSchema(BaseModel):
+    id: int
+    role: RoleEnum
+    resource: str
+    action: str
+    scope: ScopeEnum
+    valid_from: datetime
+    valid_until: datetime
+    created_by: int | None = None
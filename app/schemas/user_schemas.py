@@ -1,7 +1,10 @@
 import enum
 from datetime import datetime
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
+
+DEFAULT_TENANT = "default"
+TENANT_PATTERN = r"^[a-z0-9_-]{1,50}$"
 
 
 class RoleEnum(str, enum.Enum):
@@ -17,10 +20,12 @@ class UserSchema(BaseModel):
     password: str
     password_confirm: str
     role: RoleEnum = RoleEnum.USER
+    tenant: str = Field(DEFAULT_TENANT, pattern=TENANT_PATTERN)
 
 class LoginSchema(BaseModel):
     email: EmailStr
     password: str
+    tenant: str = Field(DEFAULT_TENANT, pattern=TENANT_PATTERN)
 
 class ResponseSchema(BaseModel):
     id: int
@@ -28,6 +33,7 @@ class ResponseSchema(BaseModel):
     surname: str
     email: EmailStr
     role: RoleEnum
+    tenant: str = DEFAULT_TENANT
     is_active: bool
     created_at: datetime
     updated_at: datetime
@@ -0,0 +1,37 @@
+import argparse
+import asyncio
+
+from app.database import engine
+from app.services.archive_service import create_user_archiver
+
+
+def print_progress(stats: dict) -> None:
+    print(f"Пачка {stats['batches']}: перенесено {stats['archived']} пользователей за {stats['elapsed_ms']} мс", flush=True)
+
+
+async def archive_users(max_batches: int | None, full_vacuum: bool, skip_maintenance: bool) -> None:
+    archiver = create_user_archiver()
+    try:
+        stats = await archiver.archive(max_batches=max_batches, progress=print_progress)
+        print(f"Архивировано пользователей: {stats['archived']} ({stats['batches']} пачек, {stats['elapsed_ms']} мс)")
+        if not skip_maintenance:
+            maintenance = await archiver.maintain(full_vacuum=full_vacuum)
+            print(
+                f"Обслуживание: свободных страниц {maintenance['free_pages_before']} -> "
+                f"{maintenance['free_pages_after']}"
+            )
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Перенос давно удаленных пользователей в архив")
+    parser.add_argument("--max-batches", type=int, default=None, help="Ограничить число пачек за запуск")
+    parser.add_argument("--vacuum", action="store_true", help="Выполнить полный VACUUM (блокирует базу)")
+    parser.add_argument("--skip-maintenance", action="store_true", help="Не запускать ANALYZE/VACUUM")
+    args = parser.parse_args()
+    asyncio.run(archive_users(args.max_batches, args.vacuum, args.skip_maintenance))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import asyncio
+import http.client
+import json
+import os
+import time
+from urllib.parse import urlparse
+
+from app.core.authz_protocol import AuthzSocketClient
+
+NUMBER = 5120
+BATCH = 64
+BASE_URL = os.getenv("BENCH_BASE_URL", "http://127.0.0.1:8000")
+SOCKET_PATH = os.getenv("AUTHZ_SOCKET_PATH", "/tmp/authz.sock")
+EMAIL = os.getenv("BENCH_EMAIL", "user@example.com")
+PASSWORD = os.getenv("BENCH_PASSWORD", "user123")
+
+
+def login(connection: http.client.HTTPConnection) -> str:
+    connection.request(
+        "POST", "/login", body=json.dumps({"email": EMAIL, "password": PASSWORD}),
+        headers={"Content-Type": "application/json"}
+    )
+    response = connection.getresponse()
+    response.read()
+    cookie = response.getheader("set-cookie", "")
+    return cookie.split("user_access_token=", 1)[1].split(";", 1)[0].strip('"')
+
+
+def bench_http(connection: http.client.HTTPConnection, token: str) -> float:
+    headers = {"Authorization": f"Bearer {token}"}
+    started = time.perf_counter()
+    for _ in range(NUMBER):
+        connection.request("GET", "/auth/verify?resource=products&action=read", headers=headers)
+        connection.getresponse().read()
+    return time.perf_counter() - started
+
+
+async def bench_socket(token: str) -> tuple[float, float, float]:
+    client = AuthzSocketClient(SOCKET_PATH)
+    await client.connect()
+    check = (token, "products", "read")
+
+    started = time.perf_counter()
+    for _ in range(NUMBER):
+        await client.check(*check)
+    sequential = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client.check(*check) for _ in range(NUMBER)))
+    pipelined = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(NUMBER // BATCH):
+        await client.check_many([check] * BATCH)
+    batched = time.perf_counter() - started
+
+    await client.close()
+    return sequential, pipelined, batched
+
+
+def report(name: str, elapsed: float, baseline: float) -> None:
+    per_check = elapsed / NUMBER * 1_000_000
+    print(f"{name:<40} {per_check:>10.2f} мкс {NUMBER / elapsed:>12.0f} пров/с {baseline / elapsed:>8.1f}x")
+
+
+def main():
+    url = urlparse(BASE_URL)
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80)
+    token = login(connection)
+    http_time = bench_http(connection, token)
+    connection.close()
+    sequential, pipelined, batched = asyncio.run(bench_socket(token))
+
+    print(f"{'Сценарий':<40} {'На проверку':>14} {'Пропускная':>18} {'Ускорение':>9}")
+    report("HTTP GET /auth/verify", http_time, http_time)
+    report("Сокет, последовательно", sequential, http_time)
+    report("Сокет, конвейер", pipelined, http_time)
+    report(f"Сокет, пачки по {BATCH}", batched, http_time)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import timeit
+from datetime import datetime, timezone
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.api.router import MOCK_PRODUCTS, MOCK_PRODUCTS_BODY
+from app.core.responses import FastJSONResponse, EncodedJSONResponse
+from app.models.database import UserModel
+from app.schemas.permission_schemas import PermissionResponseSchema
+from app.schemas.user_schemas import ResponseSchema, RoleEnum
+
+NUMBER = 20000
+
+
+def make_permissions() -> list[dict]:
+    return [
+        {"id": index, "role": role.value, "resource": resource, "action": action, "allowed": True, "scope": "all"}
+        for index, (role, resource, action) in enumerate(
+            (role, resource, action)
+            for role in RoleEnum
+            for resource in ("products", "orders", "reports")
+            for action in ("read", "create", "update", "delete")
+        )
+    ]
+
+
+def measure(name: str, before, after) -> None:
+    before_time = timeit.timeit(before, number=NUMBER) / NUMBER * 1_000_000
+    after_time = timeit.timeit(after, number=NUMBER) / NUMBER * 1_000_000
+    print(f"{name:<40} {before_time:>10.2f} мкс {after_time:>10.2f} мкс {before_time / after_time:>8.1f}x")
+
+
+def main():
+    permissions = make_permissions()
+    adapter = TypeAdapter(list[PermissionResponseSchema])
+    user = UserModel(
+        id=1, name="Иван", surname="Иванов", email="user@example.com", hashed_password="x",
+        role=RoleEnum.USER, is_active=True,
+        created_at=datetime.now(timezone.utc), updated_at=datetime.now(timezone.utc)
+    )
+
+    print(f"{'Сценарий':<40} {'До':>14} {'После':>14} {'Ускорение':>9}")
+    measure(
+        "Рендер списка правил",
+        lambda: JSONResponse(jsonable_encoder(permissions)),
+        lambda: FastJSONResponse(permissions),
+    )
+    measure(
+        "Список правил с response_model",
+        lambda: JSONResponse(jsonable_encoder(adapter.dump_python(adapter.validate_python(permissions)))),
+        lambda: FastJSONResponse(permissions),
+    )
+    measure(
+        "Получение id при логине",
+        lambda: ResponseSchema.model_validate(user).id,
+        lambda: user.id,
+    )
+    measure(
+        "Mock-список продуктов",
+        lambda: JSONResponse(jsonable_encoder({"products": list(MOCK_PRODUCTS), "total": len(MOCK_PRODUCTS)})),
+        lambda: EncodedJSONResponse(MOCK_PRODUCTS_BODY),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import asyncio
+import itertools
+import random
+import time
+from datetime import datetime, timezone
+from typing import Iterator
+
+from passlib.context import CryptContext
+from sqlalchemy import insert, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.database import Base, engine, new_session
+from app.models.database import UserModel, Permissions
+from app.schemas.permission_schemas import ScopeEnum
+from app.schemas.user_schemas import RoleEnum
+from app.services.version_service import VersionService, PERMISSIONS_VERSION, USERS_VERSION
+
+ACTIONS = ("read", "create", "update", "delete")
+ROLE_WEIGHTS = {RoleEnum.ADMIN: 1, RoleEnum.MANAGER: 9, RoleEnum.USER: 80, RoleEnum.VIEWER: 10}
+# Минимальная стоимость bcrypt: хеши проверяются обычным verify_password, но считаются за миллисекунды
+FAST_HASH = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4)
+
+
+def build_password_pool(size: int) -> list[str]:
+    return [FAST_HASH.hash(f"password{index}") for index in range(size)]
+
+
+def generate_users(count: int, start: int, seed: int, password_pool: list[str]) -> Iterator[dict]:
+    rng = random.Random()
+    roles = list(ROLE_WEIGHTS)
+    weights = list(ROLE_WEIGHTS.values())
+    created_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for number in range(start, start + count):
+        # Генератор пересевается на каждого пользователя: дозапись с --start дает те же данные, что и полный прогон
+        rng.seed(f"{seed}:{number}")
+        yield {
+            "name": f"Имя{number}",
+            "surname": f"Фамилия{number}",
+            "email": f"user{number:08d}@load.test",
+            "hashed_password": password_pool[number % len(password_pool)],
+            "role": rng.choices(roles, weights)[0],
+            "is_active": rng.random() >= 0.02,
+            "state_version": 0,
+            "created_at": created_at,
+            "updated_at": created_at
+        }
+
+
+def generate_permissions(resources: int, seed: int) -> Iterator[dict]:
+    rng = random.Random(seed + 1)
+    for index in range(resources):
+        resource = f"resource{index:05d}"
+        for role in RoleEnum:
+            for action in ACTIONS:
+                allowed = role == RoleEnum.ADMIN or rng.random() < 0.6
+                yield {
+                    "role": role,
+                    "resource": resource,
+                    "action": action,
+                    "allowed": allowed,
+                    "scope": ScopeEnum.OWN if allowed and role == RoleEnum.USER and action != "read" else ScopeEnum.ALL
+                }
+
+
+async def insert_stream(model, rows: Iterator[dict], batch_size: int, label: str, skip_existing: bool = False) -> int:
+    statement = sqlite_insert(model).on_conflict_do_nothing() if skip_existing else insert(model)
+    total = 0
+    started = time.perf_counter()
+    async with engine.connect() as connection:
+        # Данные для нагрузочных тестов можно пересоздать, поэтому жертвуем надежностью записи ради скорости
+        await connection.execute(text("PRAGMA synchronous=OFF"))
+        while batch := list(itertools.islice(rows, batch_size)):
+            await connection.execute(statement, batch)
+            await connection.commit()
+            total += len(batch)
+            elapsed = time.perf_counter() - started
+            print(f"{label}: {total} строк, {total / elapsed:.0f} строк/с", flush=True)
+        await connection.execute(text("PRAGMA synchronous=FULL"))
+    return total
+
+
+async def generate_data(users: int, start: int, resources: int, seed: int, batch_size: int, pool_size: int, reset: bool) -> None:
+    try:
+        async with engine.begin() as connection:
+            if reset:
+                await connection.run_sync(Base.metadata.drop_all)
+            await connection.run_sync(Base.metadata.create_all)
+
+        password_pool = build_password_pool(pool_size)
+        started = time.perf_counter()
+        # Правила детерминированы: при дозаписи с --start уже созданные пропускаются
+        await insert_stream(Permissions, generate_permissions(resources, seed), batch_size, "Правила", skip_existing=True)
+        await insert_stream(UserModel, generate_users(users, start, seed, password_pool), batch_size, "Пользователи")
+
+        async with new_session() as session:
+            version_service = VersionService(session)
+            await version_service.bump(PERMISSIONS_VERSION)
+            await version_service.bump(USERS_VERSION)
+            await session.commit()
+
+        print(f"Готово за {time.perf_counter() - started:.1f} с. Пароль пользователя N: password<N % {pool_size}>")
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генерация синтетических данных для нагрузочного тестирования")
+    parser.add_argument("--users", type=int, default=1_000_000, help="Количество пользователей")
+    parser.add_argument("--start", type=int, default=0, help="Номер первого пользователя (для дозаписи)")
+    parser.add_argument("--resources", type=int, default=2500, help="Количество ресурсов (правил = ресурсы * 16)")
+    parser.add_argument("--seed", type=int, default=42, help="Зерно генератора")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Строк в одной многострочной вставке")
+    parser.add_argument("--password-pool", type=int, default=16, help="Количество заранее посчитанных хешей")
+    parser.add_argument("--reset", action="store_true", help="Пересоздать таблицы перед генерацией")
+    args = parser.parse_args()
+    asyncio.run(generate_data(
+        args.users, args.start, args.resources, args.seed, args.batch_size, args.password_pool, args.reset
+    ))
+
+
+if __name__ == "__main__":
+    main()
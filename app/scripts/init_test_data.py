@@ -4,7 +4,9 @@ from sqlalchemy import select
 
 from app.database import Base
 from app.models.database import UserModel, Permissions, RoleEnum
+from app.schemas.permission_schemas import ScopeEnum
 from app.core.security import get_password_hash
+from app.services.version_service import VersionService, PERMISSIONS_VERSION
 
 
 async def init_test_data():
@@ -107,7 +109,7 @@ async def init_test_data():
             {"role": RoleEnum.USER, "resource": "products", "action": "create", "allowed": False},
             {"role": RoleEnum.USER, "resource": "products", "action": "update", "allowed": False},
             {"role": RoleEnum.USER, "resource": "products", "action": "delete", "allowed": False},
-            {"role": RoleEnum.USER, "resource": "orders", "action": "read", "allowed": True},
+            {"role": RoleEnum.USER, "resource": "orders", "action": "read", "allowed": True, "scope": ScopeEnum.OWN},
             {"role": RoleEnum.USER, "resource": "orders", "action": "create", "allowed": True},
             {"role": RoleEnum.USER, "resource": "orders", "action": "update", "allowed": False},
             {"role": RoleEnum.USER, "resource": "orders", "action": "delete", "allowed": False},
@@ -130,10 +132,12 @@ async def init_test_data():
                 role=perm_data["role"],
                 resource=perm_data["resource"],
                 action=perm_data["action"],
-                allowed=perm_data["allowed"]
+                allowed=perm_data["allowed"],
+                scope=perm_data.get("scope", ScopeEnum.ALL)
             )
             session.add(permission)
         
+        await VersionService(session).bump(PERMISSIONS_VERSION)
         await session.commit()
 
 
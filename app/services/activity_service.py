@@ -0,0 +1,94 @@
+import asyncio
+import logging
+from datetime import datetime
+
+from sqlalchemy import update, case
+
+from app.config import get_activity_settings
+from app.core.resilience import DATABASE_ERRORS
+from app.database import new_session
+from app.models.database import UserModel, get_utc_now
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityTracker:
+    def __init__(self, flush_interval_ms: int, batch_size: int):
+        self.flush_interval = flush_interval_ms / 1000
+        self.batch_size = batch_size
+        self.logins: dict[int, datetime] = {}
+        self.seen: dict[int, datetime] = {}
+        self.task: asyncio.Task | None = None
+
+    def touch_login(self, user_id: int) -> None:
+        now = get_utc_now()
+        self.logins[user_id] = now
+        self.seen[user_id] = now
+
+    def touch_seen(self, user_id: int) -> None:
+        self.seen[user_id] = get_utc_now()
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.flush()
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        logins, self.logins = self.logins, {}
+        seen, self.seen = self.seen, {}
+        user_ids = sorted(seen.keys() | logins.keys())
+        if not user_ids:
+            return
+        try:
+            async with new_session() as session:
+                for start in range(0, len(user_ids), self.batch_size):
+                    chunk = user_ids[start:start + self.batch_size]
+                    await session.execute(self.build_update(chunk, logins, seen))
+                await session.commit()
+        except DATABASE_ERRORS as error:
+            # Возвращаем отметки, не затирая более свежие, накопленные во время записи
+            for user_id, moment in logins.items():
+                self.logins.setdefault(user_id, moment)
+            for user_id, moment in seen.items():
+                self.seen.setdefault(user_id, moment)
+            logger.warning("Не удалось записать активность пользователей: %s", error)
+        except Exception:
+            # Ошибка в самих данных повторится при каждой попытке: отметки отбрасываются, а фоновая задача продолжает работу
+            logger.exception("Отметки активности пользователей отброшены")
+
+    def build_update(self, user_ids: list[int], logins: dict[int, datetime], seen: dict[int, datetime]):
+        values = {
+            # updated_at не трогаем: активность не меняет данные пользователя
+            "updated_at": UserModel.updated_at,
+            "last_seen_at": case(
+                {user_id: seen[user_id] for user_id in user_ids if user_id in seen},
+                value=UserModel.id,
+                else_=UserModel.last_seen_at
+            )
+        }
+        login_ids = {user_id: logins[user_id] for user_id in user_ids if user_id in logins}
+        if login_ids:
+            values["last_login_at"] = case(login_ids, value=UserModel.id, else_=UserModel.last_login_at)
+        return update(UserModel).where(UserModel.id.in_(user_ids)).values(**values).execution_options(
+            synchronize_session=False
+        )
+
+
+activity_tracker = ActivityTracker(
+    get_activity_settings()["flush_interval_ms"],
+    get_activity_settings()["batch_size"]
+)
@@ -0,0 +1,160 @@
+import time
+from datetime import datetime
+from typing import NamedTuple
+
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_cache_settings, get_api_key_settings
+from app.core.api_keys import generate_api_key, parse_api_key_prefix, hash_api_key, verify_api_key
+from app.core.cache import MISSING, LocalCache, single_flight
+from app.database import SessionDep, new_session
+from app.models.database import ApiKeyModel, UserModel, get_utc_now
+from app.schemas.user_schemas import DEFAULT_TENANT
+from app.services.grant_service import as_utc
+from app.services.version_service import VersionService, version_watcher
+
+API_KEYS_VERSION = "api_keys"
+
+
+class ApiKeyRecord(NamedTuple):
+    id: int
+    user_id: int
+    tenant: str
+    key_hash: str
+    scopes: frozenset[tuple[str, str]]
+    expires_at: float | None
+
+
+api_key_cache = LocalCache(get_cache_settings()["max_entries"])
+# Отсутствующие префиксы хранятся отдельно: перебор префиксов вытесняет только их, а не действующие ключи
+unknown_api_key_cache = LocalCache(get_cache_settings()["api_key_negative_entries"])
+
+
+async def load_api_key_record(prefix: str) -> ApiKeyRecord | None:
+    async with new_session() as session:
+        query = select(ApiKeyModel).where(ApiKeyModel.prefix == prefix, ApiKeyModel.is_active == True)
+        api_key = (await session.execute(query)).scalar_one_or_none()
+
+    if api_key is None:
+        unknown_api_key_cache.set(prefix, None)
+        return None
+
+    record = ApiKeyRecord(
+        api_key.id,
+        api_key.user_id,
+        api_key.tenant,
+        api_key.key_hash,
+        frozenset((resource, action) for resource, action in api_key.scopes),
+        as_utc(api_key.expires_at).timestamp() if api_key.expires_at else None
+    )
+    api_key_cache.set(prefix, record)
+    return record
+
+
+def serialize_api_key(api_key: ApiKeyModel) -> dict:
+    return {
+        "id": api_key.id,
+        "user_id": api_key.user_id,
+        "name": api_key.name,
+        "prefix": api_key.prefix,
+        "scopes": [{"resource": resource, "action": action} for resource, action in api_key.scopes],
+        "is_active": api_key.is_active,
+        "created_at": as_utc(api_key.created_at).isoformat(),
+        "expires_at": as_utc(api_key.expires_at).isoformat() if api_key.expires_at else None
+    }
+
+
+class ApiKeyService:
+    def __init__(self, session: SessionDep):
+        self.session = session
+
+    async def authenticate(self, api_key: str) -> ApiKeyRecord | None:
+        prefix = parse_api_key_prefix(api_key)
+        if prefix is None:
+            return None
+
+        await version_watcher.refresh(self.session)
+        record = api_key_cache.get(prefix)
+        if record is MISSING:
+            record = unknown_api_key_cache.get(prefix)
+        if record is MISSING:
+            # Один запрос по уникальному индексу на префикс, одновременные промахи ждут его же
+            record = await single_flight.run(("api-key", prefix), lambda: load_api_key_record(prefix))
+
+        if record is None or not verify_api_key(api_key, record.key_hash):
+            return None
+        if record.expires_at is not None and record.expires_at <= time.time():
+            return None
+        return record
+
+    async def get_api_keys(self, tenant: str = DEFAULT_TENANT) -> list[dict]:
+        query = select(ApiKeyModel).where(ApiKeyModel.tenant == tenant).order_by(ApiKeyModel.id)
+        result = await self.session.execute(query)
+        return [serialize_api_key(api_key) for api_key in result.scalars().all()]
+
+    async def create_api_key(
+        self,
+        user_id: int,
+        name: str,
+        scopes: list[tuple[str, str]],
+        expires_at: datetime | None = None,
+        tenant: str = DEFAULT_TENANT
+    ) -> dict:
+        if not scopes:
+            raise HTTPException(status_code=400, detail="Укажите хотя бы одну пару ресурс-действие")
+        if len(scopes) > get_api_key_settings()["max_scopes"]:
+            raise HTTPException(status_code=400, detail="Слишком много пар ресурс-действие")
+        if expires_at is not None and as_utc(expires_at) <= get_utc_now():
+            raise HTTPException(status_code=400, detail="Срок действия ключа уже истек")
+
+        user_query = select(UserModel.id).where(
+            UserModel.id == user_id,
+            UserModel.tenant == tenant,
+            UserModel.is_active == True
+        )
+        if (await self.session.execute(user_query)).scalar_one_or_none() is None:
+            raise HTTPException(status_code=404, detail="Пользователь не найден")
+
+        prefix, raw_key = generate_api_key()
+        api_key = ApiKeyModel(
+            tenant=tenant,
+            user_id=user_id,
+            name=name,
+            prefix=prefix,
+            key_hash=hash_api_key(raw_key),
+            scopes=sorted({(resource, action) for resource, action in scopes}),
+            expires_at=as_utc(expires_at) if expires_at is not None else None
+        )
+        self.session.add(api_key)
+        # Новый префикс мог попасть в кеш как отсутствующий
+        await VersionService(self.session).bump(API_KEYS_VERSION)
+        await self.session.commit()
+        await self.session.refresh(api_key)
+        # Ключ в открытом виде возвращается только один раз
+        return {**serialize_api_key(api_key), "key": raw_key}
+
+    async def revoke_api_key(self, key_id: int, tenant: str = DEFAULT_TENANT) -> dict:
+        query = update(ApiKeyModel).where(
+            ApiKeyModel.id == key_id,
+            ApiKeyModel.tenant == tenant,
+            ApiKeyModel.is_active == True
+        ).values(is_active=False).returning(ApiKeyModel.prefix)
+        prefix = (await self.session.execute(query)).scalar_one_or_none()
+        if prefix is None:
+            await self.session.rollback()
+            raise HTTPException(status_code=404, detail="API-ключ не найден или уже отозван")
+
+        await VersionService(self.session).bump(API_KEYS_VERSION)
+        await self.session.commit()
+        api_key_cache.pop(prefix)
+        return {"message": "API-ключ отозван"}
+
+
+async def invalidate_api_keys(session: AsyncSession, previous: int | None, current: int) -> None:
+    api_key_cache.clear()
+    unknown_api_key_cache.clear()
+
+
+version_watcher.subscribe(API_KEYS_VERSION, invalidate_api_keys)
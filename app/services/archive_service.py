@@ -0,0 +1,115 @@
+import asyncio
+import hashlib
+import time
+from datetime import timedelta
+from typing import Callable
+
+from sqlalchemy import select, delete, insert, text
+
+from app.config import get_archive_settings
+from app.core.cache import user_state_cache
+from app.database import engine, new_session
+from app.models.database import UserModel, ArchivedUserModel, UserRoleModel, GroupMemberModel, ApiKeyModel, get_utc_now
+
+Progress = Callable[[dict], None]
+
+
+def archive_email(email: str, policy: str) -> str:
+    if policy == "keep":
+        return email
+    return "sha256:" + hashlib.sha256(email.lower().encode()).hexdigest()
+
+
+class UserArchiver:
+    def __init__(self, after_days: int, batch_size: int, pause_ms: int, email_policy: str):
+        self.after_days = after_days
+        self.batch_size = batch_size
+        self.pause = pause_ms / 1000
+        self.email_policy = email_policy
+
+    async def archive(self, max_batches: int | None = None, progress: Progress | None = None) -> dict:
+        cutoff = get_utc_now() - timedelta(days=self.after_days)
+        stats = {"batches": 0, "archived": 0, "elapsed_ms": 0.0}
+        started = time.perf_counter()
+
+        while max_batches is None or stats["batches"] < max_batches:
+            archived = await self.archive_batch(cutoff)
+            if not archived:
+                break
+            stats["batches"] += 1
+            stats["archived"] += archived
+            stats["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            if progress is not None:
+                progress(dict(stats))
+            if archived < self.batch_size:
+                break
+            # Пауза между пачками освобождает базу для рабочих запросов
+            await asyncio.sleep(self.pause)
+
+        stats["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return stats
+
+    async def archive_batch(self, cutoff) -> int:
+        async with new_session() as session:
+            ids_query = select(UserModel.id).where(
+                UserModel.is_active == False,
+                UserModel.updated_at < cutoff
+            ).order_by(UserModel.id).limit(self.batch_size)
+            delete_query = delete(UserModel).where(
+                UserModel.id.in_(ids_query.scalar_subquery()),
+                UserModel.is_active == False
+            ).returning(
+                UserModel.id, UserModel.tenant, UserModel.name, UserModel.surname, UserModel.email, UserModel.role,
+                UserModel.created_at, UserModel.updated_at, UserModel.last_login_at
+            )
+            rows = (await session.execute(delete_query)).all()
+            if not rows:
+                await session.rollback()
+                return 0
+
+            # Внешние ключи в SQLite выключены, поэтому роли, членство в группах и API-ключи удаляем вместе с пользователем
+            user_ids = [row.id for row in rows]
+            await session.execute(delete(UserRoleModel).where(UserRoleModel.user_id.in_(user_ids)))
+            await session.execute(delete(GroupMemberModel).where(GroupMemberModel.user_id.in_(user_ids)))
+            await session.execute(delete(ApiKeyModel).where(ApiKeyModel.user_id.in_(user_ids)))
+
+            archived_at = get_utc_now()
+            await session.execute(insert(ArchivedUserModel), [
+                {
+                    "user_id": row.id,
+                    "tenant": row.tenant,
+                    "name": row.name,
+                    "surname": row.surname,
+                    "email": archive_email(row.email, self.email_policy),
+                    "role": row.role,
+                    "created_at": row.created_at,
+                    "deleted_at": row.updated_at,
+                    "last_login_at": row.last_login_at,
+                    "archived_at": archived_at
+                }
+                for row in rows
+            ])
+            await session.commit()
+
+        for row in rows:
+            user_state_cache.pop(row.id)
+        return len(rows)
+
+    async def maintain(self, full_vacuum: bool = False) -> dict:
+        async with engine.connect() as connection:
+            connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+            free_before = (await connection.execute(text("PRAGMA freelist_count"))).scalar_one()
+            # optimize запускает ANALYZE только для таблиц, статистика которых устарела
+            await connection.execute(text("PRAGMA optimize"))
+            auto_vacuum = (await connection.execute(text("PRAGMA auto_vacuum"))).scalar_one()
+            if full_vacuum:
+                await connection.execute(text("VACUUM"))
+            elif auto_vacuum == 2:
+                await connection.execute(text("PRAGMA incremental_vacuum"))
+            free_after = (await connection.execute(text("PRAGMA freelist_count"))).scalar_one()
+        return {"free_pages_before": free_before, "free_pages_after": free_after, "full_vacuum": full_vacuum}
+
+
+def create_user_archiver() -> UserArchiver:
+    settings = get_archive_settings()
+    return UserArchiver(settings["after_days"], settings["batch_size"], settings["pause_ms"], settings["email_policy"])
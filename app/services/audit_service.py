@@ -0,0 +1,167 @@
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import select, insert
+
+from app.config import get_audit_settings
+from app.core.resilience import DATABASE_ERRORS
+from app.database import SessionDep, new_session
+from app.models.database import AuditEvent, get_utc_now
+from app.schemas.user_schemas import DEFAULT_TENANT
+
+logger = logging.getLogger(__name__)
+
+LOGIN_EVENT = "login"
+ACCESS_EVENT = "access"
+
+
+class AuditLog:
+    def __init__(self, enabled: bool, max_size: int, batch_size: int, flush_interval_ms: int):
+        self.enabled = enabled
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.events: deque[dict] = deque()
+        self.wakeup = asyncio.Event()
+        self.task: asyncio.Task | None = None
+        self.written = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+
+    def record(
+        self,
+        event: str,
+        allowed: bool,
+        user_id: int | None = None,
+        email: str | None = None,
+        resource: str | None = None,
+        action: str | None = None,
+        detail: str | None = None,
+        tenant: str = DEFAULT_TENANT
+    ) -> None:
+        if not self.enabled:
+            return
+        # При переполнении отбрасываем новые события, чтобы не тормозить обработку запросов
+        if len(self.events) >= self.max_size:
+            if not self.dropped:
+                logger.warning("Очередь аудита переполнена, новые события отбрасываются")
+            self.dropped += 1
+            return
+        self.events.append({
+            "created_at": get_utc_now(),
+            "tenant": tenant,
+            "event": event,
+            "user_id": user_id,
+            "email": email,
+            "resource": resource,
+            "action": action,
+            "allowed": allowed,
+            "detail": detail
+        })
+        if len(self.events) >= self.batch_size:
+            self.wakeup.set()
+
+    def start(self) -> None:
+        if self.enabled and self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.flush()
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.flush_interval)
+            except TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        while self.events:
+            batch = [self.events.popleft() for _ in range(min(self.batch_size, len(self.events)))]
+            try:
+                async with new_session() as session:
+                    await session.execute(insert(AuditEvent), batch)
+                    await session.commit()
+            except DATABASE_ERRORS as error:
+                # Возвращаем пачку в начало очереди и повторим на следующем цикле
+                self.events.extendleft(reversed(batch))
+                self.failed_flushes += 1
+                logger.warning("Не удалось записать события аудита: %s", error)
+                return
+            except Exception:
+                # Ошибка в самих данных повторится при каждой попытке: пачка отбрасывается, а фоновая задача продолжает работу
+                self.dropped += len(batch)
+                self.failed_flushes += 1
+                logger.exception("Пачка событий аудита отброшена")
+                continue
+            self.written += len(batch)
+
+    def get_stats(self) -> dict:
+        return {
+            "queued": len(self.events),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed_flushes": self.failed_flushes
+        }
+
+
+class AuditService:
+    def __init__(self, session: SessionDep):
+        self.session = session
+
+    async def get_events(
+        self,
+        tenant: str = DEFAULT_TENANT,
+        event: str | None = None,
+        user_id: int | None = None,
+        allowed: bool | None = None,
+        since: datetime | None = None,
+        before_id: int | None = None,
+        limit: int = 100
+    ) -> list[dict]:
+        query = select(AuditEvent).where(AuditEvent.tenant == tenant).order_by(AuditEvent.id.desc()).limit(limit)
+        if event is not None:
+            query = query.where(AuditEvent.event == event)
+        if user_id is not None:
+            query = query.where(AuditEvent.user_id == user_id)
+        if allowed is not None:
+            query = query.where(AuditEvent.allowed == allowed)
+        if since is not None:
+            query = query.where(AuditEvent.created_at >= since)
+        if before_id is not None:
+            query = query.where(AuditEvent.id < before_id)
+
+        result = await self.session.execute(query)
+        return [
+            {
+                "id": row.id,
+                "created_at": row.created_at.isoformat(),
+                "event": row.event,
+                "user_id": row.user_id,
+                "email": row.email,
+                "resource": row.resource,
+                "action": row.action,
+                "allowed": row.allowed,
+                "detail": row.detail
+            }
+            for row in result.scalars().all()
+        ]
+
+
+audit_log = AuditLog(
+    get_audit_settings()["enabled"],
+    get_audit_settings()["queue_size"],
+    get_audit_settings()["batch_size"],
+    get_audit_settings()["flush_interval_ms"]
+)
@@ -0,0 +1,115 @@
+from sqlalchemy import select
+
+from fastapi import HTTPException
+
+from app.config import get_cache_settings
+from app.core.bitsets import RoleSet, intern_role_set
+from app.core.cache import MISSING, user_state_cache, single_flight
+from app.core.resilience import DATABASE_ERRORS
+from app.database import SessionDep, new_session
+from app.models.database import UserModel
+from app.schemas.user_schemas import RoleEnum, DEFAULT_TENANT
+from app.schemas.permission_schemas import ScopeEnum
+from app.services.group_service import load_role_sets
+from app.services.snapshot_service import policy_snapshot
+from app.services.version_service import version_watcher, user_versions
+
+MAX_STALE_SECONDS = get_cache_settings()["max_stale_ms"] / 1000
+
+# Основная роль, признак активности и полный набор ролей с учетом групп
+UserState = tuple[RoleEnum, bool, RoleSet]
+
+
+def user_states_key(user_ids: frozenset[int]) -> tuple:
+    # Одиночная загрузка и пачка из одного пользователя делят один запрос
+    return "user-states", user_ids
+
+
+async def load_user_states(user_ids: frozenset[int]) -> dict[int, UserState | None]:
+    async with new_session() as session:
+        query = select(UserModel.id, UserModel.role, UserModel.is_active).where(UserModel.id.in_(user_ids))
+        rows = (await session.execute(query)).all()
+        role_sets = await load_role_sets(session, {row.id: row.role for row in rows})
+
+    states: dict[int, UserState | None] = dict.fromkeys(user_ids)
+    for row in rows:
+        states[row.id] = (row.role, row.is_active, role_sets[row.id])
+        user_state_cache.set(row.id, states[row.id])
+    for user_id in user_ids - {row.id for row in rows}:
+        user_state_cache.pop(user_id)
+    return states
+
+
+def parse_claims_state(user_id: int, payload: dict) -> UserState | None:
+    version = payload.get("uv")
+    if not isinstance(version, int) or not user_versions.is_current(user_id, version):
+        return None
+    try:
+        role = RoleEnum(payload["role"])
+        roles = intern_role_set(RoleEnum(value) for value in payload["roles"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    # Роли в токен пишутся только активному пользователю, а деактивация увеличивает его версию
+    return role, True, roles
+
+
+class AuthorizationService:
+    def __init__(self, session: SessionDep):
+        self.session = session
+
+    async def get_user_state(self, user_id: int) -> UserState | None:
+        await version_watcher.refresh(self.session)
+
+        if user_state_cache.is_fresh(user_id):
+            return user_state_cache.get(user_id)
+
+        try:
+            user_ids = frozenset({user_id})
+            states = await single_flight.run(user_states_key(user_ids), lambda: load_user_states(user_ids))
+            return states[user_id]
+        except DATABASE_ERRORS:
+            state = user_state_cache.get(user_id)
+            if state is not MISSING and user_state_cache.stale_for(user_id) <= MAX_STALE_SECONDS:
+                return state
+            raise
+
+    async def get_claims_state(self, user_id: int, payload: dict) -> UserState | None:
+        # Пока версия пользователя не сдвинулась после выдачи токена, роли берутся из токена без запроса к базе
+        if "uv" not in payload:
+            return None
+        await version_watcher.refresh(self.session)
+        return parse_claims_state(user_id, payload)
+
+    async def get_user_states(self, user_ids: set[int]) -> dict[int, UserState | None]:
+        await version_watcher.refresh(self.session)
+
+        states = {user_id: user_state_cache.get(user_id) for user_id in user_ids if user_state_cache.is_fresh(user_id)}
+        missing = frozenset(user_ids - states.keys())
+        if not missing:
+            return states
+
+        try:
+            loaded = await single_flight.run(user_states_key(missing), lambda: load_user_states(missing))
+        except DATABASE_ERRORS:
+            for user_id in missing:
+                state = user_state_cache.get(user_id)
+                if state is MISSING or user_state_cache.stale_for(user_id) > MAX_STALE_SECONDS:
+                    raise
+                states[user_id] = state
+            return states
+
+        return states | loaded
+
+    async def get_rule(
+        self, roles: RoleSet, resource: str, action: str, tenant: str = DEFAULT_TENANT
+    ) -> tuple[bool, ScopeEnum] | None:
+        snapshot = await policy_snapshot.get(self.session, tenant)
+        return snapshot.for_roles(roles).lookup(resource, action)
+
+    async def get_user_permissions(self, user_id: int, tenant: str = DEFAULT_TENANT) -> list[dict]:
+        state = await self.get_user_state(user_id)
+        if not state or not state[1]:
+            raise HTTPException(status_code=404, detail="Пользователь не найден или удален")
+
+        snapshot = await policy_snapshot.get(self.session, tenant)
+        return snapshot.for_roles(state[2]).permissions()
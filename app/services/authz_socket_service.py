@@ -0,0 +1,149 @@
+import asyncio
+import fcntl
+import logging
+import os
+
+from app.config import get_authz_socket_settings
+from app.core.authz_protocol import (
+    DecisionStatus, ProtocolError, decode_request, encode_response, read_frame
+)
+from app.core.resilience import DATABASE_ERRORS
+from app.core.security import verify_access_token
+from app.database import new_session
+from app.schemas.user_schemas import DEFAULT_TENANT
+from app.services.audit_service import audit_log, ACCESS_EVENT
+from app.services.authorization_service import AuthorizationService
+
+logger = logging.getLogger(__name__)
+
+
+async def evaluate_checks(checks: list[tuple[str, str, str]]) -> list[tuple]:
+    results = []
+    async with new_session() as session:
+        service = AuthorizationService(session)
+        states = {}
+        for token, resource, action in checks:
+            payload = verify_access_token(token)
+            user_id = str(payload.get("sub", "")) if payload is not None else ""
+            if not user_id.isdigit():
+                results.append((DecisionStatus.UNAUTHENTICATED, None, 0))
+                continue
+
+            user_id_int = int(user_id)
+            if user_id_int not in states:
+                states[user_id_int] = (
+                    await service.get_claims_state(user_id_int, payload) or await service.get_user_state(user_id_int)
+                )
+            state = states[user_id_int]
+            if not state or not state[1]:
+                results.append((DecisionStatus.UNAUTHENTICATED, None, user_id_int))
+                continue
+
+            tenant = payload.get("tenant", DEFAULT_TENANT)
+            rule = await service.get_rule(state[2], resource, action, tenant)
+            if rule is None:
+                audit_log.record(
+                    ACCESS_EVENT, False, user_id=user_id_int, resource=resource, action=action, detail="not_found", tenant=tenant
+                )
+                results.append((DecisionStatus.NOT_FOUND, None, user_id_int))
+                continue
+
+            audit_log.record(ACCESS_EVENT, rule[0], user_id=user_id_int, resource=resource, action=action, tenant=tenant)
+            if not rule[0]:
+                results.append((DecisionStatus.DENY, None, user_id_int))
+            else:
+                results.append((DecisionStatus.ALLOW, rule[1], user_id_int))
+    return results
+
+
+class AuthzSocketServer:
+    def __init__(self, path: str, max_batch: int):
+        self.path = path
+        self.max_batch = max_batch
+        self.server: asyncio.Server | None = None
+        self.lock_fd: int | None = None
+
+    def acquire_lock(self) -> bool:
+        # Каждый воркер uvicorn выполняет свой lifespan: сокет слушает только владелец блокировки,
+        # иначе воркеры удаляли бы сокеты друг друга. Блокировку снимает ОС при завершении процесса
+        fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o660)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self.lock_fd = fd
+        return True
+
+    def release_lock(self) -> None:
+        if self.lock_fd is not None:
+            fcntl.flock(self.lock_fd, fcntl.LOCK_UN)
+            os.close(self.lock_fd)
+            self.lock_fd = None
+
+    async def start(self) -> None:
+        if not self.acquire_lock():
+            logger.info("Сокет проверок %s уже обслуживает другой процесс", self.path)
+            return
+        try:
+            # Файл мог остаться от упавшего владельца: при удержанной блокировке его никто не слушает
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self.server = await asyncio.start_unix_server(self.handle_client, path=self.path)
+            os.chmod(self.path, 0o660)
+        except OSError:
+            self.release_lock()
+            raise
+
+    async def stop(self) -> None:
+        if self.server is None:
+            return
+        self.server.close()
+        await self.server.wait_closed()
+        self.server = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.release_lock()
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while (body := await read_frame(reader)) is not None:
+                writer.write(await self.handle_frame(body))
+                await writer.drain()
+        except (ProtocolError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def handle_frame(self, body: bytes) -> bytes:
+        try:
+            request_id, checks = decode_request(body)
+        except ProtocolError as error:
+            if error.request_id is None:
+                # Без id ответ не сопоставить с запросом: закрываем соединение, и клиент завершит все ожидания
+                raise
+            return encode_response(error.request_id, [(DecisionStatus.BAD_REQUEST, None, 0)] * error.count)
+
+        if len(checks) > self.max_batch:
+            return encode_response(request_id, [(DecisionStatus.BAD_REQUEST, None, 0)] * len(checks))
+
+        try:
+            results = await evaluate_checks(checks)
+        except DATABASE_ERRORS:
+            results = [(DecisionStatus.UNAVAILABLE, None, 0)] * len(checks)
+        except Exception:
+            # Непредвиденная ошибка не должна рвать соединение с остальными запросами в конвейере
+            logger.exception("Ошибка проверки прав через сокет")
+            results = [(DecisionStatus.ERROR, None, 0)] * len(checks)
+        return encode_response(request_id, results)
+
+
+def create_authz_socket_server() -> AuthzSocketServer | None:
+    settings = get_authz_socket_settings()
+    if not settings["path"]:
+        return None
+    return AuthzSocketServer(settings["path"], settings["max_batch"])
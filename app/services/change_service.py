@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import time
+from typing import AsyncIterator
+
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_change_feed_settings
+from app.core.resilience import DATABASE_ERRORS
+from app.core.responses import dumps
+from app.database import SessionDep, new_session
+from app.models.database import ChangeEvent
+from app.schemas.user_schemas import DEFAULT_TENANT
+
+logger = logging.getLogger(__name__)
+
+PERMISSION_CHANGE = "permission"
+USER_CHANGE = "user"
+SYNC_EVENT = "sync"
+RESET_EVENT = "reset"
+PURGE_INTERVAL_SECONDS = 60
+
+
+def record_change(session: AsyncSession, kind: str, event: str, tenant: str = DEFAULT_TENANT, **data) -> None:
+    # Событие пишется в той же транзакции, что и изменение: откат изменения откатывает и событие
+    session.add(ChangeEvent(tenant=tenant, kind=kind, event=event, data=data))
+
+
+def serialize_change(change: ChangeEvent) -> dict:
+    return {
+        "seq": change.id,
+        "tenant": change.tenant,
+        "kind": change.kind,
+        "event": change.event,
+        "data": change.data
+    }
+
+
+def format_sse(event: str, data: dict, seq: int | None = None) -> bytes:
+    head = f"id: {seq}\nevent: {event}\n" if seq is not None else f"event: {event}\n"
+    return head.encode() + b"data: " + dumps(data) + b"\n\n"
+
+
+async def get_last_change_id(session: AsyncSession) -> int:
+    return (await session.execute(select(func.max(ChangeEvent.id)))).scalar_one() or 0
+
+
+class ChangeSubscription:
+    def __init__(self, tenant: str, queue_size: int):
+        self.tenant = tenant
+        self.queue: asyncio.Queue[dict] = asyncio.Queue(queue_size)
+        self.overflowed = False
+
+    def deliver(self, change: dict) -> bool:
+        try:
+            self.queue.put_nowait(change)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            return False
+        return True
+
+
+class ChangeFeed:
+    def __init__(self, poll_interval_ms: int, queue_size: int, batch_size: int, retention: int):
+        self.poll_interval = poll_interval_ms / 1000
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.retention = retention
+        self.subscriptions: set[ChangeSubscription] = set()
+        self.last_id: int | None = None
+        self.wakeup = asyncio.Event()
+        self.task: asyncio.Task | None = None
+        self.purged_at = float("-inf")
+        self.published = 0
+        self.overflows = 0
+        self.purged = 0
+
+    async def subscribe(self, session: AsyncSession, tenant: str) -> ChangeSubscription:
+        if self.last_id is None:
+            self.last_id = await get_last_change_id(session)
+        subscription = ChangeSubscription(tenant, self.queue_size)
+        self.subscriptions.add(subscription)
+        self.wakeup.set()
+        return subscription
+
+    def unsubscribe(self, subscription: ChangeSubscription) -> None:
+        self.subscriptions.discard(subscription)
+        if not self.subscriptions:
+            # Без подписчиков журнал не читается, следующий подписчик начнет с текущего конца журнала
+            self.last_id = None
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def run(self) -> None:
+        while True:
+            # Один запрос за интервал на процесс, сколько бы ни было подписчиков
+            timeout = self.poll_interval if self.subscriptions else PURGE_INTERVAL_SECONDS
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except TimeoutError:
+                pass
+            self.wakeup.clear()
+            try:
+                async with new_session() as session:
+                    await self.poll(session)
+                    if time.monotonic() - self.purged_at >= PURGE_INTERVAL_SECONDS:
+                        await self.purge(session)
+            except DATABASE_ERRORS as error:
+                logger.warning("Не удалось прочитать журнал изменений: %s", error)
+
+    async def poll(self, session: AsyncSession) -> None:
+        while self.subscriptions and self.last_id is not None:
+            query = select(ChangeEvent).where(ChangeEvent.id > self.last_id).order_by(ChangeEvent.id).limit(self.batch_size)
+            changes = (await session.execute(query)).scalars().all()
+            for change in changes:
+                self.publish(serialize_change(change))
+            if len(changes) < self.batch_size:
+                return
+
+    def publish(self, change: dict) -> None:
+        if self.last_id is not None:
+            self.last_id = change["seq"]
+        self.published += 1
+        for subscription in list(self.subscriptions):
+            if subscription.tenant != change["tenant"]:
+                continue
+            if not subscription.deliver(change):
+                # Медленный подписчик отключается и дочитает пропущенное из журнала при переподключении
+                self.overflows += 1
+                self.unsubscribe(subscription)
+
+    async def purge(self, session: AsyncSession) -> None:
+        self.purged_at = time.monotonic()
+        last_id = await get_last_change_id(session)
+        result = await session.execute(delete(ChangeEvent).where(ChangeEvent.id <= last_id - self.retention))
+        await session.commit()
+        self.purged += result.rowcount
+
+    def get_stats(self) -> dict:
+        return {
+            "subscribers": len(self.subscriptions),
+            "last_id": self.last_id,
+            "published": self.published,
+            "overflows": self.overflows,
+            "purged": self.purged
+        }
+
+
+class ChangeService:
+    def __init__(self, session: SessionDep):
+        self.session = session
+
+    async def get_bounds(self) -> tuple[int, int]:
+        query = select(func.min(ChangeEvent.id), func.max(ChangeEvent.id))
+        first_id, last_id = (await self.session.execute(query)).one()
+        return first_id or 0, last_id or 0
+
+    async def get_changes(self, tenant: str, after_id: int, until_id: int, limit: int) -> list[dict]:
+        query = select(ChangeEvent).where(
+            ChangeEvent.tenant == tenant,
+            ChangeEvent.id > after_id,
+            ChangeEvent.id <= until_id
+        ).order_by(ChangeEvent.id).limit(limit)
+        result = await self.session.execute(query)
+        return [serialize_change(change) for change in result.scalars().all()]
+
+
+async def stream_changes(tenant: str, last_event_id: int | None, keepalive_ms: int) -> AsyncIterator[bytes]:
+    # Подписка оформляется до чтения журнала: все, что новее прочитанного конца, придет через очередь
+    async with new_session() as session:
+        subscription = await change_feed.subscribe(session, tenant)
+        first_id, last_id = await ChangeService(session).get_bounds()
+
+    try:
+        if last_event_id is None:
+            yield format_sse(SYNC_EVENT, {"seq": last_id}, last_id)
+        elif last_event_id > last_id or (first_id and last_event_id < first_id - 1):
+            # Нужные события уже удалены из журнала: подписчику остается сбросить свой кеш целиком
+            yield format_sse(RESET_EVENT, {"seq": last_id}, last_id)
+        else:
+            position = last_event_id
+            while position < last_id:
+                async with new_session() as session:
+                    changes = await ChangeService(session).get_changes(tenant, position, last_id, change_feed.batch_size)
+                for change in changes:
+                    yield format_sse(change["kind"], change, change["seq"])
+                if len(changes) < change_feed.batch_size:
+                    break
+                position = changes[-1]["seq"]
+
+        keepalive = keepalive_ms / 1000
+        while not (subscription.overflowed and subscription.queue.empty()):
+            try:
+                change = await asyncio.wait_for(subscription.queue.get(), keepalive)
+            except TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if change["seq"] > last_id:
+                yield format_sse(change["kind"], change, change["seq"])
+    finally:
+        change_feed.unsubscribe(subscription)
+
+
+change_feed = ChangeFeed(
+    get_change_feed_settings()["poll_interval_ms"],
+    get_change_feed_settings()["queue_size"],
+    get_change_feed_settings()["batch_size"],
+    get_change_feed_settings()["retention"]
+)
@@ -1,6 +1,9 @@
 from app.database import SessionDep
 from app.services.users_service import UserService
 from app.services.permission_service import PermissionService
+from app.services.group_service import GroupService
+from app.services.grant_service import GrantService
+from app.services.api_key_service import ApiKeyService
 from app.database import DatabaseService
 
 def get_user_service(session: SessionDep) -> UserService:
@@ -9,5 +12,14 @@ def get_user_service(session: SessionDep) -> UserService:
 def get_permission_service(session: SessionDep) -> PermissionService:
     return PermissionService(session)
 
+def get_group_service(session: SessionDep) -> GroupService:
+    return GroupService(session)
+
+def get_grant_service(session: SessionDep) -> GrantService:
+    return GrantService(session)
+
+def get_api_key_service(session: SessionDep) -> ApiKeyService:
+    return ApiKeyService(session)
+
 def get_db_service() -> DatabaseService:
     return DatabaseService()
@@ -0,0 +1,158 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import select, delete, func
+
+from app.database import SessionDep
+from app.models.database import PermissionGrant, get_utc_now
+from app.schemas.permission_schemas import ScopeEnum
+from app.schemas.user_schemas import RoleEnum, DEFAULT_TENANT
+from app.services.change_service import record_change, PERMISSION_CHANGE
+from app.services.version_service import VersionService, permissions_version
+
+
+def as_utc(moment: datetime) -> datetime:
+    # SQLite возвращает время без часового пояса, храним его всегда в UTC
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment.astimezone(timezone.utc)
+
+
+def apply_grants(permissions: list[dict], grants: list[dict]) -> list[dict]:
+    # Грант только расширяет доступ: перекрывает запрет или более узкую область, "all" шире "own"
+    rules = {(perm["role"], perm["resource"], perm["action"]): dict(perm) for perm in permissions}
+    for grant in grants:
+        key = (grant["role"], grant["resource"], grant["action"])
+        rule = rules.get(key)
+        if rule is not None and rule["allowed"] and (
+            rule["scope"] == ScopeEnum.ALL.value or grant["scope"] == ScopeEnum.OWN.value
+        ):
+            continue
+        rules[key] = {
+            "role": grant["role"],
+            "resource": grant["resource"],
+            "action": grant["action"],
+            "allowed": True,
+            "scope": grant["scope"],
+            "granted": True
+        }
+    return list(rules.values())
+
+
+def serialize_grant(grant: PermissionGrant) -> dict:
+    return {
+        "id": grant.id,
+        "role": grant.role.value,
+        "resource": grant.resource,
+        "action": grant.action,
+        "scope": grant.scope.value,
+        "valid_from": as_utc(grant.valid_from).isoformat(),
+        "valid_until": as_utc(grant.valid_until).isoformat(),
+        "created_by": grant.created_by
+    }
+
+
+class GrantService:
+    def __init__(self, session: SessionDep):
+        self.session = session
+
+    async def get_grants(self, tenant: str = DEFAULT_TENANT, include_expired: bool = False) -> list[dict]:
+        query = select(PermissionGrant).where(PermissionGrant.tenant == tenant).order_by(PermissionGrant.valid_from)
+        if not include_expired:
+            query = query.where(PermissionGrant.valid_until > get_utc_now())
+        result = await self.session.execute(query)
+        return [serialize_grant(grant) for grant in result.scalars().all()]
+
+    async def get_active_grants(self, tenant: str, now: datetime) -> list[dict]:
+        query = select(PermissionGrant).where(
+            PermissionGrant.tenant == tenant,
+            PermissionGrant.valid_from <= now,
+            PermissionGrant.valid_until > now
+        )
+        result = await self.session.execute(query)
+        return [
+            {"role": grant.role.value, "resource": grant.resource, "action": grant.action, "scope": grant.scope.value}
+            for grant in result.scalars().all()
+        ]
+
+    async def get_next_change(self, tenant: str, now: datetime) -> datetime | None:
+        # Оба минимума берутся по индексам (tenant, valid_from) и (tenant, valid_until)
+        starts = select(func.min(PermissionGrant.valid_from)).where(
+            PermissionGrant.tenant == tenant, PermissionGrant.valid_from > now
+        )
+        ends = select(func.min(PermissionGrant.valid_until)).where(
+            PermissionGrant.tenant == tenant, PermissionGrant.valid_until > now
+        )
+        moments = [
+            (await self.session.execute(starts)).scalar_one_or_none(),
+            (await self.session.execute(ends)).scalar_one_or_none()
+        ]
+        moments = [as_utc(moment) for moment in moments if moment is not None]
+        return min(moments) if moments else None
+
+    async def create_grant(
+        self,
+        role: RoleEnum,
+        resource: str,
+        action: str,
+        valid_until: datetime,
+        valid_from: datetime | None = None,
+        scope: ScopeEnum = ScopeEnum.ALL,
+        tenant: str = DEFAULT_TENANT,
+        created_by: int | None = None
+    ) -> dict:
+        valid_from = as_utc(valid_from) if valid_from is not None else get_utc_now()
+        valid_until = as_utc(valid_until)
+        if valid_until <= valid_from:
+            raise HTTPException(status_code=400, detail="Окончание гранта должно быть позже его начала")
+        if valid_until <= get_utc_now():
+            raise HTTPException(status_code=400, detail="Грант уже истек")
+
+        grant = PermissionGrant(
+            tenant=tenant,
+            role=role,
+            resource=resource,
+            action=action,
+            scope=scope,
+            valid_from=valid_from,
+            valid_until=valid_until,
+            created_by=created_by
+        )
+        self.session.add(grant)
+        # Начало и окончание гранта не пишутся в журнал: подписчик сам планирует их по valid_from и valid_until
+        record_change(
+            self.session, PERMISSION_CHANGE, "granted", tenant,
+            role=role.value, resource=resource, action=action,
+            valid_from=valid_from.isoformat(), valid_until=valid_until.isoformat()
+        )
+        await VersionService(self.session).bump(permissions_version(tenant))
+        await self.session.commit()
+        await self.session.refresh(grant)
+        return serialize_grant(grant)
+
+    async def delete_grant(self, grant_id: int, tenant: str = DEFAULT_TENANT) -> dict:
+        result = await self.session.execute(
+            delete(PermissionGrant).where(
+                PermissionGrant.id == grant_id,
+                PermissionGrant.tenant == tenant
+            ).returning(PermissionGrant.role, PermissionGrant.resource, PermissionGrant.action)
+        )
+        grant = result.one_or_none()
+        if grant is None:
+            await self.session.rollback()
+            raise HTTPException(status_code=404, detail="Грант не найден")
+
+        record_change(
+            self.session, PERMISSION_CHANGE, "revoked", tenant,
+            role=grant.role.value, resource=grant.resource, action=grant.action
+        )
+        await VersionService(self.session).bump(permissions_version(tenant))
+        await self.session.commit()
+        return {"message": "Грант отозван"}
+
+    async def purge_expired(self, retention_days: int) -> int:
+        # Истекшие гранты уже не входят в снимок, поэтому их удаление не меняет версию политики
+        cutoff = get_utc_now() - timedelta(days=retention_days)
+        result = await self.session.execute(
+            delete(PermissionGrant).where(PermissionGrant.valid_until < cutoff)
+        )
+        await self.session.commit()
+        return result.rowcount
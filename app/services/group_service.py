@@ -0,0 +1,165 @@
+from fastapi import HTTPException
+from sqlalchemy import select, update, delete, union, func, Select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.bitsets import RoleSet, intern_role_set
+from app.database import SessionDep
+from app.models.database import UserModel, UserRoleModel, GroupModel, GroupRoleModel, GroupMemberModel
+from app.schemas.user_schemas import RoleEnum, DEFAULT_TENANT
+from app.services.change_service import record_change, USER_CHANGE
+from app.services.version_service import VersionService, USERS_VERSION
+
+
+async def load_role_sets(session: AsyncSession, primary_roles: dict[int, RoleEnum]) -> dict[int, RoleSet]:
+    user_ids = list(primary_roles)
+    direct = select(UserRoleModel.user_id, UserRoleModel.role).where(UserRoleModel.user_id.in_(user_ids))
+    inherited = select(GroupMemberModel.user_id, GroupRoleModel.role).join(
+        GroupRoleModel, GroupRoleModel.group_id == GroupMemberModel.group_id
+    ).where(GroupMemberModel.user_id.in_(user_ids))
+    result = await session.execute(union(direct, inherited))
+
+    roles = {user_id: {role} for user_id, role in primary_roles.items()}
+    for user_id, role in result.all():
+        roles[user_id].add(RoleEnum(role))
+    return {user_id: intern_role_set(user_roles) for user_id, user_roles in roles.items()}
+
+
+class GroupService:
+    def __init__(self, session: SessionDep):
+        self.session = session
+
+    async def get_groups(self, tenant: str = DEFAULT_TENANT) -> list[dict]:
+        groups = await self.session.execute(
+            select(GroupModel.id, GroupModel.name).where(GroupModel.tenant == tenant).order_by(GroupModel.name)
+        )
+        roles = await self.session.execute(
+            select(GroupRoleModel.group_id, GroupRoleModel.role).join(
+                GroupModel, GroupModel.id == GroupRoleModel.group_id
+            ).where(GroupModel.tenant == tenant)
+        )
+        members = await self.session.execute(
+            select(GroupMemberModel.group_id, func.count()).join(
+                GroupModel, GroupModel.id == GroupMemberModel.group_id
+            ).where(GroupModel.tenant == tenant).group_by(GroupMemberModel.group_id)
+        )
+
+        group_roles: dict[int, list[str]] = {}
+        for group_id, role in roles.all():
+            group_roles.setdefault(group_id, []).append(role.value)
+        member_counts = dict(members.all())
+        return [
+            {"id": group_id, "name": name, "roles": group_roles.get(group_id, []), "members": member_counts.get(group_id, 0)}
+            for group_id, name in groups.all()
+        ]
+
+    async def create_group(self, name: str, roles: list[RoleEnum], tenant: str = DEFAULT_TENANT) -> dict:
+        query = insert(GroupModel).values(tenant=tenant, name=name).on_conflict_do_nothing(
+            index_elements=[GroupModel.tenant, GroupModel.name]
+        ).returning(GroupModel.id)
+        group_id = (await self.session.execute(query)).scalar_one_or_none()
+        if group_id is None:
+            await self.session.rollback()
+            raise HTTPException(status_code=409, detail=f"Группа {name} уже существует")
+
+        if roles:
+            await self.session.execute(insert(GroupRoleModel), [{"group_id": group_id, "role": role} for role in set(roles)])
+        await self.session.commit()
+        return {"id": group_id, "name": name, "roles": [role.value for role in set(roles)], "members": 0}
+
+    async def update_group_roles(self, group_id: int, roles: list[RoleEnum], tenant: str = DEFAULT_TENANT) -> dict:
+        group = await self._get_group(group_id, tenant)
+
+        await self.session.execute(delete(GroupRoleModel).where(GroupRoleModel.group_id == group_id))
+        if roles:
+            await self.session.execute(insert(GroupRoleModel), [{"group_id": group_id, "role": role} for role in set(roles)])
+        members = await self._invalidate_users(self._members_query(group_id), tenant)
+        await self.session.commit()
+        return {"id": group_id, "name": group.name, "roles": [role.value for role in set(roles)], "members": members}
+
+    async def delete_group(self, group_id: int, tenant: str = DEFAULT_TENANT) -> dict:
+        await self._get_group(group_id, tenant)
+
+        await self._invalidate_users(self._members_query(group_id), tenant)
+        # SQLite не включает внешние ключи по умолчанию, поэтому связи удаляем явно
+        await self.session.execute(delete(GroupMemberModel).where(GroupMemberModel.group_id == group_id))
+        await self.session.execute(delete(GroupRoleModel).where(GroupRoleModel.group_id == group_id))
+        await self.session.execute(delete(GroupModel).where(GroupModel.id == group_id))
+        await self.session.commit()
+        return {"message": "Группа удалена"}
+
+    async def add_member(self, group_id: int, user_id: int, tenant: str = DEFAULT_TENANT) -> dict:
+        await self._get_group(group_id, tenant)
+        await self._get_user(user_id, tenant)
+
+        await self.session.execute(
+            insert(GroupMemberModel).values(group_id=group_id, user_id=user_id).on_conflict_do_nothing()
+        )
+        await self._invalidate_users(select(UserModel.id).where(UserModel.id == user_id), tenant)
+        await self.session.commit()
+        return {"message": "Пользователь добавлен в группу"}
+
+    async def remove_member(self, group_id: int, user_id: int, tenant: str = DEFAULT_TENANT) -> dict:
+        await self._get_group(group_id, tenant)
+
+        result = await self.session.execute(
+            delete(GroupMemberModel).where(
+                GroupMemberModel.group_id == group_id,
+                GroupMemberModel.user_id == user_id
+            ).returning(GroupMemberModel.user_id)
+        )
+        if result.scalar_one_or_none() is None:
+            await self.session.rollback()
+            raise HTTPException(status_code=404, detail="Пользователь не состоит в группе")
+
+        await self._invalidate_users(select(UserModel.id).where(UserModel.id == user_id), tenant)
+        await self.session.commit()
+        return {"message": "Пользователь удален из группы"}
+
+    async def set_user_roles(self, user_id: int, roles: list[RoleEnum], tenant: str = DEFAULT_TENANT) -> dict:
+        user = await self._get_user(user_id, tenant)
+
+        # Основная роль хранится в users.role, здесь только дополнительные
+        extra_roles = set(roles) - {user.role}
+        await self.session.execute(delete(UserRoleModel).where(UserRoleModel.user_id == user_id))
+        if extra_roles:
+            await self.session.execute(insert(UserRoleModel), [{"user_id": user_id, "role": role} for role in extra_roles])
+        await self._invalidate_users(select(UserModel.id).where(UserModel.id == user_id), tenant)
+        await self.session.commit()
+        return {"id": user_id, "role": user.role.value, "roles": [role.value for role in extra_roles]}
+
+    async def _get_group(self, group_id: int, tenant: str) -> GroupModel:
+        result = await self.session.execute(
+            select(GroupModel).where(GroupModel.id == group_id, GroupModel.tenant == tenant)
+        )
+        group = result.scalar_one_or_none()
+        if group is None:
+            raise HTTPException(status_code=404, detail="Группа не найдена")
+        return group
+
+    async def _get_user(self, user_id: int, tenant: str) -> UserModel:
+        result = await self.session.execute(
+            select(UserModel).where(UserModel.id == user_id, UserModel.tenant == tenant)
+        )
+        user = result.scalar_one_or_none()
+        if user is None:
+            raise HTTPException(status_code=404, detail="Пользователь не найден")
+        return user
+
+    @staticmethod
+    def _members_query(group_id: int) -> Select:
+        return select(GroupMemberModel.user_id).where(GroupMemberModel.group_id == group_id)
+
+    async def _invalidate_users(self, user_ids: Select, tenant: str) -> int:
+        # Новая версия состояния заставит все процессы перечитать набор ролей затронутых пользователей
+        version = await VersionService(self.session).bump(USERS_VERSION)
+        result = await self.session.execute(
+            update(UserModel).where(UserModel.id.in_(user_ids)).values(
+                state_version=version,
+                updated_at=UserModel.updated_at
+            ).returning(UserModel.id)
+        )
+        changed = result.scalars().all()
+        for user_id in changed:
+            record_change(self.session, USER_CHANGE, "roles", tenant, user_id=user_id)
+        return len(changed)
@@ -0,0 +1,46 @@
+from app.core.security import verify_access_token
+from app.database import SessionDep
+from app.schemas.user_schemas import DEFAULT_TENANT
+from app.services.authorization_service import AuthorizationService
+
+INACTIVE = {"active": False}
+
+
+class IntrospectionService:
+    def __init__(self, session: SessionDep):
+        self.session = session
+
+    async def introspect(self, token: str) -> dict:
+        results = await self.introspect_many([token])
+        return results[0]
+
+    async def introspect_many(self, tokens: list[str]) -> list[dict]:
+        payloads = {}
+        for token in tokens:
+            if token not in payloads:
+                payload = verify_access_token(token)
+                if payload is None or payload.get("type") != "access" or not str(payload.get("sub", "")).isdigit():
+                    payload = None
+                payloads[token] = payload
+
+        user_ids = {int(payload["sub"]) for payload in payloads.values() if payload is not None}
+        states = await AuthorizationService(self.session).get_user_states(user_ids) if user_ids else {}
+
+        results = []
+        for token in tokens:
+            payload = payloads[token]
+            state = states.get(int(payload["sub"])) if payload is not None else None
+            if state is None or not state[1]:
+                results.append(INACTIVE)
+                continue
+            results.append({
+                "active": True,
+                "sub": payload["sub"],
+                "role": state[0].value,
+                "roles": sorted(role.value for role in state[2]),
+                "tenant": payload.get("tenant", DEFAULT_TENANT),
+                "token_type": payload["type"],
+                "exp": payload["exp"],
+                "iat": payload.get("iat")
+            })
+        return results
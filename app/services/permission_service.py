@@ -1,9 +1,30 @@
+from typing import Any, Iterable
+
 from fastapi import HTTPException
-from sqlalchemy import select
+from sqlalchemy import select, true, false, ColumnElement
 
 from app.models.database import UserModel, Permissions
-from app.schemas.user_schemas import RoleEnum
+from app.schemas.user_schemas import RoleEnum, DEFAULT_TENANT
+from app.schemas.permission_schemas import ScopeEnum
 from app.database import SessionDep
+from app.services.change_service import record_change, PERMISSION_CHANGE
+from app.services.version_service import VersionService, permissions_version
+
+
+def build_scope_filter(scope: ScopeEnum | None, user_id: int, owner_column: Any) -> ColumnElement[bool]:
+    if scope is None:
+        return false()
+    if scope == ScopeEnum.OWN:
+        return owner_column == user_id
+    return true()
+
+
+def filter_ids_by_scope(scope: ScopeEnum | None, user_id: int, owners: dict[int, int]) -> list[int]:
+    if scope is None:
+        return []
+    if scope == ScopeEnum.OWN:
+        return [object_id for object_id, owner_id in owners.items() if owner_id == user_id]
+    return list(owners)
 
 
 class PermissionService:
@@ -11,6 +32,24 @@ class PermissionService:
         self.session = session
 
     async def check_permission(self, user_id: int, resource: str, action: str) -> bool:
+        permission = await self._get_rule(user_id, resource, action)
+        return permission.allowed
+
+    async def get_access_scope(self, user_id: int, resource: str, action: str) -> ScopeEnum | None:
+        permission = await self._get_rule(user_id, resource, action)
+        if not permission.allowed:
+            return None
+        return permission.scope
+
+    async def build_access_filter(self, user_id: int, resource: str, action: str, owner_column: Any) -> ColumnElement[bool]:
+        scope = await self.get_access_scope(user_id, resource, action)
+        return build_scope_filter(scope, user_id, owner_column)
+
+    async def filter_allowed(self, user_id: int, resource: str, action: str, owners: dict[int, int]) -> list[int]:
+        scope = await self.get_access_scope(user_id, resource, action)
+        return filter_ids_by_scope(scope, user_id, owners)
+
+    async def _get_rule(self, user_id: int, resource: str, action: str) -> Permissions:
         user_query = select(UserModel).where(UserModel.id == user_id)
         user_result = await self.session.execute(user_query)
         user = user_result.scalar_one_or_none()
@@ -18,45 +57,37 @@ class PermissionService:
         if not user or not user.is_active:
             raise HTTPException(status_code=404, detail="Пользователь не найден или удален")
         
-        permission_query = select(Permissions).where(
-            Permissions.role == user.role,
-            Permissions.resource == resource,
-            Permissions.action == action
-        )
-        permission_result = await self.session.execute(permission_query)
-        permission = permission_result.scalar_one_or_none()
+        permission = await self.find_rule(user.role, resource, action, user.tenant)
         
         if not permission:
             raise HTTPException(status_code=404, detail="Разрешение не найдено")
         
-        return permission.allowed
+        return permission
 
-    async def get_user_permissions(self, user_id: int) -> list[dict]:
-        user_query = select(UserModel).where(UserModel.id == user_id)
-        user_result = await self.session.execute(user_query)
-        user = user_result.scalar_one_or_none()
-        
-        if not user or not user.is_active:
-            raise HTTPException(status_code=404, detail="Пользователь не найден или удален")
-        
-        permissions_query = select(Permissions).where(
-            Permissions.role == user.role,
-            Permissions.allowed == True
+    async def find_rule(self, role: RoleEnum, resource: str, action: str, tenant: str = DEFAULT_TENANT) -> Permissions | None:
+        permission_query = select(Permissions).where(
+            Permissions.tenant == tenant,
+            Permissions.role == role,
+            Permissions.resource == resource,
+            Permissions.action == action
         )
-        permissions_result = await self.session.execute(permissions_query)
-        permissions = permissions_result.scalars().all()
-        
-        return [
-            {
-                "resource": perm.resource,
-                "action": perm.action,
-                "allowed": perm.allowed
-            }
-            for perm in permissions
-        ]
+        permission_result = await self.session.execute(permission_query)
+        return permission_result.scalar_one_or_none()
 
-    async def get_all_permissions(self) -> list[dict]:
-        query = select(Permissions)
+    async def find_rules(
+        self, roles: Iterable[RoleEnum], resource: str, action: str, tenant: str = DEFAULT_TENANT
+    ) -> list[Permissions]:
+        permission_query = select(Permissions).where(
+            Permissions.tenant == tenant,
+            Permissions.role.in_(list(roles)),
+            Permissions.resource == resource,
+            Permissions.action == action
+        ).order_by(Permissions.id)
+        permission_result = await self.session.execute(permission_query)
+        return list(permission_result.scalars().all())
+
+    async def get_all_permissions(self, tenant: str = DEFAULT_TENANT) -> list[dict]:
+        query = select(Permissions).where(Permissions.tenant == tenant)
         result = await self.session.execute(query)
         permissions = result.scalars().all()
         
@@ -66,13 +97,23 @@ class PermissionService:
                 "role": perm.role.value,
                 "resource": perm.resource,
                 "action": perm.action,
-                "allowed": perm.allowed
+                "allowed": perm.allowed,
+                "scope": perm.scope.value
             }
             for perm in permissions
         ]
 
-    async def create_permission(self, role: RoleEnum, resource: str, action: str, allowed: bool = True) -> dict:
+    async def create_permission(
+        self,
+        role: RoleEnum,
+        resource: str,
+        action: str,
+        allowed: bool = True,
+        scope: ScopeEnum = ScopeEnum.ALL,
+        tenant: str = DEFAULT_TENANT
+    ) -> dict:
         existing_query = select(Permissions).where(
+            Permissions.tenant == tenant,
             Permissions.role == role,
             Permissions.resource == resource,
             Permissions.action == action
@@ -85,12 +126,20 @@ class PermissionService:
             )
         
         new_permission = Permissions(
+            tenant=tenant,
             role=role,
             resource=resource,
             action=action,
-            allowed=allowed
+            allowed=allowed,
+            scope=scope
         )
         self.session.add(new_permission)
+        await self.session.flush()
+        record_change(
+            self.session, PERMISSION_CHANGE, "created", tenant,
+            id=new_permission.id, role=role.value, resource=resource, action=action
+        )
+        await VersionService(self.session).bump(permissions_version(tenant))
         await self.session.commit()
         await self.session.refresh(new_permission)
         
@@ -99,11 +148,18 @@ class PermissionService:
             "role": new_permission.role.value,
             "resource": new_permission.resource,
             "action": new_permission.action,
-            "allowed": new_permission.allowed
+            "allowed": new_permission.allowed,
+            "scope": new_permission.scope.value
         }
 
-    async def update_permission(self, permission_id: int, allowed: bool = None) -> dict:
-        query = select(Permissions).where(Permissions.id == permission_id)
+    async def update_permission(
+        self,
+        permission_id: int,
+        allowed: bool = None,
+        scope: ScopeEnum | None = None,
+        tenant: str = DEFAULT_TENANT
+    ) -> dict:
+        query = select(Permissions).where(Permissions.id == permission_id, Permissions.tenant == tenant)
         result = await self.session.execute(query)
         permission = result.scalar_one_or_none()
         
@@ -112,7 +168,15 @@ class PermissionService:
         
         if allowed is not None:
             permission.allowed = allowed
-        
+
+        if scope is not None:
+            permission.scope = scope
+
+        record_change(
+            self.session, PERMISSION_CHANGE, "updated", tenant,
+            id=permission.id, role=permission.role.value, resource=permission.resource, action=permission.action
+        )
+        await VersionService(self.session).bump(permissions_version(tenant))
         await self.session.commit()
         await self.session.refresh(permission)
         
@@ -121,18 +185,24 @@ class PermissionService:
             "role": permission.role.value,
             "resource": permission.resource,
             "action": permission.action,
-            "allowed": permission.allowed
+            "allowed": permission.allowed,
+            "scope": permission.scope.value
         }
 
-    async def delete_permission(self, permission_id: int) -> dict:
-        query = select(Permissions).where(Permissions.id == permission_id)
+    async def delete_permission(self, permission_id: int, tenant: str = DEFAULT_TENANT) -> dict:
+        query = select(Permissions).where(Permissions.id == permission_id, Permissions.tenant == tenant)
         result = await self.session.execute(query)
         permission = result.scalar_one_or_none()
         
         if not permission:
             raise HTTPException(status_code=404, detail="Правило доступа не найдено")
         
-        self.session.delete(permission)
+        await self.session.delete(permission)
+        record_change(
+            self.session, PERMISSION_CHANGE, "deleted", tenant,
+            id=permission.id, role=permission.role.value, resource=permission.resource, action=permission.action
+        )
+        await VersionService(self.session).bump(permissions_version(tenant))
         await self.session.commit()
         
         return {"message": "Правило доступа удалено"}
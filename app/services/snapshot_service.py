@@ -0,0 +1,239 @@
+import asyncio
+import hashlib
+import heapq
+import logging
+import os
+import tempfile
+import time
+from typing import Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_cache_settings, get_grant_settings
+from app.core.cache import single_flight
+from app.core.resilience import DATABASE_ERRORS
+from app.core.snapshot import SnapshotFile, PolicySnapshot, build_snapshot
+from app.database import engine, new_session
+from app.models.database import get_utc_now
+from app.schemas.user_schemas import DEFAULT_TENANT
+from app.services.grant_service import GrantService, apply_grants
+from app.services.permission_service import PermissionService
+from app.services.version_service import VersionService, version_watcher, permissions_version
+
+logger = logging.getLogger(__name__)
+
+REBUILD_WAIT_SECONDS = 0.01
+POLICY_REFRESH_KEY = "policy-snapshot"
+
+SnapshotListener = Callable[[str, PolicySnapshot], None]
+
+
+def get_default_snapshot_path() -> str:
+    # Экземпляры с разными базами на одном хосте не должны делить снимок
+    database = engine.url.database
+    identity = engine.url.set(database=os.path.abspath(database)) if database else engine.url
+    digest = hashlib.sha256(identity.render_as_string(hide_password=False).encode()).hexdigest()[:16]
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, f"auth_policy.{digest}.snapshot")
+
+
+class PolicySnapshotHolder:
+    def __init__(
+        self,
+        path: str,
+        max_stale_ms: int = 0,
+        tenant: str = DEFAULT_TENANT,
+        on_load: SnapshotListener | None = None
+    ):
+        self.tenant = tenant
+        self.on_load = on_load
+        self.version_name = permissions_version(tenant)
+        self.refresh_key = (POLICY_REFRESH_KEY, tenant)
+        self.file = SnapshotFile(path)
+        self.current: PolicySnapshot | None = None
+        self.max_stale = max_stale_ms / 1000
+        self.stale_since: float | None = None
+
+    @staticmethod
+    def is_fresh(snapshot: PolicySnapshot | None, version: int) -> bool:
+        # Снимок устаревает и при смене версии, и когда наступает начало или окончание какого-либо гранта.
+        # Версия сравнивается на равенство: после пересоздания базы счетчик начинается заново
+        return snapshot is not None and snapshot.version == version and not snapshot.is_expired(time.time())
+
+    async def get(self, session: AsyncSession) -> PolicySnapshot:
+        versions = await version_watcher.refresh(session)
+        version = versions.get(self.version_name, 0)
+
+        while not self.is_fresh(self.current, version):
+            if self.stale_since is None:
+                self.stale_since = time.monotonic()
+            try:
+                await single_flight.run(self.refresh_key, lambda: self.load(version))
+                if not self.is_fresh(self.current, version):
+                    # Снимок собран по другой версии: наблюдатель отстал от базы или счетчик версий сброшен
+                    versions = await version_watcher.refresh(session, force=True)
+                    version = versions.get(self.version_name, 0)
+            except DATABASE_ERRORS:
+                if self.current is not None and time.monotonic() - self.stale_since <= self.max_stale:
+                    return self.current
+                raise
+
+        self.stale_since = None
+        return self.current
+
+    async def load(self, version: int) -> None:
+        snapshot = self.file.load()
+        if not self.is_fresh(snapshot, version):
+            with self.file.try_lock() as locked:
+                if locked and not self.is_fresh(self.file.load(), version):
+                    async with new_session() as session:
+                        await self.rebuild(session)
+            if not locked:
+                await asyncio.sleep(REBUILD_WAIT_SECONDS)
+            snapshot = self.file.load()
+        if snapshot is not None:
+            self.current = snapshot
+            if self.on_load is not None:
+                self.on_load(self.tenant, snapshot)
+
+    def reset(self) -> None:
+        self.file.discard()
+        self.current = None
+        self.stale_since = None
+
+    async def rebuild(self, session: AsyncSession) -> None:
+        now = get_utc_now()
+        versions = await VersionService(session).get_versions()
+        permissions = await PermissionService(session).get_all_permissions(self.tenant)
+        grant_service = GrantService(session)
+        grants = await grant_service.get_active_grants(self.tenant, now)
+        next_change = await grant_service.get_next_change(self.tenant, now)
+        self.file.publish(build_snapshot(
+            versions.get(self.version_name, 0),
+            apply_grants(permissions, grants),
+            next_change.timestamp() if next_change is not None else 0.0
+        ))
+
+
+class PolicySnapshotRegistry:
+    def __init__(self, path: str, max_stale_ms: int = 0):
+        self.path = path
+        self.max_stale_ms = max_stale_ms
+        self.holders: dict[str, PolicySnapshotHolder] = {}
+        self.listeners: list[SnapshotListener] = []
+
+    def subscribe(self, listener: SnapshotListener) -> None:
+        self.listeners.append(listener)
+
+    def notify(self, tenant: str, snapshot: PolicySnapshot) -> None:
+        for listener in self.listeners:
+            listener(tenant, snapshot)
+
+    def for_tenant(self, tenant: str) -> PolicySnapshotHolder:
+        holder = self.holders.get(tenant)
+        if holder is None:
+            # Отдельный файл, блокировка и ключ обновления: перестройка одного арендатора не задевает остальных
+            path = self.path if tenant == DEFAULT_TENANT else f"{self.path}.{tenant}"
+            holder = PolicySnapshotHolder(path, self.max_stale_ms, tenant, self.notify)
+            self.holders[tenant] = holder
+        return holder
+
+    async def get(self, session: AsyncSession, tenant: str = DEFAULT_TENANT) -> PolicySnapshot:
+        return await self.for_tenant(tenant).get(session)
+
+    def reset(self) -> None:
+        for holder in self.holders.values():
+            holder.reset()
+        # Снимки арендаторов, которые этот процесс еще не загружал, тоже устарели
+        directory, name = os.path.split(self.path)
+        for file_name in os.listdir(directory or "."):
+            if file_name.startswith(f"{name}.") and not file_name.endswith((".lock", ".tmp")):
+                SnapshotFile(os.path.join(directory, file_name)).discard()
+
+
+class GrantScheduler:
+    def __init__(self, registry: PolicySnapshotRegistry, retention_days: int, retry_ms: int):
+        self.registry = registry
+        self.retention_days = retention_days
+        self.retry = retry_ms / 1000
+        # Куча моментов (unix time), когда снимок арендатора перестает быть верным
+        self.heap: list[tuple[float, str]] = []
+        self.scheduled: set[tuple[float, str]] = set()
+        self.wakeup = asyncio.Event()
+        self.task: asyncio.Task | None = None
+        self.refreshed = 0
+        self.purged = 0
+
+    def track(self, tenant: str, snapshot: PolicySnapshot) -> None:
+        if snapshot.expires_at:
+            self.schedule(snapshot.expires_at, tenant)
+
+    def schedule(self, at: float, tenant: str) -> None:
+        entry = (at, tenant)
+        if entry in self.scheduled:
+            return
+        self.scheduled.add(entry)
+        heapq.heappush(self.heap, entry)
+        self.wakeup.set()
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def run(self) -> None:
+        while True:
+            timeout = max(self.heap[0][0] - time.time(), 0) if self.heap else None
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.refresh_due()
+
+    async def refresh_due(self) -> None:
+        now = time.time()
+        tenants = set()
+        while self.heap and self.heap[0][0] <= now:
+            entry = heapq.heappop(self.heap)
+            self.scheduled.discard(entry)
+            tenants.add(entry[1])
+
+        for tenant in tenants:
+            try:
+                # Перестраиваем снимок сразу в момент границы, не дожидаясь первого запроса
+                async with new_session() as session:
+                    await self.registry.get(session, tenant)
+                    self.refreshed += 1
+                    self.purged += await GrantService(session).purge_expired(self.retention_days)
+            except DATABASE_ERRORS as error:
+                logger.warning("Не удалось обновить политику арендатора %s: %s", tenant, error)
+                self.schedule(time.time() + self.retry, tenant)
+
+    def get_stats(self) -> dict:
+        return {
+            "scheduled": len(self.heap),
+            "next_change": self.heap[0][0] if self.heap else None,
+            "refreshed": self.refreshed,
+            "purged": self.purged
+        }
+
+
+policy_snapshot = PolicySnapshotRegistry(
+    get_cache_settings()["policy_snapshot_path"] or get_default_snapshot_path(),
+    get_cache_settings()["max_stale_ms"]
+)
+grant_scheduler = GrantScheduler(
+    policy_snapshot,
+    get_grant_settings()["retention_days"],
+    get_grant_settings()["retry_ms"]
+)
+policy_snapshot.subscribe(grant_scheduler.track)
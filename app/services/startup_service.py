@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable
+
+from sqlalchemy import select, func, text
+
+from app.config import validate_config
+from app.core.security import get_password_hash, verify_password
+from app.database import DatabaseService, engine, new_session
+from app.models.database import UserModel, Permissions
+from app.services.snapshot_service import policy_snapshot
+
+logger = logging.getLogger(__name__)
+
+Step = tuple[str, Callable[[], Awaitable[None]]]
+WARM_UP_RETRY_SECONDS = 0.5
+WARM_UP_MAX_RETRY_SECONDS = 30
+
+
+class ReadinessState:
+    def __init__(self):
+        self.ready = False
+        self.checks: dict[str, float] = {}
+        self.error: str | None = None
+
+
+readiness = ReadinessState()
+
+
+def get_pool_stats() -> dict:
+    pool = engine.pool
+    stats = {"class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if method is not None:
+            stats[name] = method()
+    return stats
+
+
+class StartupService:
+    def __init__(self, db_service: DatabaseService):
+        self.db_service = db_service
+        self.task: asyncio.Task | None = None
+
+    async def prepare(self) -> None:
+        # Конфигурация и схема нужны до приема запросов: ошибка здесь останавливает запуск
+        readiness.ready = False
+        readiness.error = None
+        await self.run_steps([
+            ("config", self.check_config),
+            ("schema", self.create_schema),
+        ])
+
+    async def warm_caches(self) -> None:
+        await self.run_steps([
+            ("pool", self.warm_pool),
+            ("pages", self.warm_pages),
+            ("bcrypt", self.warm_bcrypt),
+            ("policy", self.preload_policy),
+        ])
+        readiness.ready = True
+
+    async def run_steps(self, steps: list[Step]) -> None:
+        for name, step in steps:
+            started = time.perf_counter()
+            await step()
+            readiness.checks[name] = round((time.perf_counter() - started) * 1000, 2)
+
+    def start(self) -> None:
+        # Прогрев идет в фоне: сервер уже принимает запросы, а /readyz отвечает 503, пока прогрев не закончится
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self) -> None:
+        delay = WARM_UP_RETRY_SECONDS
+        while True:
+            try:
+                await self.warm_caches()
+            except Exception as error:
+                # Временная ошибка (например, заблокированная база) не должна навсегда выводить экземпляр из ротации
+                readiness.error = str(error)
+                logger.exception("Не удалось прогреть приложение, повтор через %.1f с", delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, WARM_UP_MAX_RETRY_SECONDS)
+                continue
+            readiness.error = None
+            return
+
+    async def shutdown(self) -> None:
+        readiness.ready = False
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await engine.dispose()
+
+    async def check_config(self) -> None:
+        validate_config()
+
+    async def create_schema(self) -> None:
+        await self.db_service.create_database()
+
+    async def warm_pool(self) -> None:
+        size = get_pool_stats().get("size", 1)
+        connections = []
+        try:
+            for _ in range(size):
+                connection = await engine.connect()
+                connections.append(connection)
+                await connection.execute(text("SELECT 1"))
+        finally:
+            for connection in connections:
+                await connection.close()
+
+    async def warm_pages(self) -> None:
+        async with new_session() as session:
+            await session.execute(select(func.count()).select_from(UserModel).where(UserModel.is_active == True))
+            await session.execute(select(func.count()).select_from(Permissions))
+
+    async def warm_bcrypt(self) -> None:
+        verify_password("warm-up", get_password_hash("warm-up"))
+
+    async def preload_policy(self) -> None:
+        async with new_session() as session:
+            await policy_snapshot.get(session)
@@ -1,10 +1,16 @@
 from fastapi import HTTPException
-from sqlalchemy import select, update, func
+from sqlalchemy import select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import IntegrityError
 
 from app.models.database import UserModel
+from app.core.resilience import DATABASE_ERRORS
 from app.core.security import verify_password, get_password_hash
 from app.database import SessionDep
-from app.schemas.user_schemas import UserSchema, LoginSchema, ResponseSchema, UpdateSchema
+from app.schemas.user_schemas import UserSchema, LoginSchema, UpdateSchema
+from app.services.change_service import record_change, USER_CHANGE
+from app.services.group_service import load_role_sets
+from app.services.version_service import VersionService, USERS_VERSION, permissions_version
 
 
 class UserService:
@@ -12,34 +18,52 @@ class UserService:
         self.session = session
 
     async def register_user(self, data: UserSchema) -> dict:
-        query = select(UserModel).where(UserModel.email == data.email)
-        user = await self.session.execute(query)
-        if user.scalar_one_or_none():
-            raise HTTPException(status_code=409, detail="Такой пользователь уже существует")
-
         if data.password != data.password_confirm:
             raise HTTPException(status_code=400, detail="Пароли не совпадают")
 
-        new_user = UserModel(
+        query = insert(UserModel).values(
+            tenant=data.tenant,
             name=data.name,
             surname=data.surname,
             email=data.email,
             hashed_password=get_password_hash(data.password),
             role=data.role,
             is_active=True
-        )
-        self.session.add(new_user)
+        ).on_conflict_do_nothing(
+            index_elements=[UserModel.tenant, UserModel.email]
+        ).returning(UserModel.id, UserModel.tenant, UserModel.email, UserModel.role, UserModel.is_active)
+        result = await self.session.execute(query)
+        new_user = result.one_or_none()
+        if new_user is None:
+            await self.session.rollback()
+            raise HTTPException(status_code=409, detail="Такой пользователь уже существует")
+
         await self.session.commit()
-        await self.session.refresh(new_user)
         return {
             "id": new_user.id,
+            "tenant": new_user.tenant,
             "email": new_user.email,
             "role": new_user.role,
             "is_active": new_user.is_active
         }
 
-    async def login_user(self, data: LoginSchema) -> dict:
-        query = select(UserModel).where(UserModel.email == data.email)
+    async def get_user_tenant(self, user_id: int) -> str | None:
+        result = await self.session.execute(select(UserModel.tenant).where(UserModel.id == user_id))
+        return result.scalar_one_or_none()
+
+    async def get_token_claims(self, user: UserModel) -> dict:
+        # Версии читаются до ролей: изменение между запросами увеличит state_version пользователя выше uv
+        versions = await VersionService(self.session).get_versions()
+        role_sets = await load_role_sets(self.session, {user.id: user.role})
+        return {
+            "role": user.role.value,
+            "roles": sorted(role.value for role in role_sets[user.id]),
+            "uv": versions.get(USERS_VERSION, 0),
+            "pv": versions.get(permissions_version(user.tenant), 0)
+        }
+
+    async def login_user(self, data: LoginSchema) -> UserModel:
+        query = select(UserModel).where(UserModel.tenant == data.tenant, UserModel.email == data.email)
         result = await self.session.execute(query)
         user = result.scalar_one_or_none()
         
@@ -52,44 +76,61 @@ class UserService:
         if not user.is_active:
             raise HTTPException(status_code=401, detail="Пользователь неактивен")
         
-        return ResponseSchema.model_validate(user)
+        return user
 
     async def update_user(self, data: UpdateSchema, user_id: int) -> dict:
-        query = select(UserModel).where(UserModel.id == user_id)
-        result = await self.session.execute(query)
-        user = result.scalar_one_or_none()
-
-        if not user:
-            raise HTTPException(status_code=404, detail="Пользователь не найден")
-        
-        if not user.is_active:
-            raise HTTPException(status_code=401, detail="Пользователь неактивен")
-
         update_data = data.model_dump(exclude_unset=True)
-        query = update(UserModel).where(UserModel.id == user_id).values(**update_data)
         try:
-            await self.session.execute(query)
-            await self.session.commit()
-            return {"message": "Данные изменены"}
+            update_data["state_version"] = await VersionService(self.session).bump(USERS_VERSION)
+            query = update(UserModel).where(
+                UserModel.id == user_id,
+                UserModel.is_active == True
+            ).values(**update_data).returning(UserModel.tenant)
+            result = await self.session.execute(query)
+            tenant = result.scalar_one_or_none()
+        except IntegrityError:
+            await self.session.rollback()
+            raise HTTPException(status_code=409, detail="Такой пользователь уже существует")
+        except DATABASE_ERRORS:
+            # Недоступность базы отдается обработчику приложения, который отвечает 503
+            await self.session.rollback()
+            raise
         except Exception as e:
             await self.session.rollback()
             raise HTTPException(status_code=500, detail=f"Изменение не удалось: {str(e)}")
 
-    async def delete_user(self, user_id: int) -> dict:
-        query = select(UserModel).where(UserModel.id == user_id, UserModel.is_active==True)
-        result = await self.session.execute(query)
-        user = result.scalar_one_or_none()
+        if tenant is None:
+            await self.session.rollback()
+            query = select(UserModel.is_active).where(UserModel.id == user_id)
+            result = await self.session.execute(query)
+            if result.scalar_one_or_none() is None:
+                raise HTTPException(status_code=404, detail="Пользователь не найден")
+            raise HTTPException(status_code=401, detail="Пользователь неактивен")
 
-        if not user:
-            raise HTTPException(404, "Пользователь не найден или уже удален")
-        
-        try:
-            user.is_active = False
-            user.updated_at = func.now()
-            await self.session.commit()
+        record_change(self.session, USER_CHANGE, "updated", tenant, user_id=user_id)
+        await self.session.commit()
+        return {"message": "Данные изменены"}
 
-            return {"message": "Пользователь удален", "email": user.email}
-        
+    async def delete_user(self, user_id: int) -> dict:
+        try:
+            version = await VersionService(self.session).bump(USERS_VERSION)
+            query = update(UserModel).where(
+                UserModel.id == user_id,
+                UserModel.is_active == True
+            ).values(is_active=False, state_version=version).returning(UserModel.email, UserModel.tenant)
+            result = await self.session.execute(query)
+            deleted = result.one_or_none()
+        except DATABASE_ERRORS:
+            await self.session.rollback()
+            raise
         except Exception as e:
             await self.session.rollback()
             raise HTTPException(status_code=500, detail=f"Ошибка при удалении: {str(e)}")
+
+        if deleted is None:
+            await self.session.rollback()
+            raise HTTPException(404, "Пользователь не найден или уже удален")
+
+        record_change(self.session, USER_CHANGE, "deactivated", deleted.tenant, user_id=user_id)
+        await self.session.commit()
+        return {"message": "Пользователь удален", "email": deleted.email}
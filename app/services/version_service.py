@@ -0,0 +1,134 @@
+import time
+from typing import Awaitable, Callable
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_cache_settings
+from app.core.cache import user_state_cache
+from app.core.resilience import DATABASE_ERRORS
+from app.database import SessionDep
+from app.models.database import PolicyVersion, UserModel
+from app.schemas.user_schemas import DEFAULT_TENANT
+
+PERMISSIONS_VERSION = "permissions"
+USERS_VERSION = "users"
+
+
+def permissions_version(tenant: str) -> str:
+    # Политика каждого арендатора версионируется отдельно, арендатор по умолчанию сохраняет прежнее имя
+    if tenant == DEFAULT_TENANT:
+        return PERMISSIONS_VERSION
+    return f"{PERMISSIONS_VERSION}:{tenant}"
+
+Listener = Callable[[AsyncSession, int | None, int], Awaitable[None]]
+
+
+class VersionService:
+    def __init__(self, session: SessionDep):
+        self.session = session
+
+    async def bump(self, name: str) -> int:
+        query = insert(PolicyVersion).values(name=name, version=1).on_conflict_do_update(
+            index_elements=[PolicyVersion.name],
+            set_={"version": PolicyVersion.version + 1}
+        ).returning(PolicyVersion.version)
+        result = await self.session.execute(query)
+        version_watcher.expire()
+        return result.scalar_one()
+
+    async def get_versions(self) -> dict[str, int]:
+        result = await self.session.execute(select(PolicyVersion.name, PolicyVersion.version))
+        return {name: version for name, version in result.all()}
+
+
+class UserVersionTracker:
+    # Версии пользователей, изменившихся после baseline: по ним проверяется актуальность ролей из токена
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.baseline: int | None = None
+        self.changed: dict[int, int] = {}
+
+    def reset(self, baseline: int | None) -> None:
+        self.baseline = baseline
+        self.changed = {}
+
+    def record(self, user_id: int, version: int, current: int) -> None:
+        if len(self.changed) >= self.max_entries:
+            # Вместо вытеснения сдвигаем baseline: более старые токены просто пойдут в базу
+            self.reset(current)
+            return
+        self.changed[user_id] = max(version, self.changed.get(user_id, 0))
+
+    def is_current(self, user_id: int, version: int) -> bool:
+        # Изменения до baseline не отслеживаются, поэтому токен должен быть выпущен не раньше него
+        if self.baseline is None or version < self.baseline:
+            return False
+        return self.changed.get(user_id, 0) <= version
+
+
+class VersionWatcher:
+    def __init__(self, interval_ms: int, max_stale_ms: int = 0):
+        self.interval = interval_ms / 1000
+        self.max_stale = max_stale_ms / 1000
+        self.versions: dict[str, int] = {}
+        self.checked_at = float("-inf")
+        self.succeeded_at = float("-inf")
+        self.listeners: dict[str, list[Listener]] = {}
+
+    def subscribe(self, name: str, listener: Listener) -> None:
+        self.listeners.setdefault(name, []).append(listener)
+
+    def expire(self) -> None:
+        self.checked_at = float("-inf")
+
+    def reset(self) -> None:
+        self.versions = {}
+        self.expire()
+
+    async def refresh(self, session: AsyncSession, force: bool = False) -> dict[str, int]:
+        now = time.monotonic()
+        if not force and now - self.checked_at < self.interval:
+            return self.versions
+
+        self.checked_at = now
+        try:
+            versions = await VersionService(session).get_versions()
+            for name, listeners in self.listeners.items():
+                previous = self.versions.get(name)
+                current = versions.get(name, 0)
+                if previous != current:
+                    for listener in listeners:
+                        await listener(session, previous, current)
+        except DATABASE_ERRORS:
+            await session.rollback()
+            if now - self.succeeded_at <= self.max_stale:
+                return self.versions
+            raise
+
+        self.succeeded_at = now
+        self.versions = {name: versions.get(name, 0) for name in self.listeners} | versions
+        return self.versions
+
+
+async def invalidate_users(session: AsyncSession, previous: int | None, current: int) -> None:
+    if previous is None:
+        user_state_cache.mark_all_stale()
+        user_versions.reset(current)
+        return
+
+    result = await session.execute(
+        select(UserModel.id, UserModel.state_version).where(UserModel.state_version > previous)
+    )
+    for user_id, state_version in result.all():
+        user_state_cache.mark_stale(user_id)
+        user_versions.record(user_id, state_version, current)
+
+
+user_versions = UserVersionTracker(get_cache_settings()["max_entries"])
+version_watcher = VersionWatcher(
+    get_cache_settings()["version_check_interval_ms"],
+    get_cache_settings()["max_stale_ms"]
+)
+version_watcher.subscribe(USERS_VERSION, invalidate_users)
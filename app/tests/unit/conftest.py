@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import patch, MagicMock, AsyncMock, Mock
+from unittest.mock import patch, MagicMock, AsyncMock
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas.user_schemas import RoleEnum
@@ -23,6 +23,15 @@ def mock_db_session():
     mock_result.scalar_one_or_none.return_value = None
     mock_session.execute.return_value = mock_result
     mock_session.commit = AsyncMock()
-    mock_session.delete = Mock()
+    mock_session.delete = AsyncMock()
     mock_session.refresh = AsyncMock()
     return mock_session
+
+@pytest.fixture
+def make_session_factory():
+    # Подменяет new_session: "async with new_session() as session" отдает переданную сессию
+    def make(session):
+        factory = MagicMock()
+        factory.return_value.__aenter__.return_value = session
+        return factory
+    return make
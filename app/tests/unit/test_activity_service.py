@@ -0,0 +1,77 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.services.activity_service import ActivityTracker
+
+
+def test_touches_are_coalesced_per_user():
+    tracker = ActivityTracker(flush_interval_ms=1000, batch_size=10)
+
+    tracker.touch_login(1)
+    for _ in range(5):
+        tracker.touch_seen(1)
+    tracker.touch_seen(2)
+
+    assert set(tracker.logins) == {1}
+    assert set(tracker.seen) == {1, 2}
+    assert tracker.seen[1] >= tracker.logins[1]
+
+@pytest.mark.asyncio
+async def test_flush_issues_one_update_per_chunk(make_session_factory):
+    tracker = ActivityTracker(flush_interval_ms=1000, batch_size=2)
+    session = AsyncMock()
+    for user_id in range(3):
+        tracker.touch_seen(user_id)
+    tracker.touch_login(1)
+
+    with patch("app.services.activity_service.new_session", make_session_factory(session)):
+        await tracker.flush()
+
+    assert session.execute.await_count == 2
+    session.commit.assert_awaited_once()
+    statement = str(session.execute.await_args_list[0].args[0])
+    assert "last_login_at" in statement
+    assert "updated_at=users.updated_at" in statement
+    assert not tracker.seen and not tracker.logins
+
+@pytest.mark.asyncio
+async def test_flush_skips_database_without_activity():
+    tracker = ActivityTracker(flush_interval_ms=1000, batch_size=2)
+    factory = MagicMock()
+
+    with patch("app.services.activity_service.new_session", factory):
+        await tracker.flush()
+
+    factory.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_flush_restores_marks_when_database_locked(make_session_factory):
+    tracker = ActivityTracker(flush_interval_ms=1000, batch_size=10)
+    session = AsyncMock()
+    session.execute.side_effect = OperationalError("UPDATE", {}, Exception("database is locked"))
+    tracker.touch_login(1)
+    marked = tracker.seen[1]
+
+    with patch("app.services.activity_service.new_session", make_session_factory(session)):
+        await tracker.flush()
+
+    assert tracker.seen == {1: marked}
+    assert 1 in tracker.logins
+
+@pytest.mark.asyncio
+async def test_flush_survives_unexpected_error(make_session_factory):
+    tracker = ActivityTracker(flush_interval_ms=1000, batch_size=10)
+    session = AsyncMock()
+    session.execute.side_effect = [IntegrityError("UPDATE", {}, Exception("constraint failed")), None]
+    tracker.touch_seen(1)
+
+    with patch("app.services.activity_service.new_session", make_session_factory(session)):
+        await tracker.flush()
+        assert not tracker.seen
+
+        tracker.touch_seen(2)
+        await tracker.flush()
+
+    assert session.execute.await_count == 2
+    session.commit.assert_awaited_once()
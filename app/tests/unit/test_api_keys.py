@@ -0,0 +1,127 @@
+import time
+import pytest
+from types import SimpleNamespace
+from fastapi import HTTPException
+from unittest.mock import AsyncMock, patch
+
+from app.api.dependencies import get_current_identity, check_access_scope, require_admin_identity
+from app.core.api_keys import generate_api_key, parse_api_key_prefix, hash_api_key, verify_api_key
+from app.schemas.user_schemas import RoleEnum
+from app.services.api_key_service import (
+    ApiKeyService, ApiKeyRecord, api_key_cache, unknown_api_key_cache, load_api_key_record
+)
+
+
+def make_request(api_key: str):
+    return SimpleNamespace(headers={"x-api-key": api_key}, cookies={}, state=SimpleNamespace())
+
+def make_record(raw_key: str, expires_at: float | None = None) -> ApiKeyRecord:
+    return ApiKeyRecord(1, 7, "default", hash_api_key(raw_key), frozenset({("orders", "read")}), expires_at)
+
+@pytest.fixture(autouse=True)
+def clear_api_key_cache():
+    api_key_cache.clear()
+    unknown_api_key_cache.clear()
+    yield
+    api_key_cache.clear()
+    unknown_api_key_cache.clear()
+
+def test_generated_key_carries_prefix():
+    prefix, raw_key = generate_api_key()
+
+    assert parse_api_key_prefix(raw_key) == prefix
+    assert verify_api_key(raw_key, hash_api_key(raw_key))
+    assert not verify_api_key(raw_key + "x", hash_api_key(raw_key))
+    assert parse_api_key_prefix("Bearer abc") is None
+
+@pytest.mark.asyncio
+async def test_authenticate_loads_prefix_once():
+    prefix, raw_key = generate_api_key()
+    service = ApiKeyService(AsyncMock())
+
+    async def load(key_prefix):
+        record = make_record(raw_key)
+        api_key_cache.set(key_prefix, record)
+        return record
+
+    with patch("app.services.api_key_service.version_watcher.refresh", AsyncMock()), \
+            patch("app.services.api_key_service.load_api_key_record", AsyncMock(side_effect=load)) as load_record:
+        first = await service.authenticate(raw_key)
+        second = await service.authenticate(raw_key)
+        wrong = await service.authenticate(f"ak_{prefix}_wrong")
+
+    assert first is second
+    assert first.user_id == 7
+    assert wrong is None
+    load_record.assert_awaited_once_with(prefix)
+
+@pytest.mark.asyncio
+async def test_authenticate_rejects_expired_and_unknown_keys():
+    _, raw_key = generate_api_key()
+    _, unknown_key = generate_api_key()
+    service = ApiKeyService(AsyncMock())
+    records = {parse_api_key_prefix(raw_key): make_record(raw_key, expires_at=time.time() - 1)}
+
+    with patch("app.services.api_key_service.version_watcher.refresh", AsyncMock()), \
+            patch("app.services.api_key_service.load_api_key_record", AsyncMock(side_effect=records.get)):
+        assert await service.authenticate(raw_key) is None
+        assert await service.authenticate(unknown_key) is None
+
+@pytest.mark.asyncio
+async def test_unknown_prefixes_do_not_evict_known_keys(mock_db_session, make_session_factory):
+    prefix, _ = generate_api_key()
+    api_key_cache.set(prefix, ApiKeyRecord(1, 7, "default", "hash", frozenset(), None))
+
+    with patch("app.services.api_key_service.new_session", make_session_factory(mock_db_session)):
+        for _ in range(unknown_api_key_cache.max_entries + 1):
+            assert await load_api_key_record(generate_api_key()[0]) is None
+
+    assert api_key_cache.get(prefix).user_id == 7
+    assert len(unknown_api_key_cache.data) == unknown_api_key_cache.max_entries
+
+@pytest.mark.asyncio
+async def test_create_api_key_rejects_empty_scopes(mock_db_session):
+    service = ApiKeyService(mock_db_session)
+
+    with pytest.raises(HTTPException) as exc_err:
+        await service.create_api_key(7, "etl", [])
+
+    assert exc_err.value.status_code == 400
+    mock_db_session.commit.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_identity_from_api_key_limits_scopes():
+    _, raw_key = generate_api_key()
+    request = make_request(raw_key)
+    state = (RoleEnum.MANAGER, True, frozenset({RoleEnum.MANAGER}))
+
+    with patch("app.api.dependencies.ApiKeyService.authenticate", AsyncMock(return_value=make_record(raw_key))), \
+            patch("app.api.dependencies.get_traced_user_state", AsyncMock(return_value=state)):
+        identity = await get_current_identity(request, AsyncMock())
+
+        with pytest.raises(HTTPException) as exc_err:
+            await check_access_scope("products", "delete", request, AsyncMock())
+
+    assert identity == (7, frozenset({RoleEnum.MANAGER}), "default")
+    assert request.state.api_key_scopes == frozenset({("orders", "read")})
+    assert exc_err.value.status_code == 403
+
+@pytest.mark.asyncio
+async def test_api_key_cannot_reach_admin_endpoints():
+    _, raw_key = generate_api_key()
+    state = (RoleEnum.ADMIN, True, frozenset({RoleEnum.ADMIN}))
+
+    with patch("app.api.dependencies.ApiKeyService.authenticate", AsyncMock(return_value=make_record(raw_key))), \
+            patch("app.api.dependencies.get_traced_user_state", AsyncMock(return_value=state)):
+        with pytest.raises(HTTPException) as exc_err:
+            await require_admin_identity(make_request(raw_key), AsyncMock())
+
+    assert exc_err.value.status_code == 403
+
+@pytest.mark.asyncio
+async def test_invalid_api_key_returns_unauthorized():
+    with patch("app.api.dependencies.ApiKeyService.authenticate", AsyncMock(return_value=None)):
+        with pytest.raises(HTTPException) as exc_err:
+            await get_current_identity(make_request("ak_bad"), AsyncMock())
+
+    assert exc_err.value.status_code == 401
@@ -0,0 +1,60 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from sqlalchemy import insert, delete
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.models.database import UserModel
+from app.services.archive_service import UserArchiver, archive_email
+
+
+def test_archive_email_policies():
+    assert archive_email("User@Example.com", "keep") == "User@Example.com"
+    assert archive_email("User@Example.com", "hash") == archive_email("user@example.com", "hash")
+    assert archive_email("user@example.com", "hash").startswith("sha256:")
+
+@pytest.mark.asyncio
+async def test_archive_runs_batches_until_short_batch():
+    archiver = UserArchiver(after_days=30, batch_size=2, pause_ms=0, email_policy="hash")
+    progress = []
+
+    with patch.object(archiver, "archive_batch", AsyncMock(side_effect=[2, 2, 1])) as archive_batch:
+        stats = await archiver.archive(progress=progress.append)
+
+    assert archive_batch.await_count == 3
+    assert stats["archived"] == 5
+    assert [item["archived"] for item in progress] == [2, 4, 5]
+
+@pytest.mark.asyncio
+async def test_archive_respects_max_batches():
+    archiver = UserArchiver(after_days=30, batch_size=2, pause_ms=0, email_policy="hash")
+
+    with patch.object(archiver, "archive_batch", AsyncMock(return_value=2)) as archive_batch:
+        stats = await archiver.archive(max_batches=2)
+
+    assert archive_batch.await_count == 2
+    assert stats == {"batches": 2, "archived": 4, "elapsed_ms": stats["elapsed_ms"]}
+
+@pytest.mark.asyncio
+async def test_archive_stops_when_nothing_to_move():
+    archiver = UserArchiver(after_days=30, batch_size=2, pause_ms=0, email_policy="hash")
+
+    with patch.object(archiver, "archive_batch", AsyncMock(return_value=0)):
+        stats = await archiver.archive()
+
+    assert stats["batches"] == 0
+    assert stats["archived"] == 0
+
+@pytest.mark.asyncio
+async def test_user_ids_are_not_reused_after_archiving(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'users.db'}")
+    user = {"name": "a", "surname": "b", "email": "a@b.c", "hashed_password": "h"}
+    try:
+        async with engine.begin() as connection:
+            await connection.run_sync(UserModel.__table__.create)
+            first = (await connection.execute(insert(UserModel).returning(UserModel.id), user)).scalar_one()
+            await connection.execute(delete(UserModel).where(UserModel.id == first))
+            second = (await connection.execute(insert(UserModel).returning(UserModel.id), user)).scalar_one()
+    finally:
+        await engine.dispose()
+
+    assert second > first
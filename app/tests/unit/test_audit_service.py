@@ -0,0 +1,75 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.services.audit_service import AuditLog, ACCESS_EVENT
+
+
+def test_record_drops_new_events_when_full():
+    audit = AuditLog(enabled=True, max_size=2, batch_size=10, flush_interval_ms=1000)
+
+    for index in range(3):
+        audit.record(ACCESS_EVENT, True, user_id=index)
+
+    assert [event["user_id"] for event in audit.events] == [0, 1]
+    assert audit.dropped == 1
+
+def test_record_is_noop_when_disabled():
+    audit = AuditLog(enabled=False, max_size=2, batch_size=10, flush_interval_ms=1000)
+
+    audit.record(ACCESS_EVENT, True, user_id=1)
+
+    assert not audit.events
+
+def test_record_wakes_writer_on_full_batch():
+    audit = AuditLog(enabled=True, max_size=10, batch_size=2, flush_interval_ms=1000)
+
+    audit.record(ACCESS_EVENT, True)
+    assert not audit.wakeup.is_set()
+    audit.record(ACCESS_EVENT, False)
+    assert audit.wakeup.is_set()
+
+@pytest.mark.asyncio
+async def test_flush_writes_multi_row_batches(make_session_factory):
+    audit = AuditLog(enabled=True, max_size=10, batch_size=2, flush_interval_ms=1000)
+    session = AsyncMock()
+    for index in range(3):
+        audit.record(ACCESS_EVENT, True, user_id=index)
+
+    with patch("app.services.audit_service.new_session", make_session_factory(session)):
+        await audit.flush()
+
+    assert session.execute.await_count == 2
+    assert len(session.execute.await_args_list[0].args[1]) == 2
+    assert audit.written == 3
+    assert not audit.events
+
+@pytest.mark.asyncio
+async def test_flush_keeps_batch_when_database_locked(make_session_factory):
+    audit = AuditLog(enabled=True, max_size=10, batch_size=2, flush_interval_ms=1000)
+    session = AsyncMock()
+    session.execute.side_effect = OperationalError("INSERT", {}, Exception("database is locked"))
+    for index in range(3):
+        audit.record(ACCESS_EVENT, True, user_id=index)
+
+    with patch("app.services.audit_service.new_session", make_session_factory(session)):
+        await audit.flush()
+
+    assert [event["user_id"] for event in audit.events] == [0, 1, 2]
+    assert audit.failed_flushes == 1
+
+@pytest.mark.asyncio
+async def test_flush_drops_batch_on_unexpected_error(make_session_factory):
+    audit = AuditLog(enabled=True, max_size=10, batch_size=2, flush_interval_ms=1000)
+    session = AsyncMock()
+    session.execute.side_effect = [IntegrityError("INSERT", {}, Exception("constraint failed")), None]
+    for index in range(3):
+        audit.record(ACCESS_EVENT, True, user_id=index)
+
+    with patch("app.services.audit_service.new_session", make_session_factory(session)):
+        await audit.flush()
+
+    assert not audit.events
+    assert audit.dropped == 2
+    assert audit.written == 1
+    assert audit.failed_flushes == 1
@@ -0,0 +1,136 @@
+import struct
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.core.authz_protocol import (
+    AuthzSocketClient, DecisionStatus, ProtocolError, FRAME_LENGTH,
+    encode_request, decode_request, encode_response, decode_response
+)
+from app.schemas.permission_schemas import ScopeEnum
+from app.schemas.user_schemas import RoleEnum
+from app.services.authz_socket_service import AuthzSocketServer, evaluate_checks
+
+
+def test_request_roundtrip():
+    frame = encode_request(7, [("token", "orders", "read"), ("другой", "products", "delete")])
+
+    assert FRAME_LENGTH.unpack_from(frame)[0] == len(frame) - FRAME_LENGTH.size
+    assert decode_request(frame[FRAME_LENGTH.size:]) == (
+        7, [("token", "orders", "read"), ("другой", "products", "delete")]
+    )
+
+def test_response_roundtrip():
+    results = [(DecisionStatus.ALLOW, ScopeEnum.OWN, 3), (DecisionStatus.DENY, None, 3)]
+    frame = encode_response(9, results)
+
+    assert decode_response(frame[FRAME_LENGTH.size:]) == (9, results)
+
+def test_decode_request_rejects_truncated_frame():
+    frame = encode_request(1, [("token", "orders", "read")])
+
+    with pytest.raises(ProtocolError):
+        decode_request(frame[FRAME_LENGTH.size:-1])
+
+@pytest.mark.asyncio
+async def test_evaluate_checks_maps_decisions():
+    rules = {"read": (True, ScopeEnum.OWN), "delete": (False, ScopeEnum.ALL), "export": None}
+
+    with patch("app.services.authz_socket_service.verify_access_token",
+               side_effect=lambda token: {"sub": "5"} if token == "good" else None), \
+            patch("app.services.authz_socket_service.AuthorizationService.get_user_state",
+                  AsyncMock(return_value=(RoleEnum.USER, True, frozenset({RoleEnum.USER})))) as get_user_state, \
+            patch("app.services.authz_socket_service.AuthorizationService.get_rule",
+                  AsyncMock(side_effect=lambda roles, resource, action, tenant: rules[action])), \
+            patch("app.services.authz_socket_service.audit_log.record") as record:
+        results = await evaluate_checks([
+            ("good", "orders", "read"), ("good", "orders", "delete"),
+            ("good", "orders", "export"), ("bad", "orders", "read"),
+        ])
+
+    assert results == [
+        (DecisionStatus.ALLOW, ScopeEnum.OWN, 5),
+        (DecisionStatus.DENY, None, 5),
+        (DecisionStatus.NOT_FOUND, None, 5),
+        (DecisionStatus.UNAUTHENTICATED, None, 0),
+    ]
+    get_user_state.assert_awaited_once_with(5)
+    assert [(call.args[1], call.kwargs["action"], call.kwargs.get("detail")) for call in record.call_args_list] == [
+        (True, "read", None), (False, "delete", None), (False, "export", "not_found")
+    ]
+
+@pytest.mark.asyncio
+async def test_client_pipelines_requests_over_socket(tmp_path):
+    path = str(tmp_path / "authz.sock")
+    server = AuthzSocketServer(path, max_batch=2)
+    allow = [(DecisionStatus.ALLOW, ScopeEnum.ALL, 1)]
+
+    with patch("app.services.authz_socket_service.evaluate_checks",
+               AsyncMock(side_effect=lambda checks: allow * len(checks))):
+        await server.start()
+        client = AuthzSocketClient(path)
+        await client.connect()
+        try:
+            single = await client.check("token", "products", "read")
+            batch = await client.check_many([("token", "products", "read")] * 2)
+            too_big = await client.check_many([("token", "products", "read")] * 3)
+        finally:
+            await client.close()
+            await server.stop()
+
+    assert single == allow[0]
+    assert batch == allow * 2
+    assert [status for status, _, _ in too_big] == [DecisionStatus.BAD_REQUEST] * 3
+
+@pytest.mark.asyncio
+async def test_second_worker_does_not_take_over_socket(tmp_path):
+    path = str(tmp_path / "authz.sock")
+    owner = AuthzSocketServer(path, max_batch=2)
+    other = AuthzSocketServer(path, max_batch=2)
+
+    await owner.start()
+    try:
+        await other.start()
+        await other.stop()
+
+        assert other.server is None
+        client = AuthzSocketClient(path)
+        await client.connect()
+        await client.close()
+    finally:
+        await owner.stop()
+
+    await other.start()
+    assert other.server is not None
+    await other.stop()
+
+@pytest.mark.asyncio
+async def test_malformed_body_is_answered_with_its_request_id():
+    server = AuthzSocketServer("unused.sock", max_batch=2)
+    body = encode_request(42, [("token", "orders", "read")])[FRAME_LENGTH.size:-1]
+
+    request_id, results = decode_response((await server.handle_frame(body))[FRAME_LENGTH.size:])
+
+    assert request_id == 42
+    assert results == [(DecisionStatus.BAD_REQUEST, None, 0)]
+    with pytest.raises(ProtocolError):
+        await server.handle_frame(b"\x01")
+
+@pytest.mark.asyncio
+async def test_unexpected_error_becomes_error_status():
+    server = AuthzSocketServer("unused.sock", max_batch=2)
+    body = encode_request(3, [("token", "orders", "read")])[FRAME_LENGTH.size:]
+
+    with patch("app.services.authz_socket_service.evaluate_checks", AsyncMock(side_effect=RuntimeError("boom"))):
+        _, results = decode_response((await server.handle_frame(body))[FRAME_LENGTH.size:])
+
+    assert results == [(DecisionStatus.ERROR, None, 0)]
+
+@pytest.mark.asyncio
+async def test_client_does_not_leak_pending_on_encode_error():
+    client = AuthzSocketClient("unused.sock")
+    client.writer = AsyncMock()
+
+    with pytest.raises(struct.error):
+        await client.check("token", "x" * 256, "read")
+
+    assert client.pending == {}
@@ -0,0 +1,91 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.models.database import ChangeEvent
+from app.services.change_service import (
+    ChangeFeed, ChangeSubscription, format_sse, stream_changes, USER_CHANGE
+)
+from app.services.users_service import UserService
+
+
+def make_change(seq: int, tenant: str = "default", kind: str = USER_CHANGE) -> dict:
+    return {"seq": seq, "tenant": tenant, "kind": kind, "event": "roles", "data": {"user_id": seq}}
+
+async def collect(stream, count: int) -> list[bytes]:
+    chunks = []
+    async for chunk in stream:
+        chunks.append(chunk)
+        if len(chunks) == count:
+            break
+    await stream.aclose()
+    return chunks
+
+def test_format_sse_sets_id_and_event():
+    assert format_sse("permission", {"seq": 7}, 7) == b'id: 7\nevent: permission\ndata: {"seq":7}\n\n'
+    assert format_sse("sync", {"seq": 0}).startswith(b"event: sync\n")
+
+def test_publish_routes_by_tenant():
+    feed = ChangeFeed(poll_interval_ms=100, queue_size=10, batch_size=10, retention=100)
+    default = ChangeSubscription("default", 10)
+    acme = ChangeSubscription("acme", 10)
+    feed.subscriptions = {default, acme}
+    feed.last_id = 0
+
+    feed.publish(make_change(1))
+    feed.publish(make_change(2, tenant="acme"))
+
+    assert default.queue.get_nowait()["seq"] == 1
+    assert acme.queue.get_nowait()["seq"] == 2
+    assert feed.last_id == 2
+
+def test_slow_subscriber_is_dropped_on_overflow():
+    feed = ChangeFeed(poll_interval_ms=100, queue_size=1, batch_size=10, retention=100)
+    subscription = ChangeSubscription("default", 1)
+    feed.subscriptions = {subscription}
+    feed.last_id = 0
+
+    feed.publish(make_change(1))
+    feed.publish(make_change(2))
+
+    assert subscription.overflowed
+    assert feed.subscriptions == set()
+    assert feed.overflows == 1
+    assert feed.last_id is None
+
+@pytest.mark.asyncio
+async def test_stream_replays_after_last_event_id_and_skips_duplicates(make_session_factory):
+    subscription = ChangeSubscription("default", 10)
+    subscription.deliver(make_change(5))
+    subscription.deliver(make_change(6))
+
+    with patch("app.services.change_service.new_session", make_session_factory(AsyncMock())), \
+            patch("app.services.change_service.change_feed.subscribe", AsyncMock(return_value=subscription)), \
+            patch("app.services.change_service.ChangeService.get_bounds", AsyncMock(return_value=(1, 5))), \
+            patch("app.services.change_service.ChangeService.get_changes",
+                  AsyncMock(return_value=[make_change(4), make_change(5)])) as get_changes:
+        chunks = await collect(stream_changes("default", 3, keepalive_ms=1000), 3)
+
+    assert [chunk.split(b"\n")[0] for chunk in chunks] == [b"id: 4", b"id: 5", b"id: 6"]
+    get_changes.assert_awaited_once_with("default", 3, 5, 500)
+
+@pytest.mark.asyncio
+async def test_stream_requests_reset_when_log_was_trimmed(make_session_factory):
+    subscription = ChangeSubscription("default", 10)
+
+    with patch("app.services.change_service.new_session", make_session_factory(AsyncMock())), \
+            patch("app.services.change_service.change_feed.subscribe", AsyncMock(return_value=subscription)), \
+            patch("app.services.change_service.ChangeService.get_bounds", AsyncMock(return_value=(50, 80))):
+        chunks = await collect(stream_changes("default", 10, keepalive_ms=1000), 1)
+
+    assert chunks == [b'id: 80\nevent: reset\ndata: {"seq":80}\n\n']
+
+@pytest.mark.asyncio
+async def test_deactivation_is_recorded_in_same_transaction(mock_db_session):
+    mock_db_session.execute.return_value.one_or_none.return_value = MagicMock(email="a@b.c", tenant="acme")
+
+    await UserService(mock_db_session).delete_user(3)
+
+    change = mock_db_session.add.call_args[0][0]
+    assert isinstance(change, ChangeEvent)
+    assert (change.tenant, change.kind, change.event, change.data) == ("acme", USER_CHANGE, "deactivated", {"user_id": 3})
+    mock_db_session.commit.assert_awaited_once()
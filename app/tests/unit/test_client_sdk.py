@@ -0,0 +1,138 @@
+import json
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from urllib.error import HTTPError
+
+from app.config import get_auth_data
+from app.core.security import create_access_token
+from client import AuthClient, AccessDenied, PermissionNotFound, PolicyUnavailable, UserInactive
+
+POLICY = {
+    "versions": {"permissions": 1, "users": 1},
+    "algorithm": "HS256",
+    "permissions": [
+        {"role": "Пользователь", "resource": "orders", "action": "read", "allowed": True, "scope": "own"},
+        {"role": "Пользователь", "resource": "orders", "action": "delete", "allowed": False, "scope": "all"},
+    ]
+}
+
+
+def make_response(body: dict, etag: str = '"v1"'):
+    response = MagicMock()
+    response.read.return_value = json.dumps(body).encode()
+    response.headers = {"ETag": etag}
+    response.__enter__.return_value = response
+    return response
+
+def make_client() -> AuthClient:
+    client = AuthClient("http://auth", "secret", secret_key=get_auth_data()["secret_key"])
+    with patch("client.auth_client.urlopen", return_value=make_response(POLICY)):
+        client.refresh()
+    return client
+
+def test_check_permission_uses_local_rules():
+    client = make_client()
+
+    assert client.check_permission("Пользователь", "orders", "read") is True
+    assert client.check_permission("Пользователь", "orders", "delete") is False
+    with pytest.raises(PermissionNotFound):
+        client.check_permission("Пользователь", "reports", "read")
+
+def test_check_before_refresh_raises():
+    with pytest.raises(PolicyUnavailable):
+        AuthClient("http://auth", "secret", secret_key=get_auth_data()["secret_key"]).check_permission("Пользователь", "orders", "read")
+
+def test_refresh_sends_etag_and_keeps_rules_on_304():
+    client = make_client()
+    not_modified = HTTPError("http://auth/auth/policy", 304, "Not Modified", {}, None)
+
+    with patch("client.auth_client.urlopen", side_effect=not_modified) as urlopen:
+        assert client.refresh() is False
+
+    assert urlopen.call_args.args[0].get_header("If-none-match") == '"v1"'
+    assert client.check_permission("Пользователь", "orders", "read") is True
+
+def test_authorize_introspects_once_per_user():
+    client = make_client()
+    token = create_access_token({"sub": "3"})
+    introspection = make_response({"active": True, "sub": "3", "role": "Пользователь"})
+
+    with patch("client.auth_client.urlopen", return_value=introspection) as urlopen:
+        assert client.authorize(token, "orders", "read") == (3, "own")
+        with pytest.raises(AccessDenied):
+            client.authorize(token, "orders", "delete")
+
+    assert urlopen.call_count == 1
+
+def test_authorize_rejects_inactive_user():
+    client = make_client()
+    token = create_access_token({"sub": "4"})
+
+    with patch("client.auth_client.urlopen", return_value=make_response({"active": False})):
+        with pytest.raises(UserInactive):
+            client.authorize(token, "orders", "read")
+
+def test_users_version_change_drops_cached_roles():
+    client = make_client()
+    client.users["3"] = (("Пользователь",), float("inf"))
+    changed = dict(POLICY, versions={"permissions": 1, "users": 2})
+
+    with patch("client.auth_client.urlopen", return_value=make_response(changed, '"v2"')):
+        client.refresh()
+
+    assert client.users == {}
+
+def test_authorize_unions_user_roles():
+    client = make_client()
+    client.rules[("Менеджер", "orders", "read")] = (True, "all")
+    client.rules[("Менеджер", "orders", "delete")] = (False, "all")
+    token = create_access_token({"sub": "5"})
+    introspection = make_response({"active": True, "sub": "5", "role": "Пользователь", "roles": ["Менеджер", "Пользователь"]})
+
+    with patch("client.auth_client.urlopen", return_value=introspection):
+        assert client.authorize(token, "orders", "read") == (5, "all")
+        with pytest.raises(AccessDenied):
+            client.authorize(token, "orders", "delete")
+
+def test_refresh_delay_follows_policy_expiry():
+    client = make_client()
+    assert client.next_refresh_delay() == client.refresh_interval
+
+    client.expires_at = time.time() + 1
+    assert 0 < client.next_refresh_delay() <= 1
+
+    client.expires_at = time.time() - 1
+    assert client.next_refresh_delay() == 0
+
+def test_authorize_trusts_current_role_claims():
+    client = make_client()
+    token = create_access_token({"sub": "3", "role": "Пользователь", "roles": ["Пользователь"], "uv": 1, "pv": 1})
+
+    with patch("client.auth_client.urlopen") as urlopen:
+        assert client.authorize(token, "orders", "read") == (3, "own")
+
+    urlopen.assert_not_called()
+
+def test_authorize_introspects_when_role_claims_are_stale():
+    client = make_client()
+    client.versions = {"permissions": 1, "users": 2}
+    token = create_access_token({"sub": "3", "role": "Менеджер", "roles": ["Менеджер"], "uv": 1, "pv": 1})
+    introspection = make_response({"active": True, "sub": "3", "role": "Пользователь"})
+
+    with patch("client.auth_client.urlopen", return_value=introspection) as urlopen:
+        assert client.authorize(token, "orders", "read") == (3, "own")
+
+    assert urlopen.call_count == 1
+
+def test_newer_policy_version_in_token_triggers_refresh():
+    client = make_client()
+    token = create_access_token({"sub": "3", "role": "Пользователь", "roles": ["Пользователь"], "uv": 2, "pv": 2})
+    newer = dict(POLICY, versions={"permissions": 2, "users": 2})
+
+    with patch("client.auth_client.urlopen", return_value=make_response(newer, '"v2"')) as urlopen:
+        client.authorize(token, "orders", "read")
+        client.authorize(token, "orders", "read")
+
+    assert urlopen.call_count == 1
+    assert client.versions["permissions"] == 2
@@ -0,0 +1,62 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import HTTPException
+
+from app.api.dependencies import get_request_token
+from app.api.forward_auth_router import verify
+from app.schemas.permission_schemas import ScopeEnum
+from app.schemas.user_schemas import RoleEnum
+
+
+def make_request(headers=None, cookies=None):
+    request = MagicMock()
+    request.headers = headers or {}
+    request.cookies = cookies or {}
+    return request
+
+def test_get_request_token_prefers_bearer_header():
+    request = make_request({"authorization": "Bearer header-token"}, {"user_access_token": "cookie-token"})
+
+    assert get_request_token(request) == "header-token"
+
+def test_get_request_token_falls_back_to_cookie():
+    request = make_request({"authorization": "Basic abc"}, {"user_access_token": "cookie-token"})
+
+    assert get_request_token(request) == "cookie-token"
+
+@pytest.mark.asyncio
+async def test_verify_returns_identity_headers():
+    request = make_request(cookies={"user_access_token": "token"})
+
+    with patch("app.api.forward_auth_router.authenticate_token", AsyncMock(return_value=(7, frozenset({RoleEnum.USER}), "default"))), \
+            patch("app.api.forward_auth_router.AuthorizationService.get_rule",
+                  AsyncMock(return_value=(True, ScopeEnum.OWN))), \
+            patch("app.api.forward_auth_router.audit_log.record") as record:
+        response = await verify(request, AsyncMock(), resource="orders", action="read")
+
+    assert response.status_code == 200
+    assert response.headers["x-user-id"] == "7"
+    assert response.headers["x-user-role"] == "USER"
+    assert response.headers["x-user-scope"] == "own"
+    assert response.headers["x-user-tenant"] == "default"
+    record.assert_called_once_with("access", True, user_id=7, resource="orders", action="read", tenant="default")
+
+@pytest.mark.asyncio
+async def test_verify_denies_missing_rule():
+    request = make_request(cookies={"user_access_token": "token"})
+
+    with patch("app.api.forward_auth_router.authenticate_token", AsyncMock(return_value=(7, frozenset({RoleEnum.USER}), "default"))), \
+            patch("app.api.forward_auth_router.AuthorizationService.get_rule", AsyncMock(return_value=None)), \
+            patch("app.api.forward_auth_router.audit_log.record") as record:
+        with pytest.raises(HTTPException) as error:
+            await verify(request, AsyncMock(), resource="orders", action="delete")
+
+    assert error.value.status_code == 403
+    assert record.call_args.kwargs["detail"] == "not_found"
+
+@pytest.mark.asyncio
+async def test_verify_requires_token():
+    with pytest.raises(HTTPException) as error:
+        await verify(make_request(), AsyncMock())
+
+    assert error.value.status_code == 401
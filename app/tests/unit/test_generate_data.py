@@ -0,0 +1,56 @@
+import itertools
+import pytest
+from unittest.mock import patch
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.core.security import verify_password
+from app.models.database import UserModel, Permissions
+from app.scripts.generate_data import generate_users, generate_permissions, build_password_pool, generate_data
+
+
+def test_generate_users_is_deterministic_and_lazy():
+    pool = ["hash0", "hash1"]
+
+    first = list(itertools.islice(generate_users(10 ** 9, 0, 7, pool), 5))
+    second = list(itertools.islice(generate_users(10 ** 9, 0, 7, pool), 5))
+
+    assert first == second
+    assert first[3]["email"] == "user00000003@load.test"
+    assert first[3]["hashed_password"] == "hash1"
+
+def test_generate_users_appends_same_data_from_start():
+    pool = ["hash0"]
+    full = list(generate_users(200, 0, 7, pool))
+    appended = list(generate_users(100, 100, 7, pool))
+
+    assert appended == full[100:]
+
+def test_generate_permissions_covers_every_role_and_action():
+    rules = list(generate_permissions(3, seed=1))
+    keys = {(rule["role"], rule["resource"], rule["action"]) for rule in rules}
+
+    assert len(rules) == len(keys) == 3 * 4 * 4
+
+def test_password_pool_is_verifiable():
+    pool = build_password_pool(2)
+
+    assert verify_password("password1", pool[1])
+
+@pytest.mark.asyncio
+async def test_generate_data_appends_to_existing_database(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'load.db'}")
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    with patch("app.scripts.generate_data.engine", engine), \
+            patch("app.scripts.generate_data.new_session", session_factory):
+        await generate_data(5, 0, 2, seed=7, batch_size=3, pool_size=1, reset=False)
+        await generate_data(5, 5, 2, seed=7, batch_size=3, pool_size=1, reset=False)
+
+        async with session_factory() as session:
+            emails = (await session.execute(select(UserModel.email).order_by(UserModel.id))).scalars().all()
+            rules = (await session.execute(select(func.count()).select_from(Permissions))).scalar_one()
+    await engine.dispose()
+
+    assert emails == [f"user{number:08d}@load.test" for number in range(10)]
+    assert rules == 2 * 4 * 4
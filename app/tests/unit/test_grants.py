@@ -0,0 +1,103 @@
+import time
+import pytest
+from datetime import timedelta
+from fastapi import HTTPException
+from sqlalchemy.exc import OperationalError
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.core.snapshot import PolicySnapshot, build_snapshot
+from app.models.database import get_utc_now
+from app.schemas.user_schemas import RoleEnum
+from app.services.grant_service import GrantService, apply_grants
+from app.services.snapshot_service import PolicySnapshotHolder, GrantScheduler
+
+
+def test_apply_grants_overrides_deny_and_widens_scope():
+    permissions = [
+        {"role": RoleEnum.MANAGER.value, "resource": "products", "action": "delete", "allowed": False, "scope": "all"},
+        {"role": RoleEnum.USER.value, "resource": "orders", "action": "read", "allowed": True, "scope": "own"},
+        {"role": RoleEnum.MANAGER.value, "resource": "products", "action": "read", "allowed": True, "scope": "all"},
+    ]
+    grants = [
+        {"role": RoleEnum.MANAGER.value, "resource": "products", "action": "read", "scope": "own"},
+        {"role": RoleEnum.MANAGER.value, "resource": "products", "action": "delete", "scope": "own"},
+        {"role": RoleEnum.MANAGER.value, "resource": "products", "action": "delete", "scope": "all"},
+        {"role": RoleEnum.MANAGER.value, "resource": "products", "action": "delete", "scope": "own"},
+    ]
+
+    rules = {(rule["role"], rule["resource"], rule["action"]): rule for rule in apply_grants(permissions, grants)}
+
+    assert rules[(RoleEnum.MANAGER.value, "products", "delete")]["allowed"] is True
+    assert rules[(RoleEnum.MANAGER.value, "products", "delete")]["scope"] == "all"
+    assert rules[(RoleEnum.USER.value, "orders", "read")]["scope"] == "own"
+    assert rules[(RoleEnum.MANAGER.value, "products", "read")]["scope"] == "all"
+    assert "granted" not in rules[(RoleEnum.MANAGER.value, "products", "read")]
+
+def test_snapshot_keeps_expiry():
+    snapshot = PolicySnapshot(build_snapshot(4, [], expires_at=1000.5))
+
+    assert snapshot.expires_at == 1000.5
+    assert not snapshot.is_expired(1000.0)
+    assert snapshot.is_expired(1000.5)
+    assert not PolicySnapshot(build_snapshot(4, [])).is_expired(float("inf"))
+
+def test_holder_treats_expired_snapshot_as_stale():
+    fresh = PolicySnapshot(build_snapshot(2, [], expires_at=time.time() + 60))
+    expired = PolicySnapshot(build_snapshot(2, [], expires_at=time.time() - 1))
+
+    assert PolicySnapshotHolder.is_fresh(fresh, 2)
+    assert not PolicySnapshotHolder.is_fresh(expired, 2)
+
+@pytest.mark.asyncio
+async def test_create_grant_rejects_inverted_interval(mock_db_session):
+    service = GrantService(mock_db_session)
+    now = get_utc_now()
+
+    with pytest.raises(HTTPException) as exc_err:
+        await service.create_grant(RoleEnum.MANAGER, "products", "delete", valid_until=now, valid_from=now + timedelta(hours=1))
+
+    assert exc_err.value.status_code == 400
+    mock_db_session.commit.assert_not_awaited()
+
+def test_scheduler_deduplicates_boundaries():
+    scheduler = GrantScheduler(MagicMock(), retention_days=30, retry_ms=1000)
+    snapshot = PolicySnapshot(build_snapshot(1, [], expires_at=500.0))
+
+    scheduler.track("default", snapshot)
+    scheduler.track("default", snapshot)
+    scheduler.track("acme", PolicySnapshot(build_snapshot(1, [])))
+
+    assert scheduler.heap == [(500.0, "default")]
+    assert scheduler.wakeup.is_set()
+
+@pytest.mark.asyncio
+async def test_scheduler_refreshes_only_due_tenants(make_session_factory):
+    registry = MagicMock()
+    registry.get = AsyncMock()
+    scheduler = GrantScheduler(registry, retention_days=30, retry_ms=1000)
+    scheduler.schedule(time.time() - 1, "default")
+    scheduler.schedule(time.time() + 60, "acme")
+    session = AsyncMock()
+
+    with patch("app.services.snapshot_service.new_session", make_session_factory(session)), \
+            patch("app.services.snapshot_service.GrantService.purge_expired", AsyncMock(return_value=2)):
+        await scheduler.refresh_due()
+
+    registry.get.assert_awaited_once_with(session, "default")
+    assert [tenant for _, tenant in scheduler.heap] == ["acme"]
+    assert scheduler.refreshed == 1
+    assert scheduler.purged == 2
+
+@pytest.mark.asyncio
+async def test_scheduler_retries_when_database_unavailable(make_session_factory):
+    registry = MagicMock()
+    registry.get = AsyncMock(side_effect=OperationalError("select", {}, Exception("locked")))
+    scheduler = GrantScheduler(registry, retention_days=30, retry_ms=1000)
+    scheduler.schedule(time.time() - 1, "default")
+
+    with patch("app.services.snapshot_service.new_session", make_session_factory(AsyncMock())):
+        await scheduler.refresh_due()
+
+    assert len(scheduler.heap) == 1
+    assert scheduler.heap[0][0] > time.time()
+    assert scheduler.refreshed == 0
@@ -0,0 +1,54 @@
+import hashlib
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, patch
+
+from app.core.security import create_access_token, verify_access_token, token_cache
+from app.schemas.user_schemas import RoleEnum
+from app.services.introspection_service import IntrospectionService
+
+
+def test_verify_access_token_does_not_cache_invalid_tokens():
+    token_cache.clear()
+    token = create_access_token({"sub": "1"})
+    verify_access_token(token)
+
+    for index in range(3):
+        assert verify_access_token(f"not-a-token-{index}") is None
+    assert list(token_cache.data) == [hashlib.sha256(token.encode()).digest()]
+
+def test_verify_access_token_drops_expired_tokens():
+    token_cache.clear()
+    token = "expired-token"
+    expired = int(datetime.now(timezone.utc).timestamp()) - 1
+    token_cache.set(hashlib.sha256(token.encode()).digest(), {"sub": "1", "type": "access", "exp": expired})
+
+    assert verify_access_token(token) is None
+    assert not token_cache.data
+
+@pytest.mark.asyncio
+async def test_introspect_many_dedupes_tokens_and_checks_user_state():
+    token_cache.clear()
+    active = create_access_token({"sub": "1"})
+    blocked = create_access_token({"sub": "2"})
+    states = {1: (RoleEnum.ADMIN, True, frozenset({RoleEnum.ADMIN})), 2: (RoleEnum.USER, False, frozenset({RoleEnum.USER}))}
+
+    with patch("app.services.introspection_service.AuthorizationService.get_user_states",
+               AsyncMock(return_value=states)) as get_user_states:
+        results = await IntrospectionService(AsyncMock()).introspect_many([active, blocked, active, "garbage"])
+
+    get_user_states.assert_awaited_once_with({1, 2})
+    assert results[0]["active"] is True
+    assert results[0]["sub"] == "1"
+    assert results[0]["role"] == RoleEnum.ADMIN.value
+    assert results[1] == {"active": False}
+    assert results[2] == results[0]
+    assert results[3] == {"active": False}
+
+@pytest.mark.asyncio
+async def test_introspect_skips_database_for_invalid_token():
+    with patch("app.services.introspection_service.AuthorizationService.get_user_states", AsyncMock()) as get_user_states:
+        result = await IntrospectionService(AsyncMock()).introspect("garbage")
+
+    assert result == {"active": False}
+    get_user_states.assert_not_awaited()
@@ -4,8 +4,11 @@ from unittest.mock import AsyncMock, MagicMock, patch, Mock
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.tests.unit.conftest import mock_db_session, mock_user_data
-from app.services.permission_service import PermissionService
+from app.api.router import get_orders
+from app.services.permission_service import PermissionService, build_scope_filter, filter_ids_by_scope
 from app.schemas.user_schemas import RoleEnum
+from app.schemas.permission_schemas import ScopeEnum
+from app.models.database import UserModel
 
 
 @pytest.fixture
@@ -92,71 +95,6 @@ async def test_check_permission_permission_not_found(mock_db_session, mock_user_
     assert exc_err.value.status_code == 404
     assert "Разрешение не найдено" in str(exc_err.value.detail)
 
-@pytest.mark.asyncio
-async def test_get_user_permissions_success(mock_db_session, mock_user_data):
-    user = mock_user_data
-    mock_permissions = [
-        Mock(resource="products", action="read", allowed=True),
-        Mock(resource="products", action="write", allowed=False)
-    ]
-
-    mock_db_session.execute.side_effect = [
-        Mock(scalar_one_or_none=Mock(return_value=user)),
-        Mock(scalars=Mock(return_value=Mock(all=Mock(return_value=mock_permissions))))
-    ]
-
-    mock_service = PermissionService(mock_db_session)
-
-    result = await mock_service.get_user_permissions(user.id)
-
-    for perm in result:
-        assert "resource" in perm
-        assert "action" in perm
-        assert "allowed" in perm
-
-@pytest.mark.asyncio
-async def test_get_user_permissions_user_not_found(mock_db_session, mock_user_data):
-    user = mock_user_data
-    mock_permissions = [
-        Mock(resource="products", action="read", allowed=True),
-        Mock(resource="products", action="write", allowed=False)
-    ]
-
-    mock_db_session.execute.side_effect = [
-        Mock(scalar_one_or_none=Mock(return_value=None)),
-        Mock(scalars=Mock(return_value=Mock(all=Mock(return_value=mock_permissions))))
-    ]
-
-    mock_service = PermissionService(mock_db_session)
-
-    with pytest.raises(HTTPException) as exc_err:
-        await mock_service.get_user_permissions(user.id)
-
-    assert exc_err.value.status_code == 404
-    assert "Пользователь не найден или удален" in str(exc_err.value.detail)
-
-@pytest.mark.asyncio
-async def test_get_user_permissions_user_not_active(mock_db_session, mock_user_data):
-    user = mock_user_data
-    user.is_active = False
-    mock_permissions = [
-        Mock(resource="products", action="read", allowed=True),
-        Mock(resource="products", action="write", allowed=False)
-    ]
-
-    mock_db_session.execute.side_effect = [
-        Mock(scalar_one_or_none=Mock(return_value=user)),
-        Mock(scalars=Mock(return_value=Mock(all=Mock(return_value=mock_permissions))))
-    ]
-
-    mock_service = PermissionService(mock_db_session)
-
-    with pytest.raises(HTTPException) as exc_err:
-        await mock_service.get_user_permissions(user.id)
-
-    assert exc_err.value.status_code == 404
-    assert "Пользователь не найден или удален" in str(exc_err.value.detail)
-
 @pytest.mark.asyncio
 async def test_get_all_permissions_success(mock_db_session):
     mock_permissions = [
@@ -200,11 +138,11 @@ async def test_create_permission_success(mock_db_session, mock_permission):
     permission_service = PermissionService(mock_db_session)
     result = await permission_service.create_permission(role, resource, action, allowed)
 
-    mock_db_session.add.assert_called_once()
+    assert mock_db_session.add.call_count == 2
     mock_db_session.commit.assert_awaited_once()
     mock_db_session.refresh.assert_awaited_once()
 
-    add_args = mock_db_session.add.call_args[0][0]
+    add_args = mock_db_session.add.call_args_list[0][0][0]
     refresh_args = mock_db_session.refresh.call_args[0][0]
     assert add_args == refresh_args
 
@@ -270,7 +208,7 @@ async def test_delete_permission_success(mock_permission, mock_db_session):
 
     result = await permission_service.delete_permission(permission_id)
     
-    mock_db_session.delete.assert_called_once_with(mock_permission)
+    mock_db_session.delete.assert_awaited_once_with(mock_permission)
     mock_db_session.commit.assert_awaited_once()
     assert "Правило доступа удалено" in result["message"]
 
@@ -287,3 +225,74 @@ async def test_delete_permission_not_found(mock_permission, mock_db_session):
 
     assert exc_err.value.status_code == 404
     assert "Правило доступа не найдено" in str(exc_err.value.detail)
+
+@pytest.mark.asyncio
+async def test_get_access_scope_own(mock_db_session, mock_user_data, mock_permission):
+    mock_permission.scope = ScopeEnum.OWN
+
+    mock_db_session.execute.side_effect = [
+        Mock(scalar_one_or_none=Mock(return_value=mock_user_data)),
+        Mock(scalar_one_or_none=Mock(return_value=mock_permission))
+    ]
+
+    permission_service = PermissionService(mock_db_session)
+    result = await permission_service.get_access_scope(1, "orders", "read")
+
+    assert result == ScopeEnum.OWN
+
+@pytest.mark.asyncio
+async def test_get_access_scope_denied(mock_db_session, mock_user_data, mock_permission):
+    mock_permission.allowed = False
+
+    mock_db_session.execute.side_effect = [
+        Mock(scalar_one_or_none=Mock(return_value=mock_user_data)),
+        Mock(scalar_one_or_none=Mock(return_value=mock_permission))
+    ]
+
+    permission_service = PermissionService(mock_db_session)
+    result = await permission_service.get_access_scope(1, "orders", "read")
+
+    assert result is None
+
+def test_build_scope_filter():
+    own_filter = build_scope_filter(ScopeEnum.OWN, 7, UserModel.id)
+    all_filter = build_scope_filter(ScopeEnum.ALL, 7, UserModel.id)
+    denied_filter = build_scope_filter(None, 7, UserModel.id)
+
+    assert str(own_filter.compile(compile_kwargs={"literal_binds": True})) == "users.id = 7"
+    assert str(all_filter.compile(compile_kwargs={"literal_binds": True})) == "true"
+    assert str(denied_filter.compile(compile_kwargs={"literal_binds": True})) == "false"
+
+@pytest.mark.asyncio
+async def test_filter_allowed_own(mock_db_session, mock_user_data, mock_permission):
+    mock_permission.scope = ScopeEnum.OWN
+
+    mock_db_session.execute.side_effect = [
+        Mock(scalar_one_or_none=Mock(return_value=mock_user_data)),
+        Mock(scalar_one_or_none=Mock(return_value=mock_permission))
+    ]
+
+    permission_service = PermissionService(mock_db_session)
+    result = await permission_service.filter_allowed(1, "orders", "read", {10: 1, 11: 2, 12: 1})
+
+    assert result == [10, 12]
+    assert mock_db_session.execute.call_count == 2
+
+def test_filter_ids_by_scope():
+    owners = {10: 1, 11: 2}
+
+    assert filter_ids_by_scope(ScopeEnum.ALL, 1, owners) == [10, 11]
+    assert filter_ids_by_scope(None, 1, owners) == []
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("scope, expected", [
+    (ScopeEnum.OWN, [2, 4]),
+    (ScopeEnum.ALL, [1, 2, 3, 4]),
+])
+async def test_orders_are_filtered_by_scope(scope, expected):
+    with patch("app.api.router.check_access_scope", AsyncMock(return_value=(2, scope))):
+        result = await get_orders(MagicMock(), AsyncMock())
+
+    assert [order["id"] for order in result["orders"]] == expected
+    assert all(order["user_id"] == 2 for order in result["orders"]) is (scope == ScopeEnum.OWN)
+    assert result["total"] == len(expected)
@@ -0,0 +1,102 @@
+import pstats
+import pytest
+from fastapi import HTTPException
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.api.dependencies import require_instance_admin_identity
+from app.core.profiler import RequestProfiler, ProfilerMiddleware
+from app.schemas.user_schemas import DEFAULT_TENANT
+
+
+def make_profiler(tmp_path, sample_rate=0.0, paths=(), token=None, max_files=10) -> RequestProfiler:
+    return RequestProfiler(str(tmp_path), sample_rate, list(paths), token, max_files)
+
+def make_scope(path="/products", headers=()):
+    return {"type": "http", "method": "GET", "path": path, "headers": list(headers)}
+
+async def run_request(profiler, scope, content_type=b"application/json"):
+    sent = []
+
+    async def app(scope, receive, send):
+        sum(range(1000))
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    async def send(message):
+        sent.append(message)
+
+    await ProfilerMiddleware(app, profiler)(scope, None, send)
+    return sent
+
+def test_sampling_by_path_header_and_rate(tmp_path):
+    profiler = make_profiler(tmp_path, paths=["/admin/"], token="secret")
+
+    assert profiler.should_profile(make_scope("/admin/permissions"))
+    assert profiler.should_profile(make_scope(headers=[(b"x-profile", b"secret")]))
+    assert not profiler.should_profile(make_scope(headers=[(b"x-profile", b"guess")]))
+    assert not profiler.should_profile(make_scope())
+    assert make_profiler(tmp_path, sample_rate=1.0).should_profile(make_scope())
+
+def test_header_is_ignored_without_token(tmp_path):
+    assert not make_profiler(tmp_path).should_profile(make_scope(headers=[(b"x-profile", b"")]))
+
+@pytest.mark.asyncio
+async def test_sampled_request_writes_loadable_profile(tmp_path):
+    profiler = make_profiler(tmp_path, sample_rate=1.0)
+
+    sent = await run_request(profiler, make_scope())
+
+    [profile] = profiler.list_profiles()
+    assert profile["name"].endswith("-get-products-0ms.prof")
+    assert pstats.Stats(str(profiler.get_path(profile["name"]))).total_calls > 0
+    assert len(sent) == 2
+    assert profiler.get_stats()["written"] == 1
+    assert not profiler.active
+
+@pytest.mark.asyncio
+async def test_unsampled_request_writes_nothing(tmp_path):
+    profiler = make_profiler(tmp_path)
+
+    sent = await run_request(profiler, make_scope())
+
+    assert len(sent) == 2
+    assert profiler.list_profiles() == []
+    assert profiler.get_stats()["sampled"] == 0
+
+@pytest.mark.asyncio
+async def test_old_profiles_are_rotated(tmp_path):
+    profiler = make_profiler(tmp_path, sample_rate=1.0, max_files=2)
+
+    for path in ("/first", "/second", "/third"):
+        await run_request(profiler, make_scope(path))
+
+    names = [profile["name"] for profile in profiler.list_profiles()]
+    assert len(names) == 2
+    assert not any("-first-" in name for name in names)
+
+def test_concurrent_request_is_skipped(tmp_path):
+    profiler = make_profiler(tmp_path, sample_rate=1.0)
+
+    assert profiler.acquire()
+    assert not profiler.acquire()
+    profiler.release()
+
+    assert profiler.get_stats()["skipped"] == 1
+
+def test_get_path_rejects_traversal(tmp_path):
+    (tmp_path.parent / "secret.prof").write_bytes(b"")
+    profiler = make_profiler(tmp_path)
+
+    assert profiler.get_path("../secret.prof") is None
+    assert profiler.get_path("missing.prof") is None
+
+@pytest.mark.asyncio
+async def test_profiles_are_hidden_from_other_tenant_admins():
+    with patch("app.api.dependencies.require_admin_identity", AsyncMock(return_value=(1, "acme"))):
+        with pytest.raises(HTTPException) as exc_err:
+            await require_instance_admin_identity(MagicMock(), AsyncMock())
+
+    assert exc_err.value.status_code == 403
+
+    with patch("app.api.dependencies.require_admin_identity", AsyncMock(return_value=(1, DEFAULT_TENANT))):
+        assert await require_instance_admin_identity(MagicMock(), AsyncMock()) == 1
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, patch
+from sqlalchemy.exc import OperationalError
+
+from app.core.cache import LocalCache, SingleFlight, user_state_cache
+from app.core.resilience import CircuitBreaker, CircuitOpenError
+from app.schemas.user_schemas import RoleEnum
+from app.services.authorization_service import AuthorizationService
+
+
+def test_circuit_breaker_opens_after_failures():
+    breaker = CircuitBreaker(failure_threshold=2, reset_ms=60000)
+
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+def test_circuit_breaker_half_open_after_reset():
+    breaker = CircuitBreaker(failure_threshold=1, reset_ms=0)
+
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_success()
+
+    assert breaker.failures == 0
+    assert not breaker.is_open()
+
+def test_local_cache_stale_marks():
+    cache = LocalCache(max_entries=2)
+    cache.set("a", 1)
+    cache.mark_stale("a")
+    cache.mark_stale("missing")
+
+    assert not cache.is_fresh("a")
+    assert cache.get("a") == 1
+    assert cache.stale_for("a") >= 0
+
+    cache.set("a", 2)
+    assert cache.is_fresh("a")
+
+@pytest.mark.asyncio
+async def test_single_flight_runs_one_task_per_key():
+    group = SingleFlight(timeout_ms=1000)
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return "value"
+
+    first = group.start("key", load)
+    second = group.start("key", load)
+
+    assert first is second
+    assert await first == "value"
+    assert calls == [1]
+    assert "key" not in group.tasks
+
+@pytest.mark.asyncio
+async def test_get_user_state_serves_stale_value_when_database_locked():
+    user_state_cache.set(42, (RoleEnum.USER, True))
+    user_state_cache.mark_stale(42)
+    locked = OperationalError("SELECT", {}, Exception("database is locked"))
+
+    with patch("app.services.authorization_service.version_watcher.refresh", AsyncMock()), \
+            patch("app.services.authorization_service.load_user_states", AsyncMock(side_effect=locked)):
+        state = await AuthorizationService(AsyncMock()).get_user_state(42)
+
+    assert state == (RoleEnum.USER, True)
+    user_state_cache.clear()
+
+@pytest.mark.asyncio
+async def test_get_user_state_raises_without_cached_value():
+    locked = OperationalError("SELECT", {}, Exception("database is locked"))
+
+    with patch("app.services.authorization_service.version_watcher.refresh", AsyncMock()), \
+            patch("app.services.authorization_service.load_user_states", AsyncMock(side_effect=locked)):
+        with pytest.raises(OperationalError):
+            await AuthorizationService(AsyncMock()).get_user_state(43)
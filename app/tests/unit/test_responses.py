@@ -0,0 +1,63 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+import json
+
+from app.core.responses import make_etag, etag_matches, conditional_json_response, dumps, FastJSONResponse
+from app.schemas.user_schemas import RoleEnum
+
+
+def make_request(if_none_match=None):
+    request = MagicMock()
+    request.headers = {"if-none-match": if_none_match} if if_none_match else {}
+    return request
+
+def test_make_etag_is_strong_and_stable():
+    etag = make_etag("user-permissions", 3, "Пользователь")
+
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == make_etag("user-permissions", 3, "Пользователь")
+    assert etag != make_etag("user-permissions", 4, "Пользователь")
+    assert etag != make_etag("user-permissions", 3, "Читатель")
+
+def test_etag_matches():
+    etag = make_etag("a")
+
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"other"', etag)
+
+@pytest.mark.asyncio
+async def test_conditional_response_not_modified():
+    etag = make_etag("not-modified")
+    load = AsyncMock()
+
+    response = await conditional_json_response(make_request(etag), etag, load)
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    load.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_conditional_response_reuses_body():
+    etag = make_etag("reuse-body")
+    load = AsyncMock(return_value=[{"resource": "products", "action": "read", "allowed": True}])
+
+    first = await conditional_json_response(make_request(), etag, load)
+    second = await conditional_json_response(make_request('"stale"'), etag, load)
+
+    assert first.status_code == 200
+    assert first.body == second.body
+    assert b'"resource":"products"' in first.body
+    load.assert_awaited_once()
+
+def test_fast_json_response_renders_compact_utf8():
+    content = {"role": RoleEnum.USER, "allowed": True, "items": [1, 2]}
+
+    response = FastJSONResponse(content)
+
+    assert response.body == dumps(content)
+    assert json.loads(response.body) == {"role": "Пользователь", "allowed": True, "items": [1, 2]}
+    assert "Пользователь".encode() in response.body
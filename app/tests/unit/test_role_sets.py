@@ -0,0 +1,112 @@
+import pytest
+from fastapi import HTTPException
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.core.bitsets import intern_role_set, role_set_key
+from app.core.snapshot import PolicySnapshot, build_snapshot
+from app.schemas.permission_schemas import ScopeEnum
+from app.schemas.user_schemas import RoleEnum
+from app.services.authorization_service import AuthorizationService
+from app.services.group_service import GroupService, load_role_sets
+
+
+@pytest.fixture
+def snapshot():
+    return PolicySnapshot(build_snapshot(1, [
+        {"role": RoleEnum.USER.value, "resource": "orders", "action": "read", "allowed": True, "scope": "own"},
+        {"role": RoleEnum.USER.value, "resource": "orders", "action": "delete", "allowed": False, "scope": "all"},
+        {"role": RoleEnum.MANAGER.value, "resource": "orders", "action": "read", "allowed": True, "scope": "all"},
+        {"role": RoleEnum.MANAGER.value, "resource": "reports", "action": "read", "allowed": False, "scope": "all"},
+        {"role": RoleEnum.VIEWER.value, "resource": "reports", "action": "read", "allowed": True, "scope": "all"},
+    ]))
+
+def test_single_role_matches_snapshot_lookup(snapshot):
+    policy = snapshot.for_roles(frozenset({RoleEnum.USER}))
+
+    assert policy.lookup("orders", "read") == snapshot.lookup(RoleEnum.USER.value, "orders", "read")
+    assert policy.lookup("orders", "delete") == (False, ScopeEnum.ALL)
+    assert policy.lookup("reports", "read") is None
+    assert policy.lookup("unknown", "read") is None
+
+def test_union_prefers_allow_and_wider_scope(snapshot):
+    policy = snapshot.for_roles(frozenset({RoleEnum.USER, RoleEnum.MANAGER, RoleEnum.VIEWER}))
+
+    assert policy.lookup("orders", "read") == (True, ScopeEnum.ALL)
+    assert policy.lookup("orders", "delete") == (False, ScopeEnum.ALL)
+    assert policy.lookup("reports", "read") == (True, ScopeEnum.ALL)
+
+def test_role_set_policy_is_cached(snapshot):
+    first = snapshot.for_roles(frozenset({RoleEnum.USER, RoleEnum.MANAGER}))
+    second = snapshot.for_roles(frozenset({RoleEnum.MANAGER, RoleEnum.USER}))
+
+    assert first is second
+    assert first.permissions() == [
+        {"resource": "orders", "action": "read", "allowed": True, "scope": "all"}
+    ]
+
+def test_intern_role_set_shares_instances():
+    first = intern_role_set([RoleEnum.USER, RoleEnum.VIEWER])
+    second = intern_role_set({RoleEnum.VIEWER, RoleEnum.USER})
+
+    assert first is second
+    assert role_set_key(first) == "USER,VIEWER"
+
+@pytest.mark.asyncio
+async def test_load_role_sets_merges_direct_and_group_roles():
+    session = AsyncMock()
+    result = MagicMock()
+    result.all.return_value = [(1, RoleEnum.MANAGER), (1, RoleEnum.VIEWER)]
+    session.execute.return_value = result
+
+    role_sets = await load_role_sets(session, {1: RoleEnum.USER, 2: RoleEnum.ADMIN})
+
+    assert role_sets == {
+        1: frozenset({RoleEnum.USER, RoleEnum.MANAGER, RoleEnum.VIEWER}),
+        2: frozenset({RoleEnum.ADMIN})
+    }
+    session.execute.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_get_user_permissions_reads_cached_state(snapshot):
+    service = AuthorizationService(AsyncMock())
+    state = (RoleEnum.USER, True, frozenset({RoleEnum.USER, RoleEnum.VIEWER}))
+
+    with patch.object(service, "get_user_state", AsyncMock(return_value=state)), \
+            patch("app.services.authorization_service.policy_snapshot.get", AsyncMock(return_value=snapshot)):
+        permissions = await service.get_user_permissions(1)
+
+    assert service.session.execute.await_count == 0
+    assert {(perm["resource"], perm["scope"]) for perm in permissions} == {("orders", "own"), ("reports", "all")}
+
+@pytest.mark.asyncio
+async def test_get_user_permissions_rejects_inactive_user():
+    service = AuthorizationService(AsyncMock())
+
+    with patch.object(service, "get_user_state", AsyncMock(return_value=(RoleEnum.USER, False, frozenset({RoleEnum.USER})))):
+        with pytest.raises(HTTPException) as exc_err:
+            await service.get_user_permissions(1)
+
+    assert exc_err.value.status_code == 404
+
+@pytest.mark.asyncio
+async def test_create_group_rejects_duplicate_name(mock_db_session):
+    service = GroupService(mock_db_session)
+
+    with pytest.raises(HTTPException) as exc_err:
+        await service.create_group("support", [RoleEnum.MANAGER])
+
+    assert exc_err.value.status_code == 409
+    mock_db_session.rollback.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_add_member_bumps_user_state_version(mock_db_session):
+    service = GroupService(mock_db_session)
+
+    with patch.object(service, "_get_group", AsyncMock()), \
+            patch.object(service, "_get_user", AsyncMock()), \
+            patch("app.services.group_service.VersionService.bump", AsyncMock(return_value=5)) as bump:
+        result = await service.add_member(1, 7)
+
+    assert result == {"message": "Пользователь добавлен в группу"}
+    bump.assert_awaited_once()
+    mock_db_session.commit.assert_awaited_once()
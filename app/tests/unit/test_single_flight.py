@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.core.cache import SingleFlight, user_state_cache
+from app.schemas.user_schemas import RoleEnum
+from app.services.authorization_service import AuthorizationService
+
+
+@pytest.mark.asyncio
+async def test_concurrent_waiters_share_one_load():
+    flight = SingleFlight(timeout_ms=1000)
+    release = asyncio.Event()
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await release.wait()
+        return "value"
+
+    waiters = [asyncio.create_task(flight.run("key", load)) for _ in range(100)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*waiters) == ["value"] * 100
+    assert calls == [1]
+    assert flight.get_stats() == {"in_flight": 0, "flights": 1, "joined": 99}
+
+@pytest.mark.asyncio
+async def test_error_reaches_every_waiter_and_is_not_cached():
+    flight = SingleFlight(timeout_ms=1000)
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(*(flight.run("key", load) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in results)
+    with pytest.raises(ValueError):
+        await flight.run("key", load)
+    assert calls == [1, 1]
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_load():
+    flight = SingleFlight(timeout_ms=1000)
+    release = asyncio.Event()
+
+    async def load():
+        await release.wait()
+        return "value"
+
+    first = asyncio.create_task(flight.run("key", load))
+    second = asyncio.create_task(flight.run("key", load))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    assert await second == "value"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+@pytest.mark.asyncio
+async def test_timed_out_waiter_leaves_load_running():
+    flight = SingleFlight(timeout_ms=10)
+    release = asyncio.Event()
+
+    async def load():
+        await release.wait()
+        return "value"
+
+    with pytest.raises(asyncio.TimeoutError):
+        await flight.run("key", load)
+
+    task = flight.tasks["key"]
+    release.set()
+    assert await task == "value"
+
+@pytest.mark.asyncio
+async def test_cancelled_load_propagates_to_waiters():
+    flight = SingleFlight(timeout_ms=1000)
+
+    async def load():
+        await asyncio.Event().wait()
+
+    waiter = asyncio.create_task(flight.run("key", load))
+    await asyncio.sleep(0)
+    flight.tasks["key"].cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert flight.tasks == {}
+
+@pytest.mark.asyncio
+async def test_user_state_and_batch_of_one_share_flight():
+    user_state_cache.clear()
+    state = (RoleEnum.USER, True, frozenset({RoleEnum.USER}))
+    load_user_states = AsyncMock(return_value={9: state})
+    service = AuthorizationService(AsyncMock())
+
+    with patch("app.services.authorization_service.version_watcher.refresh", AsyncMock()), \
+            patch("app.services.authorization_service.load_user_states", load_user_states):
+        single, batch = await asyncio.gather(service.get_user_state(9), service.get_user_states({9}))
+
+    assert single == state
+    assert batch == {9: state}
+    load_user_states.assert_awaited_once()
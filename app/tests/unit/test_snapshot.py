@@ -0,0 +1,109 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.core.snapshot import SnapshotFile, PolicySnapshot, build_snapshot
+from app.schemas.permission_schemas import ScopeEnum
+from app.schemas.user_schemas import RoleEnum
+from app.services.snapshot_service import PolicySnapshotHolder
+from app.services.version_service import PERMISSIONS_VERSION
+
+
+@pytest.fixture
+def permissions():
+    return [
+        {"id": 1, "role": RoleEnum.USER.value, "resource": "products", "action": "read", "allowed": True, "scope": "all"},
+        {"id": 2, "role": RoleEnum.USER.value, "resource": "orders", "action": "read", "allowed": True, "scope": "own"},
+        {"id": 3, "role": RoleEnum.VIEWER.value, "resource": "products", "action": "delete", "allowed": False, "scope": "all"},
+    ]
+
+def test_snapshot_lookup(permissions):
+    snapshot = PolicySnapshot(build_snapshot(7, permissions))
+
+    assert snapshot.version == 7
+    assert snapshot.count == 3
+    assert snapshot.lookup(RoleEnum.USER.value, "products", "read") == (True, ScopeEnum.ALL)
+    assert snapshot.lookup(RoleEnum.USER.value, "orders", "read") == (True, ScopeEnum.OWN)
+    assert snapshot.lookup(RoleEnum.VIEWER.value, "products", "delete") == (False, ScopeEnum.ALL)
+    assert snapshot.lookup(RoleEnum.ADMIN.value, "products", "read") is None
+
+def test_snapshot_rules_roundtrip(permissions):
+    snapshot = PolicySnapshot(build_snapshot(1, permissions))
+
+    rules = {(role, resource, action): (allowed, scope) for role, resource, action, allowed, scope in snapshot.rules()}
+
+    assert len(rules) == 3
+    assert rules[(RoleEnum.USER.value, "orders", "read")] == (True, ScopeEnum.OWN)
+
+def test_snapshot_invalid_format():
+    with pytest.raises(ValueError):
+        PolicySnapshot(b"XXXX" + bytes(16))
+
+def test_snapshot_file_publish_and_load(tmp_path, permissions):
+    snapshot_file = SnapshotFile(str(tmp_path / "policy.snapshot"))
+
+    assert snapshot_file.load() is None
+
+    snapshot_file.publish(build_snapshot(3, permissions))
+    snapshot = snapshot_file.load()
+
+    assert snapshot.version == 3
+    assert snapshot.lookup(RoleEnum.USER.value, "products", "read") == (True, ScopeEnum.ALL)
+
+def test_snapshot_file_lock_is_exclusive(tmp_path):
+    snapshot_file = SnapshotFile(str(tmp_path / "policy.snapshot"))
+
+    with snapshot_file.try_lock() as first:
+        with snapshot_file.try_lock() as second:
+            assert first is True
+            assert second is False
+
+@pytest.mark.asyncio
+async def test_holder_rebuilds_stale_snapshot_once(tmp_path, permissions):
+    holder = PolicySnapshotHolder(str(tmp_path / "policy.snapshot"))
+    session = AsyncMock()
+
+    with patch("app.services.snapshot_service.version_watcher.refresh", AsyncMock(return_value={PERMISSIONS_VERSION: 2})), \
+            patch("app.services.snapshot_service.VersionService.get_versions", AsyncMock(return_value={PERMISSIONS_VERSION: 2})), \
+            patch("app.services.snapshot_service.PermissionService.get_all_permissions", AsyncMock(return_value=permissions)) as mock_load, \
+            patch("app.services.snapshot_service.GrantService.get_active_grants", AsyncMock(return_value=[])), \
+            patch("app.services.snapshot_service.GrantService.get_next_change", AsyncMock(return_value=None)):
+        first = await holder.get(session)
+        second = await holder.get(session)
+        other_worker = await PolicySnapshotHolder(str(tmp_path / "policy.snapshot")).get(session)
+
+    assert first is second
+    assert first.version == 2
+    assert other_worker.version == 2
+    mock_load.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_holder_drops_snapshot_after_version_reset(tmp_path, permissions):
+    path = str(tmp_path / "policy.snapshot")
+    SnapshotFile(path).publish(build_snapshot(7, permissions))
+    holder = PolicySnapshotHolder(path)
+    session = AsyncMock()
+
+    with patch("app.services.snapshot_service.version_watcher.refresh", AsyncMock(return_value={PERMISSIONS_VERSION: 1})), \
+            patch("app.services.snapshot_service.VersionService.get_versions", AsyncMock(return_value={PERMISSIONS_VERSION: 1})), \
+            patch("app.services.snapshot_service.PermissionService.get_all_permissions", AsyncMock(return_value=[])), \
+            patch("app.services.snapshot_service.GrantService.get_active_grants", AsyncMock(return_value=[])), \
+            patch("app.services.snapshot_service.GrantService.get_next_change", AsyncMock(return_value=None)):
+        snapshot = await holder.get(session)
+
+    assert snapshot.version == 1
+    assert snapshot.count == 0
+
+@pytest.mark.asyncio
+async def test_holder_catches_up_when_watcher_lags(tmp_path, permissions):
+    holder = PolicySnapshotHolder(str(tmp_path / "policy.snapshot"))
+    refresh = AsyncMock(side_effect=lambda session, force=False: {PERMISSIONS_VERSION: 4 if force else 3})
+
+    with patch("app.services.snapshot_service.version_watcher.refresh", refresh), \
+            patch("app.services.snapshot_service.VersionService.get_versions", AsyncMock(return_value={PERMISSIONS_VERSION: 4})), \
+            patch("app.services.snapshot_service.PermissionService.get_all_permissions", AsyncMock(return_value=permissions)), \
+            patch("app.services.snapshot_service.GrantService.get_active_grants", AsyncMock(return_value=[])), \
+            patch("app.services.snapshot_service.GrantService.get_next_change", AsyncMock(return_value=None)):
+        snapshot = await holder.get(AsyncMock())
+
+    assert snapshot.version == 4
+    assert refresh.await_args_list[-1].kwargs == {"force": True}
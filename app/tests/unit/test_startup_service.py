@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.api.health_router import readyz
+from app.services.startup_service import StartupService, readiness, get_pool_stats
+
+
+@pytest.fixture
+def startup_service():
+    service = StartupService(MagicMock())
+    for name in ("check_config", "create_schema", "warm_pool", "warm_pages", "warm_bcrypt", "preload_policy"):
+        setattr(service, name, AsyncMock())
+    return service
+
+@pytest.mark.asyncio
+async def test_warm_up_marks_ready(startup_service):
+    await startup_service.prepare()
+    await startup_service.warm_caches()
+
+    assert readiness.ready is True
+    assert list(readiness.checks) == ["config", "schema", "pool", "pages", "bcrypt", "policy"]
+    startup_service.preload_policy.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_warm_up_fails_on_invalid_config(startup_service):
+    startup_service.check_config.side_effect = ValueError("Не установлен секретны ключ")
+
+    with pytest.raises(ValueError):
+        await startup_service.prepare()
+
+    assert readiness.ready is False
+    startup_service.create_schema.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_check_config_requires_algorithm():
+    service = StartupService(MagicMock())
+
+    with patch.dict("os.environ", {"SECRET_KEY": "secret", "ALGORITHM": ""}):
+        with pytest.raises(ValueError):
+            await service.check_config()
+
+def test_get_pool_stats():
+    stats = get_pool_stats()
+
+    assert "class" in stats
+    assert stats.get("checkedout", 0) >= 0
+
+@pytest.mark.asyncio
+async def test_background_warm_up_reports_readiness(startup_service):
+    release = asyncio.Event()
+    startup_service.warm_bcrypt.side_effect = release.wait
+
+    await startup_service.prepare()
+    startup_service.start()
+    await asyncio.sleep(0)
+    response = await readyz()
+
+    assert response.status_code == 503
+    assert readiness.ready is False
+
+    release.set()
+    await startup_service.task
+    assert readiness.ready is True
+    assert await readyz() == {"status": "ready", "checks": readiness.checks}
+
+@pytest.mark.asyncio
+async def test_failed_background_warm_up_is_retried(startup_service):
+    startup_service.preload_policy.side_effect = [RuntimeError("database is locked"), None]
+    retry = asyncio.Event()
+
+    async def sleep(delay):
+        response = await readyz()
+        assert response.status_code == 503
+        assert b'"starting"' in response.body
+        assert readiness.error == "database is locked"
+        retry.set()
+
+    await startup_service.prepare()
+    with patch("app.services.startup_service.asyncio.sleep", sleep):
+        startup_service.start()
+        await startup_service.task
+
+    assert retry.is_set()
+    assert readiness.ready is True
+    assert readiness.error is None
+    assert startup_service.preload_policy.await_count == 2
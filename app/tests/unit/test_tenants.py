@@ -0,0 +1,43 @@
+import pytest
+from pydantic import ValidationError
+from unittest.mock import AsyncMock, patch
+
+from app.api.dependencies import authenticate_token
+from app.schemas.user_schemas import RoleEnum, LoginSchema, DEFAULT_TENANT
+from app.services.snapshot_service import PolicySnapshotRegistry
+from app.services.version_service import permissions_version, PERMISSIONS_VERSION
+
+
+def test_permissions_version_per_tenant():
+    assert permissions_version(DEFAULT_TENANT) == PERMISSIONS_VERSION
+    assert permissions_version("acme") == "permissions:acme"
+
+def test_registry_keeps_separate_snapshots(tmp_path):
+    registry = PolicySnapshotRegistry(str(tmp_path / "policy.snapshot"))
+
+    default = registry.for_tenant(DEFAULT_TENANT)
+    acme = registry.for_tenant("acme")
+
+    assert registry.for_tenant("acme") is acme
+    assert default.version_name == PERMISSIONS_VERSION
+    assert acme.version_name == "permissions:acme"
+    assert default.file.path == str(tmp_path / "policy.snapshot")
+    assert acme.file.path == str(tmp_path / "policy.snapshot.acme")
+
+def test_login_schema_validates_tenant():
+    assert LoginSchema(email="user@example.com", password="secret").tenant == DEFAULT_TENANT
+
+    with pytest.raises(ValidationError):
+        LoginSchema(email="user@example.com", password="secret", tenant="Bad Tenant")
+
+@pytest.mark.asyncio
+async def test_authenticate_token_reads_tenant_claim():
+    with patch("app.api.dependencies.verify_access_token", return_value={"sub": "3", "tenant": "acme"}), \
+            patch("app.api.dependencies.get_traced_user_state", AsyncMock(return_value=(RoleEnum.USER, True, frozenset({RoleEnum.USER})))):
+        assert await authenticate_token("token", AsyncMock()) == (3, frozenset({RoleEnum.USER}), "acme")
+
+@pytest.mark.asyncio
+async def test_authenticate_token_defaults_legacy_tokens():
+    with patch("app.api.dependencies.verify_access_token", return_value={"sub": "3"}), \
+            patch("app.api.dependencies.get_traced_user_state", AsyncMock(return_value=(RoleEnum.USER, True, frozenset({RoleEnum.USER})))):
+        assert await authenticate_token("token", AsyncMock()) == (3, frozenset({RoleEnum.USER}), DEFAULT_TENANT)
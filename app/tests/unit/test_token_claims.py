@@ -0,0 +1,87 @@
+import pytest
+from fastapi import HTTPException
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.api.dependencies import authenticate_token
+from app.schemas.user_schemas import RoleEnum
+from app.services.authorization_service import parse_claims_state
+from app.services.users_service import UserService
+from app.services.version_service import UserVersionTracker, USERS_VERSION
+
+CLAIMS = {"sub": "3", "role": RoleEnum.USER.value, "roles": [RoleEnum.USER.value, RoleEnum.VIEWER.value], "uv": 10}
+
+
+def make_tracker(baseline: int | None = 8) -> UserVersionTracker:
+    tracker = UserVersionTracker(max_entries=2)
+    tracker.reset(baseline)
+    return tracker
+
+def test_tracker_rejects_tokens_older_than_user_change():
+    tracker = make_tracker()
+    tracker.record(3, 12, 12)
+
+    assert tracker.is_current(4, 10)
+    assert not tracker.is_current(3, 10)
+    assert tracker.is_current(3, 12)
+    assert not tracker.is_current(4, 7)
+    assert not make_tracker(None).is_current(4, 10)
+
+def test_tracker_moves_baseline_instead_of_evicting():
+    tracker = make_tracker()
+    tracker.record(1, 9, 9)
+    tracker.record(2, 10, 10)
+    tracker.record(3, 11, 11)
+
+    assert tracker.baseline == 11
+    assert tracker.changed == {}
+    assert not tracker.is_current(1, 10)
+
+def test_parse_claims_state_builds_role_set():
+    with patch("app.services.authorization_service.user_versions", make_tracker()):
+        state = parse_claims_state(3, CLAIMS)
+        broken = parse_claims_state(3, dict(CLAIMS, roles=["Нет такой роли"]))
+
+    assert state == (RoleEnum.USER, True, frozenset({RoleEnum.USER, RoleEnum.VIEWER}))
+    assert broken is None
+
+@pytest.mark.asyncio
+async def test_authenticate_token_skips_database_for_current_claims():
+    session = AsyncMock()
+
+    with patch("app.api.dependencies.verify_access_token", return_value=CLAIMS), \
+            patch("app.services.authorization_service.user_versions", make_tracker()), \
+            patch("app.services.authorization_service.version_watcher.refresh", AsyncMock()), \
+            patch("app.api.dependencies.get_traced_user_state", AsyncMock()) as get_traced_user_state:
+        identity = await authenticate_token("token", session)
+
+    assert identity == (3, frozenset({RoleEnum.USER, RoleEnum.VIEWER}), "default")
+    get_traced_user_state.assert_not_awaited()
+    session.execute.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_authenticate_token_falls_back_when_user_changed():
+    tracker = make_tracker()
+    tracker.record(3, 11, 11)
+    state = (RoleEnum.USER, False, frozenset({RoleEnum.USER}))
+
+    with patch("app.api.dependencies.verify_access_token", return_value=CLAIMS), \
+            patch("app.services.authorization_service.user_versions", tracker), \
+            patch("app.services.authorization_service.version_watcher.refresh", AsyncMock()), \
+            patch("app.api.dependencies.get_traced_user_state", AsyncMock(return_value=state)):
+        with pytest.raises(HTTPException) as exc_err:
+            await authenticate_token("token", AsyncMock())
+
+    assert exc_err.value.status_code == 401
+
+@pytest.mark.asyncio
+async def test_token_claims_read_versions_before_roles():
+    user = MagicMock(id=3, role=RoleEnum.USER, tenant="default")
+    service = UserService(AsyncMock())
+
+    with patch("app.services.users_service.VersionService.get_versions",
+               AsyncMock(return_value={USERS_VERSION: 10, "permissions": 4})), \
+            patch("app.services.users_service.load_role_sets",
+                  AsyncMock(return_value={3: frozenset({RoleEnum.USER})})):
+        claims = await service.get_token_claims(user)
+
+    assert claims == {"role": RoleEnum.USER.value, "roles": [RoleEnum.USER.value], "uv": 10, "pv": 4}
@@ -0,0 +1,75 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.api.dependencies import get_traced_rule
+from app.core.trace import DecisionTrace, TraceMiddleware, current_trace, trace_step, DISABLED_STEP
+
+
+def test_trace_step_is_noop_without_trace():
+    assert trace_step("token") is DISABLED_STEP
+    with trace_step("token") as record:
+        assert record is None
+
+def test_trace_step_records_timing():
+    trace = DecisionTrace()
+    token = current_trace.set(trace)
+    try:
+        with trace_step("token") as record:
+            record["valid"] = True
+    finally:
+        current_trace.reset(token)
+
+    assert trace.steps[0]["step"] == "token"
+    assert trace.steps[0]["valid"] is True
+    assert trace.steps[0]["ms"] >= 0
+
+async def run_middleware(headers, role):
+    sent = []
+
+    async def app(scope, receive, send):
+        current_trace.get().roles = {role}
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    async def send(message):
+        sent.append(message)
+
+    await TraceMiddleware(app)({"type": "http", "headers": headers}, None, send)
+    return dict(sent[0]["headers"])
+
+@pytest.mark.asyncio
+async def test_middleware_returns_trace_to_admin():
+    headers = await run_middleware([(b"x-debug-trace", b"1")], "ADMIN")
+
+    assert b"x-auth-trace" in headers
+    assert current_trace.get() is None
+
+@pytest.mark.asyncio
+async def test_middleware_hides_trace_from_other_roles():
+    headers = await run_middleware([(b"x-debug-trace", b"1")], "USER")
+
+    assert b"x-auth-trace" not in headers
+
+@pytest.mark.asyncio
+async def test_middleware_skips_requests_without_header():
+    async def app(scope, receive, send):
+        assert current_trace.get() is None
+
+    await TraceMiddleware(app)({"type": "http", "headers": []}, None, None)
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("trace, looked_up", [
+    (DecisionTrace(), False),
+    (DecisionTrace(admin=True), True),
+])
+async def test_rule_ids_are_looked_up_only_for_admin_trace(trace, looked_up):
+    token = current_trace.set(trace)
+    try:
+        with patch("app.api.dependencies.AuthorizationService.get_rule", AsyncMock(return_value=(True, "ALL"))), \
+                patch("app.api.dependencies.PermissionService.find_rules",
+                      AsyncMock(return_value=[MagicMock(id=7)])) as find_rules:
+            await get_traced_rule(frozenset(), "orders", "read", "default", MagicMock())
+    finally:
+        current_trace.reset(token)
+
+    assert find_rules.await_count == int(looked_up)
+    assert any(step["step"] == "rule_id" for step in trace.steps) is looked_up
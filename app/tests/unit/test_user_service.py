@@ -1,6 +1,7 @@
 import pytest
 from fastapi import HTTPException
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.services.users_service import UserService
@@ -38,11 +39,17 @@ def mock_update_data():
 async def test_register_user_success(mock_db_session, mock_user_data):
     user_data = mock_user_data
 
+    mock_db_session.execute.return_value.one_or_none.return_value = Mock(
+        id=1, email=user_data.email, role=user_data.role, is_active=True
+    )
+
     user_service = UserService(mock_db_session)
 
     result = await user_service.register_user(user_data)
     assert "id" in result
     assert result["email"] == user_data.email
+    mock_db_session.execute.assert_awaited_once()
+    mock_db_session.commit.assert_awaited_once()
 
 @pytest.mark.asyncio
 async def test_register_user_fail_pass_confirm(mock_db_session, mock_user_data):
@@ -62,7 +69,7 @@ async def test_register_user_exist(mock_user_data):
 
     mock_session = AsyncMock(spec=AsyncSession)
     mock_result = MagicMock()
-    mock_result.scalar_one_or_none.return_value = True
+    mock_result.one_or_none.return_value = None
     mock_session.execute.return_value = mock_result
 
     user_service = UserService(mock_session)
@@ -154,12 +161,13 @@ async def test_update_user_succeess(mock_db_session, mock_active_user, mock_upda
     user_data = mock_update_data
     user_id = mock_active_user.id
 
-    mock_select_result = MagicMock()
-    mock_select_result.scalar_one_or_none.return_value = mock_active_user
-    
+    mock_version_result = MagicMock()
+    mock_version_result.scalar_one.return_value = 5
+
     mock_update_result = MagicMock()
+    mock_update_result.scalar_one_or_none.return_value = user_id
     mock_db_session.execute.side_effect = [
-        mock_select_result,
+        mock_version_result,
         mock_update_result
     ]
 
@@ -181,43 +189,71 @@ async def test_update_user_not_found(mock_db_session, mock_update_data):
     
     assert exc_err.value.status_code == 404
     assert "Пользователь не найден" in str(exc_err.value.detail)
+    mock_db_session.commit.assert_not_called()
 
 @pytest.mark.asyncio
 async def test_update_user_not_active(mock_db_session, mock_active_user, mock_update_data):
     user_data = mock_update_data
     user_id = mock_active_user.id
 
-    mock_active_user.is_active = False
-
-    mock_db_session.execute.return_value.scalar_one_or_none.return_value = mock_active_user
+    mock_db_session.execute.side_effect = [
+        MagicMock(),
+        Mock(scalar_one_or_none=Mock(return_value=None)),
+        Mock(scalar_one_or_none=Mock(return_value=False))
+    ]
 
     user_service = UserService(mock_db_session)
-    with patch("app.services.users_service.verify_password") as mock_verify:
-        mock_verify.return_value = True
-        with pytest.raises(HTTPException) as exc_err:
-            await user_service.update_user(user_data, user_id)
+    with pytest.raises(HTTPException) as exc_err:
+        await user_service.update_user(user_data, user_id)
 
     assert exc_err.value.status_code == 401
     assert "Пользователь неактивен" in str(exc_err.value.detail)
 
+@pytest.mark.asyncio
+async def test_update_user_email_taken(mock_db_session, mock_active_user, mock_update_data):
+    user_data = mock_update_data
+
+    mock_db_session.execute.side_effect = [
+        MagicMock(),
+        IntegrityError("UPDATE users", {}, Exception("UNIQUE constraint failed: users.email"))
+    ]
+
+    user_service = UserService(mock_db_session)
+    with pytest.raises(HTTPException) as exc_err:
+        await user_service.update_user(user_data, mock_active_user.id)
+
+    assert exc_err.value.status_code == 409
+    mock_db_session.rollback.assert_awaited_once()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("method", ["update_user", "delete_user"])
+async def test_database_unavailable_is_not_masked(mock_db_session, mock_update_data, method):
+    mock_db_session.execute.side_effect = OperationalError("UPDATE users", {}, Exception("database is locked"))
+    args = (mock_update_data, 1) if method == "update_user" else (1,)
+
+    with pytest.raises(OperationalError):
+        await getattr(UserService(mock_db_session), method)(*args)
+
+    mock_db_session.rollback.assert_awaited_once()
+
 @pytest.mark.asyncio
 async def test_delete_user_success(mock_db_session, mock_active_user):
     user_id = mock_active_user.id
 
-    mock_db_session.execute.return_value.scalar_one_or_none.return_value = mock_active_user
+    mock_db_session.execute.return_value.one_or_none.return_value = Mock(email=mock_active_user.email, tenant="default")
 
     user_service = UserService(mock_db_session)
 
     result = await user_service.delete_user(user_id)
 
-    assert mock_active_user.is_active == False
     assert result == {"message": "Пользователь удален", "email": mock_active_user.email}
     mock_db_session.commit.assert_called_once()
+    assert mock_db_session.execute.call_count == 2
 
 @pytest.mark.asyncio
 async def test_delete_user_not_found_or_deleted(mock_db_session):
 
-    mock_db_session.execute.return_value.scalar_one_or_none.return_value = None
+    mock_db_session.execute.return_value.one_or_none.return_value = None
 
     user_service = UserService(mock_db_session)
 
@@ -0,0 +1,92 @@
+import pytest
+from unittest.mock import MagicMock, Mock
+from sqlalchemy.exc import OperationalError
+
+from app.core.cache import MISSING, user_state_cache
+from app.services.version_service import VersionService, VersionWatcher, PERMISSIONS_VERSION, USERS_VERSION, invalidate_users
+from app.tests.unit.conftest import mock_db_session
+
+
+def versions_result(versions):
+    return Mock(all=Mock(return_value=list(versions.items())))
+
+@pytest.mark.asyncio
+async def test_bump_returns_new_version(mock_db_session):
+    mock_db_session.execute.return_value.scalar_one.return_value = 3
+
+    result = await VersionService(mock_db_session).bump(PERMISSIONS_VERSION)
+
+    assert result == 3
+    mock_db_session.execute.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_watcher_skips_check_within_interval(mock_db_session):
+    watcher = VersionWatcher(interval_ms=60000)
+    mock_db_session.execute.return_value = versions_result({PERMISSIONS_VERSION: 1})
+
+    await watcher.refresh(mock_db_session)
+    await watcher.refresh(mock_db_session)
+
+    assert mock_db_session.execute.call_count == 1
+
+@pytest.mark.asyncio
+async def test_watcher_notifies_only_changed_versions(mock_db_session):
+    watcher = VersionWatcher(interval_ms=0)
+    permissions_listener = MagicMock()
+    users_listener = MagicMock()
+
+    async def on_permissions(session, previous, current):
+        permissions_listener(previous, current)
+
+    async def on_users(session, previous, current):
+        users_listener(previous, current)
+
+    watcher.subscribe(PERMISSIONS_VERSION, on_permissions)
+    watcher.subscribe(USERS_VERSION, on_users)
+
+    mock_db_session.execute.side_effect = [
+        versions_result({PERMISSIONS_VERSION: 1}),
+        versions_result({PERMISSIONS_VERSION: 2}),
+    ]
+
+    await watcher.refresh(mock_db_session)
+    await watcher.refresh(mock_db_session)
+
+    assert permissions_listener.call_count == 2
+    permissions_listener.assert_called_with(1, 2)
+    users_listener.assert_called_once_with(None, 0)
+
+@pytest.mark.asyncio
+async def test_invalidate_users_marks_changed_users_stale(mock_db_session):
+    user_state_cache.set(1, ("role", True))
+    user_state_cache.set(2, ("role", True))
+    mock_db_session.execute.return_value.all.return_value = [(2, 5)]
+
+    await invalidate_users(mock_db_session, 4, 5)
+
+    assert user_state_cache.is_fresh(1)
+    assert not user_state_cache.is_fresh(2)
+    assert user_state_cache.get(2) == ("role", True)
+    user_state_cache.clear()
+
+@pytest.mark.asyncio
+async def test_watcher_serves_last_versions_when_database_locked(mock_db_session):
+    watcher = VersionWatcher(interval_ms=0, max_stale_ms=60000)
+    mock_db_session.execute.side_effect = [
+        versions_result({PERMISSIONS_VERSION: 1}),
+        OperationalError("SELECT", {}, Exception("database is locked")),
+    ]
+
+    await watcher.refresh(mock_db_session)
+    versions = await watcher.refresh(mock_db_session)
+
+    assert versions[PERMISSIONS_VERSION] == 1
+    mock_db_session.rollback.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_watcher_raises_when_stale_window_exceeded(mock_db_session):
+    watcher = VersionWatcher(interval_ms=0, max_stale_ms=0)
+    mock_db_session.execute.side_effect = OperationalError("SELECT", {}, Exception("database is locked"))
+
+    with pytest.raises(OperationalError):
+        await watcher.refresh(mock_db_session)
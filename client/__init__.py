@@ -0,0 +1,14 @@
+from client.auth_client import AuthClient
+from client.errors import (
+    AuthClientError, PolicyUnavailable, InvalidToken, UserInactive, PermissionNotFound, AccessDenied
+)
+
+__all__ = [
+    "AuthClient",
+    "AuthClientError",
+    "PolicyUnavailable",
+    "InvalidToken",
+    "UserInactive",
+    "PermissionNotFound",
+    "AccessDenied",
+]
@@ -0,0 +1,198 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Iterable
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+from jose import jwt, JWTError
+
+from client.errors import PolicyUnavailable, InvalidToken, UserInactive, PermissionNotFound, AccessDenied
+
+logger = logging.getLogger(__name__)
+
+PERMISSIONS_VERSION = "permissions"
+USERS_VERSION = "users"
+
+
+class AuthClient:
+    def __init__(
+        self,
+        base_url: str,
+        introspection_secret: str,
+        secret_key: str | None = None,
+        refresh_interval: float = 5.0,
+        timeout: float = 2.0,
+        tenant: str = "default"
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.introspection_secret = introspection_secret
+        # Токены подписываются симметричным ключом, поэтому сервис его не раздает: ключ задается в конфигурации
+        self.secret_key = secret_key or os.getenv("SECRET_KEY")
+        self.refresh_interval = refresh_interval
+        self.timeout = timeout
+        self.tenant = tenant
+        self.algorithm: str | None = None
+        self.versions: dict[str, int] = {}
+        self.rules: dict[tuple[str, str, str], tuple[bool, str]] = {}
+        self.etag: str | None = None
+        self.expires_at: float | None = None
+        self.users: dict[str, tuple[tuple[str, ...] | None, float]] = {}
+        self.requested_version = 0
+        self.stop_event = threading.Event()
+        self.thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self.refresh()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.refresh_loop, name="auth-client-refresh", daemon=True)
+        self.thread.start()
+
+    def close(self) -> None:
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def refresh_loop(self) -> None:
+        while not self.stop_event.wait(self.next_refresh_delay()):
+            try:
+                self.refresh()
+            except (URLError, OSError, ValueError) as error:
+                # Продолжаем работать на последнем полученном снимке
+                logger.warning("Не удалось обновить политику: %s", error)
+
+    def next_refresh_delay(self) -> float:
+        # Когда начинается или заканчивается грант, политика меняется без смены версии: обновляемся к этому моменту
+        if self.expires_at is None:
+            return self.refresh_interval
+        return max(min(self.refresh_interval, self.expires_at - time.time()), 0.0)
+
+    def refresh(self) -> bool:
+        headers = {"X-Introspection-Secret": self.introspection_secret}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        try:
+            url = f"{self.base_url}/auth/policy?tenant={quote(self.tenant)}"
+            with urlopen(Request(url, headers=headers), timeout=self.timeout) as response:
+                policy = json.loads(response.read())
+                etag = response.headers.get("ETag")
+        except HTTPError as error:
+            if error.code == 304:
+                return False
+            raise
+
+        rules = {
+            (perm["role"], perm["resource"], perm["action"]): (perm["allowed"], perm["scope"])
+            for perm in policy["permissions"]
+        }
+        if policy["versions"].get(USERS_VERSION) != self.versions.get(USERS_VERSION):
+            self.users = {}
+        self.rules = rules
+        self.algorithm = policy["algorithm"]
+        self.versions = policy["versions"]
+        self.expires_at = policy.get("expires_at")
+        self.etag = etag
+        return True
+
+    def verify_token(self, token: str) -> dict[str, Any]:
+        if self.algorithm is None:
+            raise PolicyUnavailable("Политика еще не загружена")
+        try:
+            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+        except JWTError as error:
+            raise InvalidToken("Токен недействителен или истек") from error
+        if not str(payload.get("sub", "")).isdigit():
+            raise InvalidToken("Пользователь не найден")
+        if payload.get("tenant", "default") != self.tenant:
+            raise InvalidToken("Токен выпущен для другого арендатора")
+        return payload
+
+    def find_rule(self, role: str, resource: str, action: str) -> tuple[bool, str]:
+        if self.algorithm is None:
+            raise PolicyUnavailable("Политика еще не загружена")
+        rule = self.rules.get((role, resource, action))
+        if rule is None:
+            raise PermissionNotFound("Разрешение не найдено")
+        return rule
+
+    def find_effective_rule(self, roles: Iterable[str], resource: str, action: str) -> tuple[bool, str]:
+        # Объединение правил ролей: любое разрешение побеждает запрет, а "all" шире "own"
+        rules = []
+        for role in roles:
+            try:
+                rules.append(self.find_rule(role, resource, action))
+            except PermissionNotFound:
+                pass
+        if not rules:
+            raise PermissionNotFound("Разрешение не найдено")
+        scopes = {scope for allowed, scope in rules if allowed}
+        if not scopes:
+            return False, "all"
+        return True, "all" if "all" in scopes else "own"
+
+    def check_permission(self, role: str, resource: str, action: str) -> bool:
+        allowed, _ = self.find_rule(role, resource, action)
+        return allowed
+
+    def get_access_scope(self, role: str, resource: str, action: str) -> str | None:
+        allowed, scope = self.find_rule(role, resource, action)
+        return scope if allowed else None
+
+    def authorize(self, token: str, resource: str, action: str) -> tuple[int, str]:
+        payload = self.verify_token(token)
+        self.sync_policy(payload)
+        roles = self.get_user_roles(token, payload)
+        allowed, scope = self.find_effective_rule(roles, resource, action)
+        if not allowed:
+            raise AccessDenied(
+                f"Доступ запрещен. Недостаточно прав для выполнения действия: {action}, источник: {resource}"
+            )
+        return int(payload["sub"]), scope
+
+    def sync_policy(self, payload: dict[str, Any]) -> None:
+        # Токен выпущен при более новой политике, чем загруженная: обновляемся, не дожидаясь интервала
+        version = payload.get("pv")
+        if not isinstance(version, int) or version <= max(self.versions.get(PERMISSIONS_VERSION, 0), self.requested_version):
+            return
+        self.requested_version = version
+        try:
+            self.refresh()
+        except (URLError, OSError, ValueError) as error:
+            logger.warning("Не удалось обновить политику: %s", error)
+
+    def get_claimed_roles(self, payload: dict[str, Any]) -> tuple[str, ...] | None:
+        # Роли из токена актуальны, если после его выдачи не менялся ни один пользователь
+        version = payload.get("uv")
+        roles = payload.get("roles")
+        if not isinstance(version, int) or not roles or version < self.versions.get(USERS_VERSION, 0):
+            return None
+        return tuple(roles)
+
+    def get_user_roles(self, token: str, payload: dict[str, Any]) -> tuple[str, ...]:
+        claimed = self.get_claimed_roles(payload)
+        if claimed is not None:
+            return claimed
+
+        cached = self.users.get(payload["sub"])
+        if cached is None or cached[1] <= time.time():
+            result = self.introspect(token)
+            roles = result.get("roles") or ([result["role"]] if result.get("role") else None)
+            cached = (tuple(roles) if roles else None, float(payload["exp"]))
+            self.users[payload["sub"]] = cached
+        if cached[0] is None:
+            raise UserInactive("Пользователь неактивен")
+        return cached[0]
+
+    def introspect(self, token: str) -> dict[str, Any]:
+        request = Request(
+            f"{self.base_url}/introspect",
+            data=json.dumps({"token": token}).encode(),
+            headers={"X-Introspection-Secret": self.introspection_secret, "Content-Type": "application/json"}
+        )
+        with urlopen(request, timeout=self.timeout) as response:
+            result = json.loads(response.read())
+        return result if result.get("active") else {}
@@ -0,0 +1,22 @@
+class AuthClientError(Exception):
+    pass
+
+
+class PolicyUnavailable(AuthClientError):
+    pass
+
+
+class InvalidToken(AuthClientError):
+    pass
+
+
+class UserInactive(AuthClientError):
+    pass
+
+
+class PermissionNotFound(AuthClientError):
+    pass
+
+
+class AccessDenied(AuthClientError):
+    pass
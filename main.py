@@ -1,6 +1,49 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
 from app.api import main_router
+from app.core.responses import FastJSONResponse
+from app.core.resilience import DATABASE_ERRORS, database_unavailable_handler
+from app.core.trace import TraceMiddleware
+from app.core.profiler import ProfilerMiddleware
+from app.config import get_profiler_settings
+from app.database import DatabaseService
+from app.services.startup_service import StartupService
+from app.services.authz_socket_service import create_authz_socket_server
+from app.services.audit_service import audit_log
+from app.services.activity_service import activity_tracker
+from app.services.snapshot_service import grant_scheduler
+from app.services.change_service import change_feed
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup_service = StartupService(DatabaseService())
+    await startup_service.prepare()
+    startup_service.start()
+    audit_log.start()
+    activity_tracker.start()
+    grant_scheduler.start()
+    change_feed.start()
+    authz_socket_server = create_authz_socket_server()
+    if authz_socket_server is not None:
+        await authz_socket_server.start()
+    yield
+    if authz_socket_server is not None:
+        await authz_socket_server.stop()
+    await audit_log.stop()
+    await activity_tracker.stop()
+    await grant_scheduler.stop()
+    await change_feed.stop()
+    await startup_service.shutdown()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 app.include_router(main_router)
+app.add_middleware(TraceMiddleware)
+# Без PROFILER_ENABLED middleware не подключается и не добавляет ни одного вызова на запрос
+if get_profiler_settings()["enabled"]:
+    app.add_middleware(ProfilerMiddleware)
+for error in DATABASE_ERRORS:
+    app.add_exception_handler(error, database_unavailable_handler)